@@ -1,13 +1,16 @@
 import streamlit as st
-import sqlite3
-from database import DatabaseManager
+from database import DEFAULT_WORKSPACE_ID, DatabaseManager
 from chat.agent import MCPAgent
+from chat.warmup import AgentWarmer, WarmerClosed
+from chat.workspaces import WorkspaceAgents
 import asyncio
-import pandas as pd
 import json
-from mcp_client.manager import MCPManager
+import os
+import time
+from typing import Optional
+from chat.profiling import DEFAULT_PROFILE_DIR, TurnProfiler, get_profiler, set_profiling
 
-# Initialize database manager
+# Initialize database manager (scoped to the selected workspace below)
 db_manager = DatabaseManager()
 
 # Set up the page configuration
@@ -38,6 +41,8 @@ if "edit_config_data" not in st.session_state:
     st.session_state.edit_config_data = None
 if "connection_alert" not in st.session_state:
     st.session_state.connection_alert = None
+if "workspace_id" not in st.session_state:
+    st.session_state.workspace_id = DEFAULT_WORKSPACE_ID
 
 # Sidebar navigation
 st.sidebar.title("🤖 MCP Chat Application")
@@ -49,17 +54,104 @@ if st.sidebar.button("💬 Chat", key="nav_chat", width='stretch'):
 if st.sidebar.button("⚙️ Settings", key="nav_settings", width='stretch'):
     st.session_state.current_page = "Settings"
 
+if st.sidebar.button("🩺 Diagnostics", key="nav_diagnostics", width='stretch'):
+    st.session_state.current_page = "Diagnostics"
+
 st.sidebar.markdown("---")
 
+@st.cache_resource
+def get_workspace_agents():
+    """Create the process-wide, per-workspace agent warmers."""
+    return WorkspaceAgents(DatabaseManager())
+
+workspace_agents = get_workspace_agents()
+
+def switch_workspace(workspace_id: int):
+    """Select a workspace; the conversation doesn't carry over."""
+    st.session_state.workspace_id = workspace_id
+    st.session_state.messages = []
+    st.session_state.connection_alert = None
+    st.session_state.pop("llm_selector", None)  # LLM names differ between workspaces
+
+# Workspace selection: servers, LLM configurations and instructions are per workspace
+workspace_names = {workspace['id']: workspace['name'] for workspace in db_manager.get_workspaces()}
+if st.session_state.workspace_id not in workspace_names:
+    switch_workspace(DEFAULT_WORKSPACE_ID)
+selected_workspace = st.sidebar.selectbox(
+    "🏢 Workspace",
+    options=list(workspace_names),
+    index=list(workspace_names).index(st.session_state.workspace_id),
+    format_func=lambda workspace_id: workspace_names[workspace_id],
+)
+if selected_workspace != st.session_state.workspace_id:
+    switch_workspace(selected_workspace)
+db_manager = db_manager.for_workspace(st.session_state.workspace_id)
+
+with st.sidebar.expander("Manage workspaces"):
+    new_workspace_name = st.text_input("New workspace name", key="new_workspace_name")
+    if st.button("➕ Create Workspace", width='stretch'):
+        if not new_workspace_name.strip():
+            st.error("Please enter a workspace name.")
+        else:
+            new_workspace_id = db_manager.add_workspace(new_workspace_name.strip())
+            if new_workspace_id is None:
+                st.error(f"Workspace '{new_workspace_name.strip()}' already exists.")
+            else:
+                switch_workspace(new_workspace_id)
+                st.rerun()
+    if st.session_state.workspace_id != DEFAULT_WORKSPACE_ID:
+        if st.button(f"🗑️ Delete '{workspace_names[st.session_state.workspace_id]}'", width='stretch'):
+            # Close its sessions first, then remove its servers, LLMs and instructions
+            workspace_agents.evict(st.session_state.workspace_id)
+            if db_manager.delete_workspace(st.session_state.workspace_id):
+                switch_workspace(DEFAULT_WORKSPACE_ID)
+                st.rerun()
+            else:
+                st.error("Failed to delete the workspace.")
+
 # Get available LLM configurations for the dropdown
 llm_configs = db_manager.get_llm_configs()
 llm_options = {config['name']: config for config in llm_configs} if llm_configs else {}
 
-async def run_agent(agent: MCPAgent, prompt: str, chat_history, llm_config):
+# The workspace's warmer; opening it starts warming its default LLM agent
+agent_warmer = workspace_agents.warmer(st.session_state.workspace_id, llm_configs[0] if llm_configs else None)
+# Start warming once the first LLM configuration has been added
+if agent_warmer.status['state'] == 'idle' and llm_configs:
+    agent_warmer.start(llm_configs[0])
+
+def current_warmer() -> AgentWarmer:
+    """The workspace's warmer, fetched again if another session evicted it during this run."""
+    global agent_warmer
+    if agent_warmer.closed:
+        agent_warmer = workspace_agents.warmer(st.session_state.workspace_id, llm_configs[0] if llm_configs else None)
+    return agent_warmer
+
+@st.fragment(run_every=1)
+def show_warmup_status():
+    """Show background warm-up progress, refreshed every second."""
+    status = agent_warmer.status
+    if status['state'] == 'warming':
+        st.progress(status['progress'], text=f"🔥 Warming up: {status['stage']}")
+    elif status['state'] == 'reloading':
+        st.progress(status['progress'], text=f"🔄 {status['stage']}")
+    elif status['state'] == 'ready':
+        elapsed = (status['finished_at'] or 0) - (status['started_at'] or 0)
+        st.caption(f"✅ Agent ready (warmed up in {elapsed:.1f}s)")
+    elif status['state'] == 'failed':
+        st.caption(f"⚠️ Warm-up failed: {status['error']}")
+    else:
+        st.caption(f"Warm-up: {status['stage']}")
+
+with st.sidebar:
+    show_warmup_status()
+
+async def run_agent(agent: Optional[MCPAgent], prompt: str, chat_history, llm_config):
     """Run the MCP agent with the given prompt and chat history."""
     try:
-        # Initialize the agent with the LLM configuration
-        await agent.initialize_agent(llm_config)
+        # Use the pre-warmed agent when available, otherwise initialize one for this LLM
+        if agent is None:
+            agent = MCPAgent(db_manager)
+            await agent.initialize_agent(llm_config)
         response = await agent.execute(prompt, chat_history)
         
         # Check if there were connection errors and set alert
@@ -119,8 +211,6 @@ if st.session_state.current_page == "Chat":
             
             if selected_llm:
                 try:
-                    # Initialize the MCP agent
-                    agent = MCPAgent()
                     # Format chat history for the agent
                     chat_history = []
                     for msg in st.session_state.messages[:-1]:  # Exclude the current message
@@ -129,8 +219,17 @@ if st.session_state.current_page == "Chat":
                         else:
                             chat_history.append(("ai", msg["content"]))
                     
-                    # Run the agent
-                    full_response = asyncio.run(run_agent(agent, prompt, chat_history, selected_llm))
+                    def run_turn(warmer: AgentWarmer) -> str:
+                        # Reuse the pre-warmed agent if it was built for the selected LLM, and run it
+                        # on the warm-up loop, which owns the persistent MCP sessions
+                        with warmer.lease_agent(selected_llm) as agent:
+                            return warmer.run(run_agent(agent, prompt, chat_history, selected_llm))
+
+                    try:
+                        full_response = run_turn(current_warmer())
+                    except WarmerClosed:
+                        # Evicted by another session between fetching the warmer and starting the turn
+                        full_response = run_turn(current_warmer())
                 except Exception as e:
                     full_response = f"Error occurred: {str(e)}"
                     # Check if the error is related to connection issues
@@ -172,8 +271,8 @@ elif st.session_state.current_page == "Settings":
                     st.rerun()
                 if cols[5].button("🗑️", key=f"delete_server_{server['id']}"):
                     db_manager.delete_mcp_server(server['id'])
-                    # Clear the MCPAgent cache since we deleted a server
-                    MCPAgent.clear_cache()
+                    # Hot-reload so only the deleted server's session is closed
+                    current_warmer().reload_servers()
                     st.success(f"Server '{server['name']}' deleted!")
                     st.rerun()
         else:
@@ -237,11 +336,93 @@ elif st.session_state.current_page == "Settings":
         # Save button
         if st.button("💾 Save Instructions"):
             if db_manager.update_system_instructions(instructions if instructions.strip() else None):
+                # Rebuild the warm agent so its system prompt picks up the new instructions
+                current_warmer().restart()
                 st.success("System instructions saved successfully!")
                 st.rerun()
             else:
                 st.error("Failed to save system instructions.")
 
+        # Earlier revisions (pruned to the most recent MCP_INSTRUCTION_HISTORY_LIMIT)
+        history = db_manager.get_instruction_history()
+        if len(history) > 1:
+            with st.expander(f"🕘 History ({len(history)} revisions)"):
+                for revision in history:
+                    saved_at = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(revision['created_at']))
+                    col1, col2 = st.columns([4, 1])
+                    with col1:
+                        st.caption(f"{saved_at}{' · active' if revision['active'] else ''}")
+                        st.text((revision['content'] or "(empty)")[:300])
+                    with col2:
+                        if not revision['active'] and st.button("Restore", key=f"restore_instruction_{revision['id']}"):
+                            if db_manager.activate_instruction(revision['id']):
+                                current_warmer().restart()
+                                st.rerun()
+                            else:
+                                st.error("Failed to restore these instructions.")
+
+elif st.session_state.current_page == "Diagnostics":
+    st.title("🩺 Diagnostics")
+    st.subheader("Agent Profiling")
+    st.caption("Profile agent start-up and every chat turn with cProfile and tracemalloc. "
+               "Profiling slows turns down noticeably, so only enable it while investigating. "
+               "It can also be enabled at start-up with the MCP_PROFILE_DIR environment variable.")
+
+    profiler = get_profiler()
+    profile_dir = st.text_input("Profile Directory", value=profiler.directory if profiler else DEFAULT_PROFILE_DIR)
+    cols = st.columns(2)
+    keep = cols[0].number_input("Profiles to Keep", min_value=1, max_value=500,
+                                value=profiler.max_artifacts if profiler else 20, step=1)
+    track_allocations = cols[1].checkbox("Track Allocations", value=profiler.track_allocations if profiler else True)
+    enabled = st.toggle("Profile agent turns", value=profiler is not None)
+
+    if enabled and (profiler is None or (profiler.directory, profiler.max_artifacts, profiler.track_allocations)
+                    != (profile_dir, int(keep), track_allocations)):
+        profiler = set_profiling(profile_dir, max_artifacts=int(keep), track_allocations=track_allocations)
+    elif not enabled and profiler is not None:
+        set_profiling(None)
+
+    # Summaries stay readable after profiling is switched off
+    viewer = profiler or TurnProfiler(profile_dir)
+    summaries = viewer.latest_summaries(limit=20)
+    if not summaries:
+        st.info("No profiles recorded yet. Enable profiling and send a chat message.")
+    else:
+        st.dataframe([{
+            "Started": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(summary['started_at'])),
+            "Call": summary['label'],
+            "Detail": summary.get('detail', ''),
+            "Duration (s)": summary['duration_s'],
+            "Peak Memory (KB)": summary.get('peak_memory_kb'),
+        } for summary in summaries], width='stretch', hide_index=True)
+
+        for summary in summaries[:5]:
+            with st.expander(f"{summary['label']} · {summary['duration_s']}s · {summary['id']}"):
+                st.markdown("**Top functions by cumulative time**")
+                st.dataframe(summary.get('top_functions', []), width='stretch', hide_index=True)
+                if summary.get('top_allocations'):
+                    st.markdown("**Top allocation sites**")
+                    st.dataframe(summary['top_allocations'], width='stretch', hide_index=True)
+                if os.path.exists(summary.get('profile_path', '')):
+                    with open(summary['profile_path'], 'rb') as profile_file:
+                        st.download_button("⬇️ Download pstats", profile_file.read(),
+                                           file_name=os.path.basename(summary['profile_path']),
+                                           key=f"download_{summary['id']}")
+
+    st.subheader("Warm Workspaces")
+    st.caption(f"Up to {workspace_agents.max_workspaces} workspaces keep their MCP sessions and agent warm; "
+               f"the least recently used one is closed beyond that, and any idle for more than "
+               f"{workspace_agents.idle_seconds:.0f}s. Set MCP_WORKSPACE_CACHE_SIZE and "
+               f"MCP_WORKSPACE_IDLE_SECONDS to tune this.")
+    st.dataframe([{
+        "Workspace": workspace_names.get(entry['workspace_id'], entry['workspace_id']),
+        "State": entry['state'],
+        "Idle (s)": entry['idle_s'],
+        "Busy": entry['busy'],
+    } for entry in workspace_agents.snapshot()], width='stretch', hide_index=True)
+    st.caption(f"Opened {workspace_agents.stats['opened']} · evicted {workspace_agents.stats['evicted_lru']} "
+               f"(least recently used) and {workspace_agents.stats['evicted_idle']} (idle)")
+
 # Modal for MCP Server Configuration
 if st.session_state.show_mcp_modal:
     with st.expander("MCP Server Configuration", expanded=True):
@@ -281,9 +462,9 @@ if st.session_state.show_mcp_modal:
                 # Transport selection outside the form
                 transport = st.selectbox(
                     "Transport Type",
-                    ["stdio", "streamable_http", "sse"],
+                    ["stdio", "streamable_http", "sse", "inprocess"],
                     key="add_server_transport_selector_modal",
-                    index=["stdio", "streamable_http", "sse"].index(st.session_state.add_server_transport) if st.session_state.add_server_transport in ["stdio", "streamable_http", "sse"] else 0
+                    index=["stdio", "streamable_http", "sse", "inprocess"].index(st.session_state.add_server_transport) if st.session_state.add_server_transport in ["stdio", "streamable_http", "sse", "inprocess"] else 0
                 )
                 # Update session state
                 st.session_state.add_server_transport = transport
@@ -294,12 +475,12 @@ if st.session_state.show_mcp_modal:
                 transport_value = st.session_state.edit_server_data.get('transport', 'stdio')
 
             default_transport_index = 0
-            if transport_value in ["stdio", "streamable_http", "sse"]:
-                default_transport_index = ["stdio", "streamable_http", "sse"].index(transport_value)
+            if transport_value in ["stdio", "streamable_http", "sse", "inprocess"]:
+                default_transport_index = ["stdio", "streamable_http", "sse", "inprocess"].index(transport_value)
 
             transport = st.selectbox(
                 "Transport Type",
-                ["stdio", "streamable_http", "sse"],
+                ["stdio", "streamable_http", "sse", "inprocess"],
                 key="edit_server_transport_selector_modal",
                 index=default_transport_index
             )
@@ -393,6 +574,21 @@ if st.session_state.show_mcp_modal:
                 args = st.text_input("Arguments", placeholder="e.g., arg1,arg2")
                 env = st.text_area("Environment Variables (JSON)", value="", height=100, placeholder='{"AUTH_TOKEN": "your_token"}')
             st.caption(f"URL where the {transport_names[transport]} server is running. Arguments are comma-separated. Environment variables as JSON for auth or headers.")
+        elif transport == "inprocess":
+            st.subheader("In-Process Transport Configuration")
+            # The server target is stored in the command column
+            if st.session_state.show_mcp_modal == "edit" and st.session_state.edit_server_data is not None:
+                command = st.text_input("Server Module", value=st.session_state.edit_server_data.get('command', '') or "")
+                env_value = ""
+                if isinstance(st.session_state.edit_server_data.get('env'), dict):
+                    env_value = json.dumps(st.session_state.edit_server_data['env'], indent=2)
+                env = st.text_area("Environment Variables (JSON)", value=env_value, height=100)
+            else:
+                command = st.text_input("Server Module", placeholder="e.g., mcp_servers/calculator.py or my_package.server:mcp")
+                env = st.text_area("Environment Variables (JSON)", value="", height=100, placeholder='{"API_KEY": "your_key"}')
+            st.caption("Python file or module whose FastMCP object (named `mcp` unless given after a colon) is run "
+                       "inside the app process. Only use this for trusted code: the server shares the app's process "
+                       "and environment, and environment variables set here apply to the whole app.")
 
         # Enabled checkbox
         enabled_default = True
@@ -419,6 +615,8 @@ if st.session_state.show_mcp_modal:
                     if temp_args:
                         temp_config[temp_name]["args"] = temp_args
                 # No env for test connection currently
+            elif transport == "inprocess":
+                temp_config[temp_name]["target"] = command
             elif transport in ["streamable_http", "sse"]:
                 if url:
                     temp_config[temp_name]["url"] = url
@@ -430,6 +628,8 @@ if st.session_state.show_mcp_modal:
 
             # Test the connection to this specific server
             try:
+                # Settings-only dependency: the MCP adapters are imported when first needed
+                from mcp_client.manager import MCPManager
                 test_manager = MCPManager(temp_config)
                 status, details = asyncio.run(test_manager.test_server_connection(temp_name))
                 if status == "success":
@@ -490,8 +690,8 @@ if st.session_state.show_mcp_modal:
 
                     if db_manager.add_mcp_server(name, transport, command_param, args_param, env_param, url_param, description_param):
                         st.success(f"Server '{name}' added successfully!")
-                        # Clear the MCPAgent cache since we added a new server
-                        MCPAgent.clear_cache()
+                        # Hot-reload so only the new server is opened
+                        current_warmer().reload_servers()
                         # Reset session state
                         st.session_state.add_server_transport = "stdio"
                         st.session_state.show_mcp_modal = False
@@ -526,8 +726,8 @@ if st.session_state.show_mcp_modal:
                         enabled=enabled
                     ):
                         st.success(f"Server '{name}' updated successfully!")
-                        # Clear the MCPAgent cache since we updated a server
-                        MCPAgent.clear_cache()
+                        # Hot-reload so only the edited server is reopened
+                        current_warmer().reload_servers()
                         st.session_state.show_mcp_modal = False
                         st.session_state.edit_server_data = None
                         st.rerun()  # Refresh to show updated list
@@ -590,6 +790,41 @@ if st.session_state.show_llm_modal:
                 else:
                     base_url = st.text_input("Base URL", value=base_url_value)
             
+            # Routing: ordered fallbacks and optional hedging
+            current_config = st.session_state.edit_config_data if st.session_state.show_llm_modal == "edit" else None
+            other_config_names = [c['name'] for c in db_manager.get_llm_configs(enabled_only=False)
+                                  if current_config is None or c['id'] != current_config['id']]
+            fallbacks = st.multiselect(
+                "Fallback Configurations",
+                options=other_config_names,
+                default=[n for n in ((current_config or {}).get('fallbacks') or []) if n in other_config_names],
+                help="Tried in this order when this configuration fails or is unhealthy."
+            )
+            hedge_delay_ms = st.number_input(
+                "Hedge After (ms)",
+                min_value=0,
+                value=int((current_config or {}).get('hedge_delay_ms') or 0),
+                step=100,
+                help="If no first token arrives within this delay, also ask the next fallback and use "
+                     "whichever answers first. 0 disables hedging."
+            )
+            
+            # Client-side rate limits, shared by every agent in this process
+            rate_cols = st.columns(2)
+            rpm_limit = rate_cols[0].number_input(
+                "Requests / Minute",
+                min_value=0,
+                value=int((current_config or {}).get('rpm_limit') or 0),
+                help="Queue requests above this rate instead of hitting provider 429s. 0 means no limit."
+            )
+            tpm_limit = rate_cols[1].number_input(
+                "Tokens / Minute",
+                min_value=0,
+                value=int((current_config or {}).get('tpm_limit') or 0),
+                step=1000,
+                help="Approximate prompt tokens per minute. 0 means no limit."
+            )
+            
             # Enabled checkbox
             enabled_default = True
             if st.session_state.show_llm_modal == "edit" and st.session_state.edit_config_data is not None:
@@ -609,7 +844,9 @@ if st.session_state.show_llm_modal:
                 base_url_param = base_url if base_url else None
                 
                 if st.session_state.show_llm_modal == "add":
-                    if db_manager.add_llm_config(name, provider, api_key, model_param, base_url_param):
+                    if db_manager.add_llm_config(name, provider, api_key, model_param, base_url_param,
+                                                 fallbacks=fallbacks, hedge_delay_ms=hedge_delay_ms or None,
+                                                 rpm_limit=rpm_limit or None, tpm_limit=tpm_limit or None):
                         st.success(f"LLM configuration '{name}' added successfully!")
                         st.session_state.show_llm_modal = False
                         st.rerun()  # Refresh to show updated list
@@ -624,7 +861,11 @@ if st.session_state.show_llm_modal:
                         api_key=api_key,
                         model=model_param,
                         base_url=base_url_param,
-                        enabled=enabled
+                        enabled=enabled,
+                        fallbacks=fallbacks,
+                        hedge_delay_ms=hedge_delay_ms or None,
+                        rpm_limit=rpm_limit or None,
+                        tpm_limit=tpm_limit or None
                     ):
                         st.success(f"Configuration '{name}' updated successfully!")
                         st.session_state.show_llm_modal = False
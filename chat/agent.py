@@ -1,38 +1,88 @@
-from langchain.agents import create_agent
-from langchain_openai import ChatOpenAI
-from mcp_client.manager import MCPManager
-from mcp_servers import fetch_mcp_servers_as_config
-from chat.callbacks import ToolValidationCallback
-from pydantic import SecretStr
+import asyncio
+import hashlib
+import json
 import os
-from typing import List, Dict, Any, Optional, cast
+import sys
+from typing import TYPE_CHECKING, Awaitable, Callable, List, Dict, Any, Optional, cast
 from dotenv import load_dotenv
 from database import DatabaseManager
+from mcp_servers import fetch_mcp_servers_as_config
+from chat.profiling import profile_call
+from chat.response_cache import ResponseCache, is_non_idempotent
+
+# LangChain, the provider SDKs and the MCP adapters take seconds to import, so they are
+# imported where first used; importing this module (on every app start) stays cheap.
+if TYPE_CHECKING:
+    from chat.callbacks import ToolValidationCallback
+    from chat.tracing import TraceRecorder
 
 load_dotenv()
 
+# Start of each message ``MCPAgent.execute`` returns in place of a reply when a turn fails
+ERROR_RESPONSE_PREFIXES = (
+    "Error executing agent",
+    "⚠️ The LLM provider is rate limiting",
+    "⚠️ The AI attempted to use tools",
+)
+
+def is_error_response(response: str) -> bool:
+    """Whether an ``execute`` result reports a failed turn rather than the model's reply."""
+    return response.startswith(ERROR_RESPONSE_PREFIXES)
+
 class MCPAgent:
     """Agent that can interact with multiple MCP servers using LangChain."""
     
-    # Class variables to cache tools and resources
-    _cached_tools = None
-    _cached_resources = None
-    _cached_client = None
-    _cached_server_info = None
+    # Discovered tools, resources, server info and the client whose sessions the tools
+    # are bound to, per workspace id
+    _workspace_caches: Dict[int, Dict[str, Any]] = {}
+    # (workspace id or None for all, callable) pairs notified whenever a cache is cleared
+    # (e.g. the background warm-up)
+    _cache_listeners: List[tuple] = []
+    # Rendered system prompts by fingerprint of their inputs
+    _prompt_cache: Dict[str, str] = {}
+    _prompt_cache_size = 32
     
-    def __init__(self):
+    def __init__(self, db_manager: Optional[DatabaseManager] = None):
+        from chat.callbacks import UsageMetricsCallback
+        from chat.tracing import trace_writer_from_env
+        from mcp_client.manager import MCPManager
+
         print("MCPAgent: Initializing with server config...")
-        server_config = fetch_mcp_servers_as_config()
+        self.db_manager = db_manager or DatabaseManager()
+        self.workspace_id = self.db_manager.workspace_id
+        server_config = fetch_mcp_servers_as_config(self.db_manager)
         print(f"MCPAgent: Server config: {server_config}")
         self.client = MCPManager(cast(Dict[str, Any], server_config))
         self.agent = None
         self.tools = []
+        self.llm_config = None
+        self.prompt_fingerprint = None
+        self.usage_totals = UsageMetricsCallback.empty_totals()  # Token usage across all turns
+        self.last_usage = None  # Token usage of the most recent turn
+        self.response_cache = ResponseCache.from_env(self.db_manager)
+        self.non_idempotent_tools = set()  # Tool names whose turns are never cached
+        self.trace_writer = trace_writer_from_env()  # Set MCP_TRACE_DIR to record turns
+        self.active_turns = 0  # execute() calls in flight; sessions must stay open until it is 0
     
-    async def initialize_agent(self, llm_config: Dict[str, Any]):
-        """Initialize the agent with the specified LLM configuration and MCP tools."""
+    async def initialize_agent(self, llm_config: Dict[str, Any],
+                               on_progress: Optional[Callable[[str, float], None]] = None):
+        """Initialize the agent with the specified LLM configuration and MCP tools.
+
+        Args:
+            llm_config: LLM configuration row from the database.
+            on_progress: Optional callback receiving (stage description, fraction complete).
+        """
+        async with profile_call("initialize_agent", str(llm_config.get('name') or llm_config.get('provider'))):
+            return await self._initialize_agent(llm_config, on_progress)
+
+    async def _initialize_agent(self, llm_config: Dict[str, Any],
+                                on_progress: Optional[Callable[[str, float], None]] = None):
         print(f"MCPAgent: Initializing agent with LLM config: {llm_config}")
+        report = on_progress or (lambda stage, fraction: None)
+        report("Reading server configuration", 0.05)
         # Create chat model based on configuration
         chat_model = self._create_chat_model(llm_config)
+        self.llm_config = llm_config
         
         # Get tools from MCP servers with individual failure handling
         self.tools = []
@@ -42,22 +92,28 @@ class MCPAgent:
         server_info = {}
         
         # Get server information from database for descriptions
-        db_manager = DatabaseManager()
+        db_manager = self.db_manager
         db_servers = db_manager.get_mcp_servers(enabled_only=True)
         server_descriptions = {server['name']: server['description'] for server in db_servers}
         
-        # Check if we have cached tools and resources
-        if (MCPAgent._cached_tools is not None and 
-            MCPAgent._cached_resources is not None and 
-            MCPAgent._cached_server_info is not None):
-            print("MCPAgent: Using cached tools, resources, and server info")
-            self.tools = MCPAgent._cached_tools
-            resources = MCPAgent._cached_resources
-            server_info = MCPAgent._cached_server_info
+        # Check if we have cached tools and resources for this workspace
+        cached = MCPAgent._workspace_caches.get(self.workspace_id)
+        if cached is not None:
+            print(f"MCPAgent: Using cached tools, resources, and server info for workspace {self.workspace_id}")
+            self.tools = cached['tools']
+            resources = cached['resources']
+            server_info = cached['server_info']
+            # Cached tools are bound to the sessions of the client that loaded them
+            self.client = cached['client']
         else:
             try:
                 print("MCPAgent: Fetching tools from MCP manager with failure handling...")
-                result = await self.client.get_tools_with_failures()
+                report("Connecting to MCP servers", 0.1)
+
+                def server_progress(server_name: str, done: int, total: int):
+                    report(f"Discovered tools from '{server_name}' ({done}/{total})", 0.1 + 0.7 * done / total)
+
+                result = await self.client.get_tools_with_failures(on_progress=server_progress)
                 if len(result) == 3:
                     self.tools, failed_servers, resources = result
                 else:
@@ -67,22 +123,10 @@ class MCPAgent:
                 print(f"MCPAgent: Successfully loaded {len(self.tools)} MCP tools")
                 
                 # Create server information with tools mapping
-                server_info = {}
-                # Group tools by server (this is a simplified approach)
-                for server_name in self.client.client.connections.keys():
-                    if server_name not in failed_servers:
-                        # Get tools for this server
-                        server_tools = [tool for tool in self.tools if hasattr(tool, 'name')]
-                        server_info[server_name] = {
-                            'description': server_descriptions.get(server_name, ''),
-                            'tools': server_tools
-                        }
+                server_info = self._build_server_info(failed_servers, server_descriptions)
                 
                 # Cache the tools, resources, and server info for future use
-                MCPAgent._cached_tools = self.tools
-                MCPAgent._cached_resources = resources
-                MCPAgent._cached_server_info = server_info
-                MCPAgent._cached_client = self.client
+                self._store_cache(resources, server_info)
 
                 # Convert failed servers to connection errors for backward compatibility
                 for server_name, error_msg in failed_servers.items():
@@ -99,25 +143,58 @@ class MCPAgent:
                 if "Connection closed" in error_msg or "connection closed" in error_msg.lower():
                     connection_errors.append(f"Connection closed error: {error_msg}")
 
+        report("Building agent", 0.85)
+
         # Create the tool validation callback
+        from chat.callbacks import ToolValidationCallback
         self.validation_callback = ToolValidationCallback()
 
+        self.chat_model = chat_model
+        self.server_info = server_info
+        self.resources = resources
+        self.agent = self._create_langchain_agent(chat_model, self.tools, server_info, resources)
+
+        # Store connection errors for later use
+        self.connection_errors = connection_errors
+
+        report("Ready", 1.0)
+        return self
+
+    def _build_server_info(self, failed_servers: Dict[str, str],
+                           server_descriptions: Dict[str, str]) -> Dict[str, Any]:
+        """Build the server name -> description/tool names mapping used in the system prompt."""
+        server_info = {}
+        for server_name in self.client.client.connections.keys():
+            if server_name not in failed_servers:
+                server_info[server_name] = {
+                    'description': server_descriptions.get(server_name, ''),
+                    'tools': sorted(self.client.registry.tools_of(server_name))
+                }
+        return server_info
+
+    def _create_langchain_agent(self, chat_model, tools: List[Any],
+                                server_info: Dict[str, Any], resources: List[Any]):
+        """Create the LangChain agent for the given model, tools and server information."""
         # Get system instructions from database
-        system_instructions = db_manager.get_system_instructions()
+        system_instructions = self.db_manager.get_system_instructions()
         
         # Create enhanced system prompt with server and tool information
         enhanced_system_prompt = self._create_enhanced_system_prompt(
             system_instructions, 
             server_info, 
-            self.tools, 
+            tools, 
             resources
         )
         
         # Create LangChain agent with tools and callbacks
         print("MCPAgent: Creating LangChain agent...")
+        self.non_idempotent_tools = {tool.name for tool in tools if is_non_idempotent(tool, self._original_tool_name(tool))}
+
+        # Tool definitions are sent with every request too; keep their order stable
+        ordered_tools = sorted(tools, key=lambda tool: getattr(tool, 'name', '')) if tools else None
         agent_kwargs = {
-            "model": chat_model,
-            "tools": self.tools if self.tools else None,
+            "model": self._with_prompt_cache_key(chat_model, self.prompt_fingerprint),
+            "tools": ordered_tools,
             "debug": True
         }
         
@@ -125,20 +202,108 @@ class MCPAgent:
         if enhanced_system_prompt:
             agent_kwargs["system_prompt"] = enhanced_system_prompt
             
-        self.agent = create_agent(**agent_kwargs)
+        from langchain.agents import create_agent
+        agent = create_agent(**agent_kwargs)
 
         print("MCPAgent: Agent created successfully")
+        return agent
 
-        # Store connection errors for later use
-        self.connection_errors = connection_errors
+    async def reload_servers(self, wait_idle: Optional[Callable[[], Awaitable[None]]] = None) -> Dict[str, Any]:
+        """Apply MCP server configuration changes without tearing down unaffected sessions.
 
-        return self
+        Compares the current configuration with ``fetch_mcp_servers_as_config()``, lets the
+        manager close only removed/changed servers and open only added/changed ones, then
+        atomically swaps the tool set and agent used for new turns. Turns already running
+        keep the previous agent until they finish: removed/changed servers' sessions are
+        closed once ``wait_idle`` returns (by default, once ``active_turns`` drops to 0).
+
+        Returns:
+            dict: The diff reported by ``MCPManager.refresh``.
+        """
+        if not self.agent:
+            raise ValueError("Agent not initialized. Call initialize_agent first.")
+
+        new_config = cast(Dict[str, Any], fetch_mcp_servers_as_config(self.db_manager))
+        server_descriptions = {server['name']: server['description']
+                               for server in self.db_manager.get_mcp_servers(enabled_only=True)}
+
+        def swap(diff: Dict[str, Any]):
+            # Everything here is synchronous, so no other turn can observe a half-updated agent
+            tools = self.client.loaded_tools()
+            resources = self.client.loaded_resources()
+            failed_servers = dict(self.client.failed_servers)
+            previous_tools = self.tools
+            self.tools = tools
+            server_info = self._build_server_info(failed_servers, server_descriptions)
+            try:
+                agent = self._create_langchain_agent(self.chat_model, tools, server_info, resources)
+            except Exception:
+                self.tools = previous_tools
+                raise
+            self.agent = agent
+            self.server_info = server_info
+            self.resources = resources
+            self.connection_errors = [f"Server '{name}' failed: {error}" for name, error in failed_servers.items()]
+
+            # Keep the workspace cache in sync so new MCPAgent instances see the same tools
+            self._store_cache(resources, server_info)
+
+        diff = await self.client.refresh(new_config, on_ready=swap, wait_idle=wait_idle or self.wait_idle)
+        print(f"MCPAgent: Reloaded servers, now using {len(self.tools)} tools")
+        return diff
     
+    def _store_cache(self, resources: List[Any], server_info: Dict[str, Any]):
+        MCPAgent._workspace_caches[self.workspace_id] = {
+            'tools': self.tools,
+            'resources': resources,
+            'server_info': server_info,
+            'client': self.client,
+        }
+
+    def _original_tool_name(self, tool: Any) -> Optional[str]:
+        """Name the owning server uses for a tool that may have been namespaced."""
+        entry = self.client.registry.entry(getattr(tool, 'name', None))
+        return entry['original_name'] if entry else None
+
+    @staticmethod
+    def _prompt_fingerprint(base_instructions: Optional[str], server_info: Dict[str, Any],
+                            tools: List[Any], resources: List[Any]) -> str:
+        """Stable hash of everything the system prompt is built from."""
+        material = {
+            'instructions': base_instructions or '',
+            'servers': sorted((name, info.get('description') or '', sorted(info.get('tools') or []))
+                              for name, info in server_info.items()),
+            'tools': sorted((tool.name, tool.description or '') for tool in tools
+                            if hasattr(tool, 'name') and hasattr(tool, 'description')),
+            'resources': len(resources),
+        }
+        return hashlib.sha256(json.dumps(material, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
     def _create_enhanced_system_prompt(self, base_instructions: Optional[str], 
                                      server_info: Dict[str, Any], 
                                      tools: List[Any], 
                                      resources: List[Any]) -> str:
-        """Create an enhanced system prompt that includes server descriptions and tool information."""
+        """Create an enhanced system prompt that includes server descriptions and tool information.
+
+        The prompt is memoized per (instructions, toolset) fingerprint and built in a fixed,
+        sorted order so the same configuration always yields byte-identical text, which lets
+        provider-side prompt caching reuse the prefix across turns.
+        """
+        fingerprint = self._prompt_fingerprint(base_instructions, server_info, tools, resources)
+        self.prompt_fingerprint = fingerprint
+        prompt = MCPAgent._prompt_cache.get(fingerprint)
+        if prompt is None:
+            prompt = self._render_system_prompt(base_instructions, server_info, tools, resources)
+            if len(MCPAgent._prompt_cache) >= MCPAgent._prompt_cache_size:
+                MCPAgent._prompt_cache.pop(next(iter(MCPAgent._prompt_cache)))
+            MCPAgent._prompt_cache[fingerprint] = prompt
+        return prompt
+
+    def _render_system_prompt(self, base_instructions: Optional[str],
+                              server_info: Dict[str, Any],
+                              tools: List[Any],
+                              resources: List[Any]) -> str:
+        """Build the system prompt text, most stable sections first."""
         prompt_parts = []
         
         # Add base instructions if available
@@ -147,11 +312,18 @@ class MCPAgent:
         else:
             prompt_parts.append("You are a helpful AI assistant with access to various tools.")
         
+        # Add guidance on tool selection (static, so it belongs in the shared prefix)
+        prompt_parts.append("\nIMPORTANT GUIDELINES:")
+        prompt_parts.append("- Choose the most appropriate tool based on the server it belongs to")
+        prompt_parts.append("- Only use tools that are relevant to the user's request")
+        prompt_parts.append("- If you're unsure which tool to use, ask for clarification")
+        prompt_parts.append("- Provide clear explanations for your actions")
+        
         # Add server information
         if server_info:
             prompt_parts.append("\nAVAILABLE TOOL SERVERS:")
-            for server_name, info in server_info.items():
-                description = info.get('description', '')
+            for server_name in sorted(server_info):
+                description = server_info[server_name].get('description', '')
                 if description:
                     prompt_parts.append(f"- {server_name}: {description}")
                 else:
@@ -162,9 +334,14 @@ class MCPAgent:
             prompt_parts.append("\nAVAILABLE TOOLS (use these appropriately based on the server they belong to):")
             # Limit the number of tools to avoid context window issues
             max_tools_to_show = 50  # Adjust based on model context window
-            for i, tool in enumerate(tools[:max_tools_to_show]):
-                if hasattr(tool, 'name') and hasattr(tool, 'description'):
-                    prompt_parts.append(f"- {tool.name}: {tool.description}")
+            described_tools = sorted((tool for tool in tools if hasattr(tool, 'name') and hasattr(tool, 'description')),
+                                     key=lambda tool: tool.name)
+            tool_servers = {tool_name: server_name for server_name, info in server_info.items()
+                            for tool_name in info.get('tools') or []}
+            for tool in described_tools[:max_tools_to_show]:
+                server_name = tool_servers.get(tool.name)
+                owner = f" [{server_name}]" if server_name else ""
+                prompt_parts.append(f"- {tool.name}{owner}: {tool.description}")
             
             # If we have more tools than the limit, indicate that
             if len(tools) > max_tools_to_show:
@@ -174,39 +351,52 @@ class MCPAgent:
         if resources:
             prompt_parts.append(f"\nAVAILABLE RESOURCES: {len(resources)} resources available.")
         
-        # Add guidance on tool selection
-        prompt_parts.append("\nIMPORTANT GUIDELINES:")
-        prompt_parts.append("- Choose the most appropriate tool based on the server it belongs to")
-        prompt_parts.append("- Only use tools that are relevant to the user's request")
-        prompt_parts.append("- If you're unsure which tool to use, ask for clarification")
-        prompt_parts.append("- Provide clear explanations for your actions")
-        
         return "\n".join(prompt_parts)
+
+    def _with_prompt_cache_key(self, chat_model, fingerprint: Optional[str]):
+        """Route requests sharing a system prompt to the same OpenAI prompt cache."""
+        from langchain_openai import ChatOpenAI
+        from chat.routing import RoutedChatModel
+        if isinstance(chat_model, RoutedChatModel):
+            models = [self._with_prompt_cache_key(model, fingerprint) for model in chat_model.models]
+            return chat_model.model_copy(update={'models': models})
+        if not fingerprint or not isinstance(chat_model, ChatOpenAI) \
+                or not (chat_model.openai_api_base or '').startswith('https://api.openai.com'):
+            return chat_model
+        model_kwargs = {**chat_model.model_kwargs, 'prompt_cache_key': f"mcp-agent-{fingerprint}"}
+        return chat_model.model_copy(update={'model_kwargs': model_kwargs})
     
     def _create_chat_model(self, config: Dict[str, Any]):
-        """Create a chat model based on the configuration."""
-        # print(f"MCPAgent: Creating chat model with config: {config}")
-        # Map provider to model class
-        if config['provider'] == 'openai':
-            return ChatOpenAI(
-                model=config['model'] or "gpt-3.5-turbo",
-                api_key=SecretStr(config['api_key']) if config['api_key'] else None,
-                base_url=config['base_url'] or "https://api.openai.com/v1"
-            )
-        elif config['provider'] == 'openrouter':
-            return ChatOpenAI(
-                model=config['model'] or "openai/gpt-3.5-turbo",
-                api_key=SecretStr(config['api_key']) if config['api_key'] else None,
-                base_url=config['base_url'] or "https://openrouter.ai/api/v1"
-            )
-        else:
-            raise ValueError(f"Unsupported provider: {config['provider']}")
+        """Create the chat model for a configuration, routed over its fallbacks if it has any."""
+        from chat.llm import create_routed_chat_model
+        return create_routed_chat_model(config, self.db_manager)
     
+    def _write_trace(self, recorder: Optional["TraceRecorder"], result: Optional[str] = None,
+                     error: Optional[BaseException] = None):
+        """Append a finished turn to the trace file; tracing problems never fail the turn."""
+        if recorder is None or self.trace_writer is None:
+            return
+        try:
+            path = self.trace_writer.write(recorder.finish(result, error))
+            print(f"MCPAgent: Trace written to {path}")
+        except Exception as e:
+            print(f"MCPAgent: Failed to write trace: {e}")
+
     async def execute(self, input_text: str, chat_history: Optional[List[tuple]] = None) -> str:
         """Execute the agent with the given input and chat history."""
+        self.active_turns += 1
+        try:
+            async with profile_call("execute", input_text[:80]):
+                return await self._execute(input_text, chat_history)
+        finally:
+            self.active_turns -= 1
+
+    async def _execute(self, input_text: str, chat_history: Optional[List[tuple]] = None) -> str:
         if not self.agent:
             raise ValueError("Agent not initialized. Call initialize_agent first.")
         
+        validation_callback = None
+        trace_recorder = None
         try:
             print(f"MCPAgent: Executing agent with input: {input_text}")
             # Prepare messages with chat history
@@ -226,48 +416,66 @@ class MCPAgent:
             messages.append({"role": "user", "content": input_text})
             
             print(f"MCPAgent: Full messages: {messages}")
-            # Clear previous validation failures
-            self.validation_callback.clear_failures()
+            cache_key = None
+            if self.response_cache.enabled:
+                cache_key = self.response_cache.make_key(self.llm_config, self.prompt_fingerprint,
+                                                         chat_history, input_text)
+                cached_response = self.response_cache.get(cache_key)
+                if cached_response is not None:
+                    print("MCPAgent: Returning cached response")
+                    return self._with_connection_note(cached_response)
+
+            # Use a fresh validation callback per call so concurrent turns on a shared
+            # (e.g. pre-warmed) agent don't clear or read each other's failures
+            from chat.callbacks import ToolValidationCallback, UsageMetricsCallback
+            from chat.tracing import TraceRecorder, trace_max_chars
+            validation_callback = ToolValidationCallback()
+            self.validation_callback = validation_callback
+            usage_callback = UsageMetricsCallback()
+            callbacks = [validation_callback, usage_callback]
+            if self.trace_writer is not None:
+                trace_recorder = TraceRecorder(input_text, chat_history, self.llm_config,
+                                               self.prompt_fingerprint, trace_max_chars())
+                callbacks.append(trace_recorder)
 
             # Execute the agent with the messages and callbacks
             # In LangChain 1.0.0, we pass messages directly and include callbacks
-            response = await self.agent.ainvoke(
-                {"messages": messages},
-                {"callbacks": [self.validation_callback]}
-            )
+            try:
+                response = await self.agent.ainvoke(
+                    {"messages": messages},
+                    {"callbacks": callbacks}
+                )
+            finally:
+                self._record_usage(usage_callback.totals)
 
             # Check for validation failures that may need user input
-            validation_failures = self.validation_callback.get_tool_call_failures()
-            if validation_failures:
-                print(f"MCPAgent: Validation failures detected: {validation_failures}")
-                # Return a special response indicating missing parameters
-                missing_params_info = []
-                for run_id, failure_info in validation_failures.items():
-                    missing_params = failure_info.get('missing_params', [])
-                    tool_name = failure_info.get('tool_name', 'Unknown tool')
-                    if missing_params:
-                        missing_params_info.append(f"Tool '{tool_name}' needs: {', '.join(missing_params)}")
-
-                if missing_params_info:
-                    error_msg = f"⚠️ The AI attempted to use tools but couldn't provide required parameters. Please provide the missing information:\n" + "\n".join(missing_params_info)
-                    error_msg += "\n\n💡 Tip: Try asking more specifically, e.g., 'What's the weather in Bangalore?' instead of just 'What's the weather?'"
-                    return error_msg
+            validation_message = self._validation_failure_message(validation_callback)
+            if validation_message:
+                self._write_trace(trace_recorder, validation_message)
+                return validation_message
 
             # Extract the output content from the response
             result = self._extract_content(response)
             print(f"MCPAgent: Execution result: {result}")
+            self._write_trace(trace_recorder, result)
 
-            # If we had connection errors, append a detailed note to the result
-            if hasattr(self, 'connection_errors') and self.connection_errors:
-                failed_server_names = [error.split("'")[1] for error in self.connection_errors if "'" in error]
-                if failed_server_names:
-                    error_note = f"\n\n⚠️ Note: The following MCP servers failed to load: {', '.join(failed_server_names)}. Proceeding with available tools only."
-                else:
-                    error_note = "\n\n⚠️ Note: Some MCP server connections encountered issues. Proceeding with available tools only."
-                result += error_note
+            if cache_key is not None and not validation_callback.get_tool_call_failures():
+                self.response_cache.put(cache_key, result, validation_callback.tools_called,
+                                        self.non_idempotent_tools)
 
-            return result
+            return self._with_connection_note(result)
         except Exception as e:
+            self._write_trace(trace_recorder, error=e)
+            # Argument validation errors abort the run before any tool is dispatched
+            validation_message = self._validation_failure_message(validation_callback)
+            if validation_message:
+                return validation_message
+
+            openai = sys.modules.get('openai')  # Only loaded once an OpenAI-compatible model was built
+            if openai is not None and isinstance(e, openai.RateLimitError):
+                print(f"MCPAgent: Provider rate limit persisted after retries: {e}")
+                return "⚠️ The LLM provider is rate limiting requests right now. Please wait a moment and try again."
+
             print(f"MCPAgent: Error executing agent: {e}")
             import traceback
             traceback.print_exc()
@@ -290,6 +498,57 @@ class MCPAgent:
             
             return f"Error executing agent: {str(e)}"
     
+    async def wait_idle(self, poll_interval: float = 0.1):
+        """Wait until no ``execute`` call is running on this agent."""
+        while self.active_turns > 0:
+            await asyncio.sleep(poll_interval)
+
+    def _with_connection_note(self, result: str) -> str:
+        """Append a note about MCP servers that failed to load, if any."""
+        # If we had connection errors, append a detailed note to the result
+        if hasattr(self, 'connection_errors') and self.connection_errors:
+            failed_server_names = [error.split("'")[1] for error in self.connection_errors if "'" in error]
+            if failed_server_names:
+                error_note = f"\n\n⚠️ Note: The following MCP servers failed to load: {', '.join(failed_server_names)}. Proceeding with available tools only."
+            else:
+                error_note = "\n\n⚠️ Note: Some MCP server connections encountered issues. Proceeding with available tools only."
+            result += error_note
+        return result
+
+    def _record_usage(self, usage: Dict[str, int]):
+        """Add one turn's token usage to the running totals and log the cache hit rate."""
+        self.last_usage = dict(usage)
+        for key, value in usage.items():
+            self.usage_totals[key] = self.usage_totals.get(key, 0) + value
+        if usage['input_tokens']:
+            print(f"MCPAgent: Token usage: input={usage['input_tokens']} "
+                  f"(cached={usage['cached_input_tokens']}, "
+                  f"{usage['cached_input_tokens'] / usage['input_tokens']:.0%}), "
+                  f"output={usage['output_tokens']}, llm_calls={usage['llm_calls']}")
+
+    def _validation_failure_message(self, validation_callback: Optional["ToolValidationCallback"]) -> Optional[str]:
+        """Describe tool argument validation failures to the user, or None if there were none."""
+        if validation_callback is None:
+            return None
+        validation_failures = validation_callback.get_tool_call_failures()
+        if not validation_failures:
+            return None
+        print(f"MCPAgent: Validation failures detected: {validation_failures}")
+        details = []
+        for failure_info in validation_failures.values():
+            tool_name = failure_info.get('tool_name', 'Unknown tool')
+            missing_params = failure_info.get('missing_params', [])
+            invalid_params = failure_info.get('invalid_params', [])
+            if missing_params:
+                details.append(f"Tool '{tool_name}' needs: {', '.join(missing_params)}")
+            for invalid in invalid_params:
+                details.append(f"Tool '{tool_name}' got an invalid value for {invalid['field']}: {invalid['message']}")
+        if not details:
+            return None
+        error_msg = f"⚠️ The AI attempted to use tools but couldn't provide valid parameters. Please provide the missing information:\n" + "\n".join(details)
+        error_msg += "\n\n💡 Tip: Try asking more specifically, e.g., 'What's the weather in Bangalore?' instead of just 'What's the weather?'"
+        return error_msg
+
     def _extract_content(self, response) -> str:
         """Extract clean content from various response formats."""
         if isinstance(response, str):
@@ -315,9 +574,41 @@ class MCPAgent:
             return str(response)
     
     @classmethod
-    def clear_cache(cls):
-        """Clear the cached tools and resources."""
-        cls._cached_tools = None
-        cls._cached_resources = None
-        cls._cached_server_info = None
-        cls._cached_client = None
\ No newline at end of file
+    def cached_client(cls, workspace_id: int):
+        """The MCP manager whose sessions a workspace's cached tools use, if any."""
+        cached = cls._workspace_caches.get(workspace_id)
+        return cached['client'] if cached else None
+
+    @classmethod
+    def evict_cache(cls, workspace_id: int) -> Optional[Dict[str, Any]]:
+        """Drop a workspace's cache without notifying listeners; returns the evicted entry.
+
+        The caller owns the entry's client and should close its sessions.
+        """
+        return cls._workspace_caches.pop(workspace_id, None)
+
+    @classmethod
+    def clear_cache(cls, workspace_id: Optional[int] = None):
+        """Clear the cached tools and resources of one workspace, or of all of them."""
+        if workspace_id is None:
+            cls._workspace_caches.clear()
+        else:
+            cls._workspace_caches.pop(workspace_id, None)
+        for scope, listener in list(cls._cache_listeners):
+            if workspace_id is not None and scope is not None and scope != workspace_id:
+                continue
+            try:
+                listener()
+            except Exception as e:
+                print(f"MCPAgent: Cache listener failed: {e}")
+
+    @classmethod
+    def add_cache_listener(cls, listener: Callable[[], None], workspace_id: Optional[int] = None):
+        """Register a callable to be notified after the cache of ``workspace_id`` (or any) is cleared."""
+        if (workspace_id, listener) not in cls._cache_listeners:
+            cls._cache_listeners.append((workspace_id, listener))
+
+    @classmethod
+    def remove_cache_listener(cls, listener: Callable[[], None]):
+        """Unregister a cache listener."""
+        cls._cache_listeners = [entry for entry in cls._cache_listeners if entry[1] != listener]
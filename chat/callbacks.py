@@ -1,8 +1,10 @@
 from langchain_core.callbacks import AsyncCallbackHandler
 from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
 from typing import Any, Dict, List, Union
 import asyncio
-import re
+
+from mcp_client.validation import ToolArgumentsError
 
 class StreamPrinter(AsyncCallbackHandler):
     """Callback handler that prints to stdout."""
@@ -27,23 +29,20 @@ class ToolValidationCallback(AsyncCallbackHandler):
         super().__init__()
         self.user_prompt_func = user_prompt_func
         self.tool_call_failures = {}
+        self.tools_called = []  # Names of tools started during the run, in order
+
+    async def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs: Any) -> Any:
+        """Record which tools the run invoked."""
+        self.tools_called.append((serialized or {}).get('name') or kwargs.get('name', 'unknown'))
 
     async def on_tool_error(self, error: BaseException, **kwargs: Any) -> Any:
-        """Handle tool execution errors, particularly validation errors."""
-        error_str = str(error)
-
-        # Check if this is a validation error (missing required fields)
-        if "Field required" in error_str or "missing" in error_str.lower() and ("location" in error_str.lower() or "required" in error_str.lower()):
-            # Extract missing fields from the error message
-            missing_fields = self._extract_missing_fields(error_str)
-            if missing_fields:
-                print(f"ToolValidationCallback: Detected missing parameters: {missing_fields}")
-                print(f"ToolValidationCallback: Full error: {error_str}")
-                self.tool_call_failures[kwargs.get('run_id', 'unknown')] = {
-                    'missing_params': missing_fields,
-                    'error': error_str,
-                    'tool_name': kwargs.get('name', 'unknown')
-                }
+        """Record structured argument validation failures raised before tool dispatch."""
+        if isinstance(error, ToolArgumentsError):
+            print(f"ToolValidationCallback: Detected invalid tool arguments: {error}")
+            self.tool_call_failures[kwargs.get('run_id', 'unknown')] = {
+                **error.to_dict(),
+                'error': str(error),
+            }
 
         # Return the error to continue normal flow - it will be handled upstream
         return error
@@ -55,28 +54,32 @@ class ToolValidationCallback(AsyncCallbackHandler):
             del self.tool_call_failures[run_id]
         return output
 
-    def _extract_missing_fields(self, error_msg: str) -> List[str]:
-        """Extract missing field names from validation error messages."""
-        missing_fields = []
-
-        # Common patterns in validation errors
-        patterns = [
-            r"Field required\s*\n([^']+)'",  # Pydantic style: Field required\nlocation
-            r"missing.*?'([^']+)'",  # missing 'location'
-            r"'([^']+)'\s*\n\s*Field required",  # 'location'\nField required
-            r"Field required.*?field '([^']+)'",  # Field required for field 'location'
-        ]
-
-        for pattern in patterns:
-            matches = re.findall(pattern, error_msg, re.IGNORECASE | re.MULTILINE)
-            missing_fields.extend(matches)
-
-        return list(set(missing_fields))  # Remove duplicates
-
     def get_tool_call_failures(self) -> Dict[str, Any]:
         """Get recorded tool call failures."""
         return self.tool_call_failures
 
     def clear_failures(self):
         """Clear recorded failures."""
-        self.tool_call_failures.clear()
\ No newline at end of file
+        self.tool_call_failures.clear()
+
+class UsageMetricsCallback(AsyncCallbackHandler):
+    """Callback handler that totals token usage, including prompt-cache hits, for one run."""
+
+    def __init__(self):
+        super().__init__()
+        self.totals = self.empty_totals()
+
+    @staticmethod
+    def empty_totals() -> Dict[str, int]:
+        return {'llm_calls': 0, 'input_tokens': 0, 'cached_input_tokens': 0, 'output_tokens': 0}
+
+    async def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        self.totals['llm_calls'] += 1
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, 'message', None), 'usage_metadata', None)
+                if not usage:
+                    continue
+                self.totals['input_tokens'] += usage.get('input_tokens') or 0
+                self.totals['output_tokens'] += usage.get('output_tokens') or 0
+                self.totals['cached_input_tokens'] += (usage.get('input_token_details') or {}).get('cache_read') or 0
@@ -1,93 +1,233 @@
-from langchain.agents import create_agent
-from langchain_openai import ChatOpenAI
-from langchain.messages import HumanMessage, AIMessage
 from dotenv import load_dotenv
 from database import DatabaseManager
-from pydantic import SecretStr
-from typing import Optional
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional, Union
 import os
+import threading
+
+# LangChain and the provider SDKs are imported on first use (see chat/agent.py)
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
 
 load_dotenv()
 
-class LLMWrapper:
-    """LLM wrapper that maintains chat history and integrates with database configurations."""
-    
-    def __init__(self, db_manager: Optional[DatabaseManager] = None):
-        self.db_manager = db_manager or DatabaseManager()
-        self.chat_history = []  # Local array to maintain chat history
-    
-    def get_llm_config(self, config_name: str):
-        """Retrieve LLM configuration by name from database."""
-        configs = self.db_manager.get_llm_configs()
-        for config in configs:
-            if config['name'] == config_name:
-                return config
+def llm_config_key(llm_config: Optional[Dict[str, Any]]) -> Optional[tuple]:
+    """Identity of an LLM configuration, used to decide if a built model or agent can be reused."""
+    if not llm_config:
         return None
-    
-    def create_chat_model(self, config_name: str):
-        """Create a chat model based on the configuration from database."""
-        config = self.get_llm_config(config_name)
-        if not config:
-            raise ValueError(f"LLM configuration '{config_name}' not found")
-        
-        # Map provider to model class
-        if config['provider'] == 'openai':
-            return ChatOpenAI(
-                model=config['model'] or "gpt-3.5-turbo",
-                api_key=SecretStr(config['api_key']) if config['api_key'] else None,
-                base_url=config['base_url'] or "https://api.openai.com/v1"
-            )
-        elif config['provider'] == 'openrouter':
-            return ChatOpenAI(
-                model=config['model'] or "openai/gpt-3.5-turbo",
-                api_key=SecretStr(config['api_key']) if config['api_key'] else None,
-                base_url=config['base_url'] or "https://openrouter.ai/api/v1"
-            )
-        else:
-            raise ValueError(f"Unsupported provider: {config['provider']}")
-    
-    def add_to_history(self, role: str, content: str | list[str | dict]):
-        """Add a message to the chat history."""
+    return tuple(llm_config.get(field) for field in ('id', 'name', 'provider', 'model', 'api_key', 'base_url',
+                                                     'hedge_delay_ms', 'rpm_limit', 'tpm_limit')) \
+        + (tuple(llm_config.get('fallbacks') or ()),)
+
+def create_chat_model(config: Dict[str, Any]) -> "ChatOpenAI":
+    """Create a chat model for an LLM configuration row."""
+    from langchain_openai import ChatOpenAI
+    from pydantic import SecretStr
+    from chat.rate_limit import rate_limited_http_clients
+
+    # Map provider to model class
+    if config['provider'] == 'openai':
+        return ChatOpenAI(
+            model=config['model'] or "gpt-3.5-turbo",
+            api_key=SecretStr(config['api_key']) if config['api_key'] else None,
+            base_url=config['base_url'] or "https://api.openai.com/v1",
+            **rate_limited_http_clients(config)
+        )
+    elif config['provider'] == 'openrouter':
+        return ChatOpenAI(
+            model=config['model'] or "openai/gpt-3.5-turbo",
+            api_key=SecretStr(config['api_key']) if config['api_key'] else None,
+            base_url=config['base_url'] or "https://openrouter.ai/api/v1",
+            **rate_limited_http_clients(config)
+        )
+    else:
+        raise ValueError(f"Unsupported provider: {config['provider']}")
+
+def routing_chain(config: Dict[str, Any], db_manager: Optional[DatabaseManager] = None) -> List[Dict[str, Any]]:
+    """A configuration followed by its fallback rows (looked up by name among the enabled ones)."""
+    fallback_names = [name for name in (config.get('fallbacks') or []) if name != config.get('name')]
+    if not fallback_names:
+        return [config]
+    db_manager = db_manager or DatabaseManager()
+    configs_by_name = {llm_config['name']: llm_config for llm_config in db_manager.get_llm_configs()}
+    missing = [name for name in fallback_names if name not in configs_by_name]
+    if missing:
+        print(f"RoutedChatModel: Ignoring unknown or disabled fallback configurations: {missing}")
+    return [config] + [configs_by_name[name] for name in fallback_names if name in configs_by_name]
+
+def create_routed_chat_model(config: Dict[str, Any], db_manager: Optional[DatabaseManager] = None,
+                             chain: Optional[List[Dict[str, Any]]] = None):
+    """Create the chat model for a configuration, routed over its fallbacks if it has any.
+
+    ``chain`` is the result of ``routing_chain`` if the caller already has it. With
+    ``hedge_delay_ms`` set, slow first tokens are hedged (see ``chat.routing``).
+    """
+    chain = chain or routing_chain(config, db_manager)
+    if len(chain) == 1:
+        return create_chat_model(config)
+    from chat.routing import RoutedChatModel
+    print(f"RoutedChatModel: Routing over {[llm_config['name'] for llm_config in chain]}"
+          f"{' with hedging after ' + str(config['hedge_delay_ms']) + 'ms' if config.get('hedge_delay_ms') else ''}")
+    return RoutedChatModel(
+        models=[create_chat_model(llm_config) for llm_config in chain],
+        names=[llm_config['name'] for llm_config in chain],
+        hedge_delay_ms=config.get('hedge_delay_ms') or None,
+    )
+
+class Conversation:
+    """Message history of one conversation."""
+
+    def __init__(self, conversation_id: str, max_messages: Optional[int] = None):
+        self.id = conversation_id
+        self.max_messages = max_messages  # Oldest messages are dropped beyond this
+        self.messages: List[Any] = []
+
+    def add(self, role: str, content: Union[str, List[Union[str, dict]]]):
+        """Add a message to the history."""
+        from langchain_core.messages import AIMessage, HumanMessage
+
         # Handle list content by converting to string
         if isinstance(content, list):
             # Convert list to a string representation
             content_str = " ".join(str(item) for item in content)
         else:
             content_str = content
-            
+
         if role == "user":
-            self.chat_history.append(HumanMessage(content=content_str))
+            self.messages.append(HumanMessage(content=content_str))
         elif role == "assistant":
-            self.chat_history.append(AIMessage(content=content_str))
+            self.messages.append(AIMessage(content=content_str))
+        if self.max_messages and len(self.messages) > self.max_messages:
+            del self.messages[:len(self.messages) - self.max_messages]
+
+    def clear(self):
+        self.messages = []
+
+class LLMWrapper:
+    """
+    LLM wrapper that serves many conversations and integrates with database configurations.
+
+    Configurations are looked up by name or id with a single indexed query, chat models
+    are cached per configuration and routed over its fallbacks like the agent's, and
+    each conversation keeps its own history. A turn
+    reads the history once and appends to it only when the reply is complete, so one
+    wrapper can serve concurrent conversations; turns within one conversation should
+    still be sequential.
+    """
     
-    def get_chat_history(self):
-        """Get the current chat history."""
-        return self.chat_history
+    def __init__(self, db_manager: Optional[DatabaseManager] = None, max_cached_models: int = 16):
+        self.db_manager = db_manager or DatabaseManager()
+        self.max_cached_models = max_cached_models
+        self.conversations: Dict[str, Conversation] = {}
+        self._models: "OrderedDict[tuple, ChatOpenAI]" = OrderedDict()
+        self._lock = threading.Lock()
     
-    def clear_history(self):
-        """Clear the chat history."""
-        self.chat_history = []
+    def get_llm_config(self, config_name: Optional[str] = None, config_id: Optional[int] = None):
+        """Retrieve LLM configuration by name or id from database."""
+        return self.db_manager.get_llm_config(name=config_name, config_id=config_id)
     
-    def chat(self, config_name: str, message: str) -> str | list[str | dict]:
-        """Send a message to the LLM and get a response."""
-        # Add user message to history
-        self.add_to_history("user", message)
+    def create_chat_model(self, config_name: Optional[str] = None, config_id: Optional[int] = None):
+        """Return the (cached) chat model for a configuration from the database."""
+        config = self.get_llm_config(config_name, config_id)
+        if not config:
+            raise ValueError(f"LLM configuration '{config_name if config_name is not None else config_id}' not found")
         
-        # Create chat model
+        # Keyed by the full configuration and its fallback rows, so editing any of them
+        # gets a fresh model
+        chain = routing_chain(config, self.db_manager)
+        key = tuple(llm_config_key(llm_config) for llm_config in chain)
+        with self._lock:
+            chat_model = self._models.get(key)
+            if chat_model is not None:
+                self._models.move_to_end(key)
+                return chat_model
+        chat_model = create_routed_chat_model(config, self.db_manager, chain=chain)
+        with self._lock:
+            self._models[key] = chat_model
+            while len(self._models) > self.max_cached_models:
+                self._models.popitem(last=False)
+        return chat_model
+    
+    def conversation(self, conversation: Union[str, Conversation] = "default") -> Conversation:
+        """Return a conversation object, creating the named one if needed."""
+        if isinstance(conversation, Conversation):
+            return conversation
+        with self._lock:
+            if conversation not in self.conversations:
+                self.conversations[conversation] = Conversation(conversation)
+            return self.conversations[conversation]
+    
+    def add_to_history(self, role: str, content: str | list[str | dict],
+                       conversation: Union[str, Conversation] = "default"):
+        """Add a message to a conversation's history."""
+        self.conversation(conversation).add(role, content)
+    
+    def get_chat_history(self, conversation: Union[str, Conversation] = "default"):
+        """Get a conversation's history."""
+        return self.conversation(conversation).messages
+    
+    @property
+    def chat_history(self):
+        """History of the default conversation."""
+        return self.get_chat_history()
+    
+    def clear_history(self, conversation: Union[str, Conversation] = "default"):
+        """Clear a conversation's history."""
+        self.conversation(conversation).clear()
+    
+    def end_conversation(self, conversation_id: str):
+        """Forget a conversation entirely."""
+        with self._lock:
+            self.conversations.pop(conversation_id, None)
+    
+    def chat(self, config_name: str, message: str,
+             conversation: Union[str, Conversation] = "default") -> str | list[str | dict]:
+        """Send a message to the LLM and get a response (blocking)."""
+        from langchain_core.messages import HumanMessage
+        history = self.conversation(conversation)
         chat_model = self.create_chat_model(config_name)
-        
-        # Get response from model
-        response = chat_model.invoke(self.chat_history)
-        
-        # Add AI response to history
-        self.add_to_history("assistant", response.content)
-        
+        response = chat_model.invoke(history.messages + [HumanMessage(content=message)])
+        history.add("user", message)
+        history.add("assistant", response.content)
         return response.content
+    
+    async def achat(self, config_name: str, message: str,
+                    conversation: Union[str, Conversation] = "default") -> str | list[str | dict]:
+        """Send a message to the LLM and get a response."""
+        from langchain_core.messages import HumanMessage
+        history = self.conversation(conversation)
+        chat_model = self.create_chat_model(config_name)
+        response = await chat_model.ainvoke(history.messages + [HumanMessage(content=message)])
+        history.add("user", message)
+        history.add("assistant", response.content)
+        return response.content
+    
+    async def astream(self, config_name: str, message: str,
+                      conversation: Union[str, Conversation] = "default") -> AsyncIterator[str]:
+        """Send a message to the LLM and yield the response text as it streams in.
+
+        The exchange is added to the history once the stream completes.
+        """
+        from langchain_core.messages import HumanMessage
+        history = self.conversation(conversation)
+        chat_model = self.create_chat_model(config_name)
+        parts = []
+        async for chunk in chat_model.astream(history.messages + [HumanMessage(content=message)]):
+            text = chunk.content if isinstance(chunk.content, str) else "".join(
+                part.get("text", "") if isinstance(part, dict) else str(part) for part in chunk.content)
+            if text:
+                parts.append(text)
+                yield text
+        history.add("user", message)
+        history.add("assistant", "".join(parts))
 
 async def create_mcp_agent(model="openai/gpt-oss-20b:free"):
     """Create an agent that can interact with multiple MCP servers."""
     from mcp_client.manager import MCPManager
     from mcp_servers import server_config
+    from langchain.agents import create_agent
+    from langchain_openai import ChatOpenAI
+    from pydantic import SecretStr
     client = MCPManager(server_configs=server_config)
     tools = await client.get_tools()
     chat_model = ChatOpenAI(model=model, api_key=SecretStr(os.getenv("OPENAI_API_KEY") or ""), base_url=os.getenv("OPENAI_API_BASE"))
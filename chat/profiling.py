@@ -0,0 +1,170 @@
+import contextlib
+import cProfile
+import glob
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+from typing import Any, Dict, List, Optional
+
+DEFAULT_PROFILE_DIR = "profiles"
+
+
+class TurnProfiler:
+    """
+    CPU (cProfile) and allocation (tracemalloc) profiling of agent turns.
+
+    Each profiled call writes ``<id>.prof`` (load with ``pstats`` or snakeviz) and a
+    ``<id>.json`` summary with the top functions by cumulative time and the top
+    allocation sites; only the newest ``max_artifacts`` pairs are kept.
+
+    Only one call is profiled at a time (cProfile can't nest), and the profile covers
+    everything the process runs meanwhile, including other coroutines on the same loop.
+    """
+
+    def __init__(self, directory: str = DEFAULT_PROFILE_DIR, max_artifacts: int = 20,
+                 top_n: int = 25, track_allocations: bool = True):
+        self.directory = directory
+        self.max_artifacts = max_artifacts
+        self.top_n = top_n
+        self.track_allocations = track_allocations
+        self._lock = threading.Lock()
+
+    @contextlib.asynccontextmanager
+    async def profile(self, label: str, detail: str = ""):
+        """Profile the body of the ``async with`` block, unless another call is being profiled."""
+        if not self._lock.acquire(blocking=False):
+            print(f"TurnProfiler: Skipping '{label}', another call is being profiled")
+            yield
+            return
+        try:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError as e:  # Another profiler (e.g. a debugger) is active
+                print(f"TurnProfiler: Skipping '{label}': {e}")
+                yield
+                return
+
+            started_tracing = self.track_allocations and not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            before = tracemalloc.take_snapshot() if self.track_allocations else None
+            if self.track_allocations:
+                tracemalloc.reset_peak()
+            started_at, started = time.time(), time.perf_counter()
+            try:
+                yield
+            finally:
+                duration = time.perf_counter() - started
+                profiler.disable()
+                allocations, peak = [], None
+                if before is not None:
+                    allocations = self._top_allocations(before, tracemalloc.take_snapshot())
+                    peak = tracemalloc.get_traced_memory()[1]
+                if started_tracing:
+                    tracemalloc.stop()
+                self._save(profiler, {
+                    'label': label,
+                    'detail': detail,
+                    'started_at': started_at,
+                    'duration_s': round(duration, 4),
+                    'peak_memory_kb': round(peak / 1024, 1) if peak is not None else None,
+                    'top_allocations': allocations,
+                })
+        finally:
+            self._lock.release()
+
+    def _top_allocations(self, before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> List[Dict[str, Any]]:
+        # Leave out tracemalloc's own bookkeeping
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        differences = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'lineno')
+        return [{
+            'site': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            'size_kb': round(stat.size_diff / 1024, 1),
+            'count': stat.count_diff,
+        } for stat in differences[:self.top_n] if stat.size_diff > 0]
+
+    def _top_functions(self, profiler: cProfile.Profile) -> List[Dict[str, Any]]:
+        stats = pstats.Stats(profiler).stats  # (file, line, function) -> (cc, nc, tt, ct, callers)
+        ranked = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)
+        return [{
+            'function': f"{os.path.basename(filename)}:{line}({function})",
+            'calls': calls,
+            'total_s': round(total, 4),
+            'cumulative_s': round(cumulative, 4),
+        } for (filename, line, function), (_, calls, total, cumulative, _) in ranked[:self.top_n]]
+
+    def _save(self, profiler: cProfile.Profile, summary: Dict[str, Any]):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            started_at = summary['started_at']
+            artifact_id = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(started_at))}" \
+                          f"{int(started_at * 1000) % 1000:03d}-{summary['label']}-{uuid.uuid4().hex[:6]}"
+            profile_path = os.path.join(self.directory, f"{artifact_id}.prof")
+            profiler.dump_stats(profile_path)
+            summary = {'id': artifact_id, **summary, 'profile_path': profile_path,
+                       'top_functions': self._top_functions(profiler)}
+            with open(os.path.join(self.directory, f"{artifact_id}.json"), 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=2)
+            print(f"TurnProfiler: '{summary['label']}' took {summary['duration_s']}s, profile written to {profile_path}")
+            self._rotate()
+        except Exception as e:
+            print(f"TurnProfiler: Failed to write profile: {e}")
+
+    def _summary_paths(self) -> List[str]:
+        # Artifact ids start with a timestamp, so name order is age order
+        return sorted(glob.glob(os.path.join(self.directory, "*.json")), reverse=True)
+
+    def _rotate(self):
+        for path in self._summary_paths()[self.max_artifacts:]:
+            for stale in (path, path[:-len(".json")] + ".prof"):
+                with contextlib.suppress(OSError):
+                    os.remove(stale)
+
+    def latest_summaries(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """The newest profile summaries, newest first."""
+        summaries = []
+        for path in self._summary_paths()[:limit]:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    summaries.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return summaries
+
+
+_profiler: Optional[TurnProfiler] = None
+_profiler_loaded = False
+
+
+def get_profiler() -> Optional[TurnProfiler]:
+    """The active profiler: set with ``set_profiling`` or from ``MCP_PROFILE_DIR``; None when off."""
+    global _profiler, _profiler_loaded
+    if not _profiler_loaded:
+        directory = os.getenv('MCP_PROFILE_DIR', '').strip()
+        if directory:
+            _profiler = TurnProfiler(
+                directory,
+                max_artifacts=int(os.getenv('MCP_PROFILE_KEEP', 20)),
+                track_allocations=os.getenv('MCP_PROFILE_ALLOCATIONS', '1').strip().lower() not in ('0', 'false', 'no', 'off'),
+            )
+        _profiler_loaded = True
+    return _profiler
+
+
+def set_profiling(directory: Optional[str], **options: Any) -> Optional[TurnProfiler]:
+    """Turn profiling on (writing to ``directory``) or off (None) for the whole process."""
+    global _profiler, _profiler_loaded
+    _profiler = TurnProfiler(directory, **options) if directory else None
+    _profiler_loaded = True
+    return _profiler
+
+
+def profile_call(label: str, detail: str = ""):
+    """Async context manager that profiles its body when profiling is on."""
+    profiler = get_profiler()
+    return profiler.profile(label, detail) if profiler is not None else contextlib.nullcontext()
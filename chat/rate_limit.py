@@ -0,0 +1,216 @@
+import asyncio
+import email.utils
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+# Seconds of a per-minute budget that may be spent in one burst
+BURST_SECONDS = 10.0
+# Pause applied after a 429 that carries no Retry-After header
+DEFAULT_RETRY_AFTER = 1.0
+
+
+class _Bucket:
+    """Token bucket that hands out reservations, letting its level go negative.
+
+    A negative level is the queue: each caller waits until the refill covers its own
+    reservation, so callers are served in arrival order without a separate queue.
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float = BURST_SECONDS):
+        self.configure(per_minute, burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def configure(self, per_minute: float, burst_seconds: float = BURST_SECONDS):
+        self.rate = per_minute / 60.0
+        self.capacity = max(per_minute * burst_seconds / 60.0, 1.0)
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take ``amount`` from the bucket and return how long the caller must wait."""
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        self.level -= amount
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def refund(self, amount: float):
+        """Give back a reservation that was never used."""
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limiter for one LLM configuration.
+
+    Reservations are made under a thread lock and waited out with ``asyncio.sleep`` (or
+    ``time.sleep`` for synchronous clients), so one limiter can be shared by every agent
+    and event loop in the process. A caller cancelled while waiting gives its reservation
+    back. A 429 response pauses all callers until its ``Retry-After`` has passed.
+    """
+
+    def __init__(self, name: str, rpm: Optional[int] = None, tpm: Optional[int] = None):
+        self.name = name
+        self.rpm = None
+        self.tpm = None
+        self.requests: Optional[_Bucket] = None
+        self.tokens: Optional[_Bucket] = None
+        self.blocked_until = 0.0
+        self.stats = {'requests': 0, 'delayed': 0, 'wait_seconds': 0.0, 'rate_limited': 0}
+        self._lock = threading.Lock()
+        self.configure(rpm, tpm)
+
+    def configure(self, rpm: Optional[int], tpm: Optional[int]):
+        """Apply new limits (None or 0 disables a limit), keeping the current levels."""
+        with self._lock:
+            self.rpm, self.tpm = rpm or None, tpm or None
+            self.requests = self._reconfigure(self.requests, self.rpm)
+            self.tokens = self._reconfigure(self.tokens, self.tpm)
+
+    @staticmethod
+    def _reconfigure(bucket: Optional[_Bucket], per_minute: Optional[int]) -> Optional[_Bucket]:
+        if not per_minute:
+            return None
+        if bucket is None:
+            return _Bucket(per_minute)
+        bucket.configure(per_minute)
+        return bucket
+
+    def _reserve_tokens(self, tokens: int) -> int:
+        # A request larger than the burst can still go through once the bucket refills
+        return min(tokens, self.tokens.capacity) if self.tokens is not None else 0
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self.blocked_until - now, 0.0)
+            if self.requests is not None:
+                wait = max(wait, self.requests.reserve(1, now))
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.reserve(self._reserve_tokens(tokens), now))
+            self.stats['requests'] += 1
+            if wait > 0:
+                self.stats['delayed'] += 1
+                self.stats['wait_seconds'] += wait
+            return wait
+
+    def _refund(self, tokens: int):
+        with self._lock:
+            if self.requests is not None:
+                self.requests.refund(1)
+            if self.tokens is not None:
+                self.tokens.refund(self._reserve_tokens(tokens))
+
+    async def acquire(self, tokens: int = 0):
+        """Wait for this request's turn; the reservation is refunded if the wait is cancelled."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self._refund(tokens)
+                raise
+
+    def acquire_sync(self, tokens: int = 0):
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Hold back every caller for ``seconds`` (e.g. a provider's Retry-After)."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.stats['rate_limited'] += 1
+        print(f"RateLimiter: '{self.name}' rate limited by provider, pausing for {seconds:.2f}s")
+
+    def observe(self, response: httpx.Response):
+        if response.status_code == 429:
+            self.pause(retry_after_seconds(response.headers) or DEFAULT_RETRY_AFTER)
+
+
+def retry_after_seconds(headers: httpx.Headers) -> Optional[float]:
+    """Parse ``retry-after-ms`` or ``retry-after`` (seconds or HTTP date) into seconds."""
+    value = headers.get('retry-after-ms')
+    if value:
+        try:
+            return max(float(value) / 1000, 0.0)
+        except ValueError:
+            pass
+    value = headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(value) if value else None
+        return max(parsed.timestamp() - time.time(), 0.0) if parsed else None
+
+
+def _estimate_tokens(request: httpx.Request) -> int:
+    # The JSON body (messages plus tool schemas) is a fair proxy for prompt tokens
+    return int(request.headers.get('content-length') or len(request.content or b'')) // 4
+
+
+class RateLimitedTransport(httpx.AsyncBaseTransport):
+    """httpx transport that waits on a ``RateLimiter`` before each request."""
+
+    def __init__(self, limiter: RateLimiter, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.limiter = limiter
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self.limiter.acquire(_estimate_tokens(request))
+        response = await self.transport.handle_async_request(request)
+        self.limiter.observe(response)
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class RateLimitedSyncTransport(httpx.BaseTransport):
+    """Synchronous counterpart of ``RateLimitedTransport``."""
+
+    def __init__(self, limiter: RateLimiter, transport: Optional[httpx.BaseTransport] = None):
+        self.limiter = limiter
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.limiter.acquire_sync(_estimate_tokens(request))
+        response = self.transport.handle_request(request)
+        self.limiter.observe(response)
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+_limiters: Dict[Any, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(llm_config: Dict[str, Any]) -> Optional[RateLimiter]:
+    """The process-wide limiter for an LLM configuration, or None if it has no limits."""
+    rpm, tpm = llm_config.get('rpm_limit'), llm_config.get('tpm_limit')
+    if not rpm and not tpm:
+        return None
+    key = llm_config.get('id') or llm_config.get('name')
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = RateLimiter(llm_config.get('name') or str(key), rpm, tpm)
+    if (limiter.rpm, limiter.tpm) != (rpm or None, tpm or None):
+        limiter.configure(rpm, tpm)
+    return limiter
+
+
+def rate_limited_http_clients(llm_config: Dict[str, Any]) -> Dict[str, Any]:
+    """``http_client``/``http_async_client`` keyword arguments for ChatOpenAI, if limited."""
+    limiter = get_rate_limiter(llm_config)
+    if limiter is None:
+        return {}
+    return {
+        'http_client': httpx.Client(transport=RateLimitedSyncTransport(limiter)),
+        'http_async_client': httpx.AsyncClient(transport=RateLimitedTransport(limiter)),
+    }
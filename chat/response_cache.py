@@ -0,0 +1,102 @@
+import hashlib
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+import serialization
+from database import DatabaseManager
+
+# Tools that must never be skipped by replaying a cached answer
+NON_IDEMPOTENT_TOOLS = {'send_email', 'send_emails', 'queue_email'}
+
+# Number of previous chat messages that take part in the cache key
+HISTORY_TAIL = 4
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _normalize(text: Any) -> str:
+    return _WHITESPACE.sub(' ', str(text)).strip()
+
+
+def is_non_idempotent(tool: Any, original_name: Optional[str] = None) -> bool:
+    """True unless ``tool``'s MCP annotations declare it safe to skip on a cache hit.
+
+    A tool is safe when it is read-only, or idempotent and explicitly non-destructive.
+    Missing or null hints take the MCP defaults (destructive, not idempotent), so an
+    unannotated tool is never cached past. ``original_name`` is the server-side name of
+    a tool that was namespaced to avoid a collision with another server's tool.
+    """
+    if getattr(tool, 'name', None) in NON_IDEMPOTENT_TOOLS or original_name in NON_IDEMPOTENT_TOOLS:
+        return True
+    annotations = getattr(tool, 'metadata', None) or {}
+    if annotations.get('readOnlyHint') is True:
+        return False
+    return not (annotations.get('idempotentHint') is True and annotations.get('destructiveHint') is False)
+
+
+class ResponseCache:
+    """
+    Exact-match cache of final agent answers, stored in the configuration database.
+
+    Keys hash the LLM configuration, the system prompt/toolset fingerprint, the tail of the
+    chat history and the whitespace-normalized prompt. Turns are only stored if every tool
+    they called is annotated read-only (or idempotent and non-destructive), so a cached
+    answer can't stand in for a side effect.
+
+    Disabled unless ``RESPONSE_CACHE_ENABLED`` is set; ``RESPONSE_CACHE_TTL`` (seconds),
+    ``RESPONSE_CACHE_MAX_ENTRIES`` and ``RESPONSE_CACHE_MAX_BYTES`` bound it.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, enabled: bool = False, ttl_seconds: float = 3600,
+                 max_entries: int = 1000, max_bytes: int = 50 * 1024 * 1024):
+        self.db_manager = db_manager
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'bypassed': 0}
+
+    @classmethod
+    def from_env(cls, db_manager: DatabaseManager) -> "ResponseCache":
+        return cls(
+            db_manager,
+            enabled=os.getenv('RESPONSE_CACHE_ENABLED', '').strip().lower() in ('1', 'true', 'yes', 'on'),
+            ttl_seconds=float(os.getenv('RESPONSE_CACHE_TTL', 3600)),
+            max_entries=int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1000)),
+            max_bytes=int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 50 * 1024 * 1024)),
+        )
+
+    def make_key(self, llm_config: Optional[Dict[str, Any]], prompt_fingerprint: Optional[str],
+                 chat_history: Optional[List[tuple]], input_text: str) -> str:
+        """Hash of everything that determines the answer to a turn."""
+        config = llm_config or {}
+        material = {
+            # The API key is deliberately excluded: rotating it doesn't change answers
+            'llm': [config.get('provider'), config.get('model'), config.get('base_url')],
+            # Workspaces never share answers, even with identical configuration
+            'workspace': config.get('workspace_id'),
+            'prompt_fingerprint': prompt_fingerprint,
+            'history': [[role, _normalize(content)] for role, content in (chat_history or [])[-HISTORY_TAIL:]],
+            'input': _normalize(input_text),
+        }
+        return hashlib.sha256(serialization.dumps_bytes(material, sort_keys=True)).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        response = self.db_manager.get_cached_response(key, self.ttl_seconds)
+        self.stats['hits' if response is not None else 'misses'] += 1
+        return response
+
+    def put(self, key: str, response: str, tools_called: Iterable[str], non_idempotent_tools: Iterable[str]):
+        """Store ``response`` unless the turn called a non-idempotent tool."""
+        if not self.enabled:
+            return
+        side_effects = set(tools_called) & set(non_idempotent_tools)
+        if side_effects:
+            print(f"ResponseCache: Not caching a turn that called {', '.join(sorted(side_effects))}")
+            self.stats['bypassed'] += 1
+            return
+        if self.db_manager.put_cached_response(key, response, self.ttl_seconds, self.max_entries, self.max_bytes):
+            self.stats['stores'] += 1
@@ -0,0 +1,237 @@
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel, generate_from_stream
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain_openai import ChatOpenAI
+
+
+class LatencyTracker:
+    """
+    Exponentially weighted time-to-first-token, latency and error rate per LLM configuration.
+
+    Shared process-wide (see ``latency_tracker``) so every agent's routing decisions
+    benefit from what the others observed. A configuration marked unhealthy is let back
+    in after ``retry_after_s`` without a new failure, so one call probes it again: each
+    success then decays its error rate, while another failure restarts the wait.
+    """
+
+    def __init__(self, alpha: float = 0.3, unhealthy_error_rate: float = 0.5, min_samples: int = 3,
+                 retry_after_s: float = 30.0):
+        self.alpha = alpha
+        self.unhealthy_error_rate = unhealthy_error_rate
+        self.min_samples = min_samples
+        self.retry_after_s = retry_after_s
+        self.stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()  # Turns may run on the warm-up loop and on Streamlit threads
+
+    def _ewma(self, previous: Optional[float], value: float) -> float:
+        return value if previous is None else self.alpha * value + (1 - self.alpha) * previous
+
+    def record(self, name: str, first_token_s: Optional[float], total_s: Optional[float], ok: bool):
+        with self._lock:
+            stats = self.stats.setdefault(name, {'samples': 0, 'first_token_s': None,
+                                                 'latency_s': None, 'error_rate': 0.0,
+                                                 'last_failure': None})
+            stats['samples'] += 1
+            stats['error_rate'] = self._ewma(stats['error_rate'], 0.0 if ok else 1.0)
+            if not ok:
+                stats['last_failure'] = time.monotonic()
+            if ok and first_token_s is not None:
+                stats['first_token_s'] = self._ewma(stats['first_token_s'], first_token_s)
+            if ok and total_s is not None:
+                stats['latency_s'] = self._ewma(stats['latency_s'], total_s)
+
+    def is_healthy(self, name: str) -> bool:
+        stats = self.stats.get(name)
+        return stats is None or stats['samples'] < self.min_samples \
+            or stats['error_rate'] < self.unhealthy_error_rate \
+            or time.monotonic() - stats['last_failure'] >= self.retry_after_s
+
+    def order(self, names: Sequence[str]) -> List[str]:
+        """Keep the primary first while it is healthy; rank fallbacks by observed first-token time.
+
+        Unhealthy configurations move to the end; ones without measurements keep their
+        configured position relative to each other.
+        """
+        def fallback_key(name: str):
+            first_token = (self.stats.get(name) or {}).get('first_token_s')
+            return (not self.is_healthy(name), first_token if first_token is not None else float('inf'))
+
+        if not names:
+            return []
+        primary, fallbacks = names[0], sorted(names[1:], key=fallback_key)
+        if self.is_healthy(primary):
+            return [primary] + fallbacks
+        return fallbacks + [primary]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: dict(stats) for name, stats in self.stats.items()}
+
+
+latency_tracker = LatencyTracker()
+
+
+def _supports_streaming(model: BaseChatModel) -> bool:
+    return type(model)._astream is not BaseChatModel._astream or type(model)._stream is not BaseChatModel._stream
+
+
+class RoutedChatModel(BaseChatModel):
+    """
+    Chat model that routes each call over an ordered chain of LLM configurations.
+
+    Calls go to the first healthy configuration and fall back down the chain on error.
+    With ``hedge_delay_ms`` set, a second request is sent to the next configuration if
+    the first hasn't streamed a token within that delay; whichever produces a first
+    token first is used and the other request is cancelled.
+    """
+
+    models: List[BaseChatModel]
+    names: List[str]
+    hedge_delay_ms: Optional[float] = None
+    tracker: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "routed-chat-model"
+
+    def _tracker(self) -> LatencyTracker:
+        return self.tracker or latency_tracker
+
+    def bind_tools(self, tools: Sequence[Any], *, tool_choice: Any = None, **kwargs: Any):
+        """Bind tools in the OpenAI format every routed provider accepts."""
+        strict = kwargs.pop('strict', None)
+        formatted_tools = [convert_to_openai_tool(tool, strict=strict) for tool in tools]
+        if tool_choice == "any":
+            tool_choice = "required"
+        if isinstance(tool_choice, str) and tool_choice not in ("auto", "none", "required"):
+            tool_choice = {"type": "function", "function": {"name": tool_choice}}
+        if tool_choice is not None:
+            kwargs['tool_choice'] = tool_choice
+        return self.bind(tools=formatted_tools, **kwargs)
+
+    def _ordered_indexes(self) -> List[int]:
+        index_by_name = {name: index for index, name in enumerate(self.names)}
+        return [index_by_name[name] for name in self._tracker().order(self.names)]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        # Synchronous calls fall back sequentially; hedging needs the event loop
+        errors = []
+        for index in self._ordered_indexes():
+            started = time.perf_counter()
+            try:
+                result = self.models[index]._generate(messages, stop=stop, **kwargs)
+            except Exception as e:
+                self._tracker().record(self.names[index], None, None, ok=False)
+                errors.append(f"{self.names[index]}: {e}")
+                continue
+            elapsed = time.perf_counter() - started
+            self._tracker().record(self.names[index], elapsed, elapsed, ok=True)
+            return result
+        raise RuntimeError(f"All LLM configurations failed: {'; '.join(errors)}")
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                         **kwargs: Any) -> ChatResult:
+        order = self._ordered_indexes()
+        errors = []
+        while order:
+            hedge = order[1] if self.hedge_delay_ms is not None and len(order) > 1 else None
+            failed: List[int] = []
+            try:
+                return await self._race(order[0], hedge, messages, stop, kwargs, failed)
+            except Exception as e:
+                errors.append(str(e))
+                # Only skip what actually failed; a hedge that never ran (or was cancelled) stays next
+                order = [index for index in order if index not in failed] if failed else order[1:]
+        raise RuntimeError(f"All LLM configurations failed: {'; '.join(errors)}")
+
+    async def _race(self, primary: int, hedge: Optional[int], messages: List[BaseMessage],
+                    stop: Optional[List[str]], kwargs: Dict[str, Any], failed: List[int]) -> ChatResult:
+        """Run ``primary`` and, if it is slow to start or fails, ``hedge``; return the first to stream.
+
+        The indexes of configurations whose request failed are appended to ``failed``.
+        """
+        attempts: Dict[asyncio.Future, tuple] = {}  # first-token future -> (index, task)
+
+        def start(index: int):
+            first_token = asyncio.get_running_loop().create_future()
+            task = asyncio.create_task(self._attempt(index, messages, stop, kwargs, first_token))
+            # Failures are reported through the first-token future or by awaiting the winner
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            attempts[first_token] = (index, task)
+
+        start(primary)
+        hedge_started = False
+        if hedge is not None:
+            done, _ = await asyncio.wait(set(attempts), timeout=self.hedge_delay_ms / 1000)
+            if not done:
+                print(f"RoutedChatModel: '{self.names[primary]}' has no first token after "
+                      f"{self.hedge_delay_ms:.0f}ms, hedging with '{self.names[hedge]}'")
+                start(hedge)
+                hedge_started = True
+
+        last_error: Optional[BaseException] = None
+        try:
+            while attempts:
+                done, _ = await asyncio.wait(set(attempts), return_when=asyncio.FIRST_COMPLETED)
+                for first_token in done:
+                    index, task = attempts.pop(first_token)
+                    if first_token.exception() is None:
+                        # Winner: drop the other request and wait for the rest of this one
+                        for _, other in attempts.values():
+                            other.cancel()
+                        attempts.clear()
+                        try:
+                            return await task
+                        except Exception:
+                            failed.append(index)
+                            raise
+                    failed.append(index)
+                    last_error = first_token.exception()
+                    print(f"RoutedChatModel: '{self.names[index]}' failed: {last_error}")
+                    if hedge is not None and not hedge_started:
+                        # The primary failed before the hedge delay elapsed; use the hedge as its fallback
+                        start(hedge)
+                        hedge_started = True
+            raise last_error or RuntimeError("No LLM configuration produced a response")
+        finally:
+            for _, task in attempts.values():
+                task.cancel()
+
+    async def _attempt(self, index: int, messages: List[BaseMessage], stop: Optional[List[str]],
+                       kwargs: Dict[str, Any], first_token: asyncio.Future) -> ChatResult:
+        model, name = self.models[index], self.names[index]
+        started = time.perf_counter()
+        first_token_s = None
+        try:
+            if _supports_streaming(model):
+                stream_kwargs = {**kwargs, 'stream_usage': True} if isinstance(model, ChatOpenAI) else kwargs
+                chunks = []
+                async for chunk in model._astream(messages, stop=stop, **stream_kwargs):
+                    if first_token_s is None:
+                        first_token_s = time.perf_counter() - started
+                        first_token.set_result(True)
+                    chunks.append(chunk)
+                result = generate_from_stream(iter(chunks))
+            else:
+                result = await model._agenerate(messages, stop=stop, **kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._tracker().record(name, None, None, ok=False)
+            if not first_token.done():
+                first_token.set_exception(e)
+            raise
+        total_s = time.perf_counter() - started
+        if not first_token.done():
+            first_token.set_result(True)
+        self._tracker().record(name, first_token_s if first_token_s is not None else total_s, total_s, ok=True)
+        return result
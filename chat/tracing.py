@@ -0,0 +1,206 @@
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.messages import BaseMessage, SystemMessage
+from langchain_core.outputs import LLMResult
+
+import serialization
+
+# Trace format version, bumped when the line layout changes
+TRACE_VERSION = 1
+
+
+def _truncate(text: str, max_chars: int) -> Dict[str, Any]:
+    if max_chars and len(text) > max_chars:
+        return {'text': text[:max_chars], 'truncated': len(text)}
+    return {'text': text}
+
+
+def _content_text(content: Any) -> str:
+    return content if isinstance(content, str) else serialization.dumps(content)
+
+
+class TraceRecorder(AsyncCallbackHandler):
+    """
+    Callback handler that records one agent turn: every LLM call and tool call with timings.
+
+    Event offsets and durations are in seconds from the start of the turn. LLM responses
+    are kept whole (replay needs them); tool outputs are cut to ``max_chars``.
+    """
+
+    def __init__(self, input_text: str, chat_history: Optional[List[tuple]] = None,
+                 llm_config: Optional[Dict[str, Any]] = None, prompt_fingerprint: Optional[str] = None,
+                 max_chars: int = 20000):
+        super().__init__()
+        self.max_chars = max_chars
+        self.started = time.perf_counter()
+        self.trace: Dict[str, Any] = {
+            'version': TRACE_VERSION,
+            'trace_id': uuid.uuid4().hex,
+            'recorded_at': time.time(),
+            'llm': {key: (llm_config or {}).get(key) for key in ('name', 'provider', 'model')},
+            'prompt_fingerprint': prompt_fingerprint,
+            'system_prompt': None,
+            'tools': None,
+            'input': input_text,
+            'history': [list(item) for item in chat_history or []],
+            'events': [],
+        }
+        self._pending: Dict[Any, Dict[str, Any]] = {}  # run_id -> event still in flight
+
+    def _offset(self) -> float:
+        return round(time.perf_counter() - self.started, 6)
+
+    def _start(self, run_id: Any, event: Dict[str, Any]):
+        event['start_s'] = self._offset()
+        self._pending[run_id] = event
+        self.trace['events'].append(event)
+
+    def _finish(self, run_id: Any) -> Optional[Dict[str, Any]]:
+        event = self._pending.pop(run_id, None)
+        if event is not None:
+            event['duration_s'] = round(self._offset() - event['start_s'], 6)
+        return event
+
+    async def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[BaseMessage]], *,
+                                  run_id: Any, **kwargs: Any) -> None:
+        prompt = messages[0] if messages else []
+        if self.trace['system_prompt'] is None and prompt and isinstance(prompt[0], SystemMessage):
+            self.trace['system_prompt'] = _content_text(prompt[0].content)
+        if self.trace['tools'] is None:
+            self.trace['tools'] = (kwargs.get('invocation_params') or {}).get('tools') or []
+        self._start(run_id, {
+            'type': 'llm',
+            'input_messages': len(prompt),
+            'input_chars': sum(len(_content_text(message.content)) for message in prompt),
+        })
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: Any, **kwargs: Any) -> None:
+        event = self._finish(run_id)
+        if event is None:
+            return
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        message = getattr(generation, 'message', None)
+        event['response'] = {
+            'content': _content_text(message.content) if message is not None else getattr(generation, 'text', ''),
+            'tool_calls': [{'name': call['name'], 'args': call['args'], 'id': call.get('id')}
+                           for call in getattr(message, 'tool_calls', None) or []],
+        }
+        usage = getattr(message, 'usage_metadata', None)
+        if usage:
+            event['usage'] = dict(usage)
+
+    async def on_llm_error(self, error: BaseException, *, run_id: Any, **kwargs: Any) -> None:
+        event = self._finish(run_id)
+        if event is not None:
+            event['error'] = f"{type(error).__name__}: {error}"
+
+    async def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: Any,
+                            inputs: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        self._start(run_id, {
+            'type': 'tool',
+            'name': (serialized or {}).get('name') or kwargs.get('name', 'unknown'),
+            'args': inputs if inputs is not None else input_str,
+        })
+
+    async def on_tool_end(self, output: Any, *, run_id: Any, **kwargs: Any) -> None:
+        event = self._finish(run_id)
+        if event is None:
+            return
+        # ToolNode hands back a ToolMessage; plain tools return their result directly
+        event['tool_call_id'] = getattr(output, 'tool_call_id', None)
+        content = getattr(output, 'content', output)
+        event['output'] = _truncate(_content_text(content), self.max_chars)
+
+    async def on_tool_error(self, error: BaseException, *, run_id: Any, **kwargs: Any) -> None:
+        event = self._finish(run_id)
+        if event is not None:
+            event['error'] = f"{type(error).__name__}: {error}"
+
+    def finish(self, result: Optional[str] = None, error: Optional[BaseException] = None) -> Dict[str, Any]:
+        """Close the turn and return the trace."""
+        self.trace['duration_s'] = self._offset()
+        self.trace['result'] = result
+        if error is not None:
+            self.trace['error'] = f"{type(error).__name__}: {error}"
+        return self.trace
+
+
+class TraceWriter:
+    """
+    Appends traces to daily JSONL files (``trace-YYYYMMDD.jsonl``) in a directory.
+
+    To keep files compact, the system prompt and tool definitions are written only on
+    the first trace with a given prompt fingerprint in each file; later lines carry just
+    the fingerprint and ``load_traces`` fills them back in.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._current_path: Optional[str] = None
+        self._written_fingerprints = set()
+
+    def path_for(self, timestamp: float) -> str:
+        return os.path.join(self.directory, f"trace-{time.strftime('%Y%m%d', time.localtime(timestamp))}.jsonl")
+
+    def write(self, trace: Dict[str, Any]) -> str:
+        path = self.path_for(trace['recorded_at'])
+        with self._lock:
+            if path != self._current_path:
+                os.makedirs(self.directory, exist_ok=True)
+                self._current_path = path
+                self._written_fingerprints = set()
+            fingerprint = trace.get('prompt_fingerprint')
+            line = dict(trace)
+            if fingerprint and fingerprint in self._written_fingerprints:
+                line.pop('system_prompt', None)
+                line.pop('tools', None)
+            elif fingerprint:
+                self._written_fingerprints.add(fingerprint)
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(serialization.dumps(line) + "\n")
+        return path
+
+
+_writers: Dict[str, TraceWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def trace_writer_from_env() -> Optional[TraceWriter]:
+    """The process-wide writer for ``MCP_TRACE_DIR``, or None when tracing is off."""
+    directory = os.getenv('MCP_TRACE_DIR', '').strip()
+    if not directory:
+        return None
+    with _writers_lock:
+        writer = _writers.get(directory)
+        if writer is None:
+            writer = _writers[directory] = TraceWriter(directory)
+        return writer
+
+
+def trace_max_chars() -> int:
+    return int(os.getenv('MCP_TRACE_MAX_CHARS', 20000))
+
+
+def load_traces(path: str) -> List[Dict[str, Any]]:
+    """Read a trace file, restoring system prompts and tools omitted from repeated lines."""
+    traces = []
+    prompts: Dict[str, tuple] = {}  # fingerprint -> (system prompt, tools)
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            trace = serialization.loads(line)
+            fingerprint = trace.get('prompt_fingerprint')
+            if 'system_prompt' in trace:
+                if fingerprint:
+                    prompts[fingerprint] = (trace['system_prompt'], trace.get('tools'))
+            elif fingerprint in prompts:
+                trace['system_prompt'], trace['tools'] = prompts[fingerprint]
+            traces.append(trace)
+    return traces
@@ -0,0 +1,262 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Coroutine, Dict, Iterator, Optional
+
+from chat.agent import MCPAgent
+from chat.llm import llm_config_key
+from database import DatabaseManager
+
+
+class WarmerClosed(RuntimeError):
+    """Raised when a turn is submitted to a warmer that has been shut down."""
+
+
+class AgentWarmer:
+    """
+    Pre-warms MCP discovery and the default-LLM agent on a background event loop.
+
+    The warmer owns a long-lived asyncio loop running in a daemon thread. Warm-up
+    (server configuration, session open, MCP initialize, tool listing and agent
+    construction) runs there at process start and again whenever
+    ``MCPAgent.clear_cache`` is called after a Settings change. Chat turns should be
+    submitted to the same loop with ``run`` so they can use the persistent sessions
+    the warm-up opened.
+
+    A warmer serves the workspace of its ``db_manager``. Several warmers can share one
+    ``loop`` (see ``chat.workspaces.WorkspaceAgents``); otherwise each starts its own.
+    Once shut down (``closed``) it refuses new turns and warm-ups; callers holding on to
+    it should fetch the workspace's warmer again.
+    """
+
+    def __init__(self, db_manager: Optional[DatabaseManager] = None,
+                 loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.db_manager = db_manager or DatabaseManager()
+        self.workspace_id = self.db_manager.workspace_id
+        self._owns_loop = loop is None
+        self.loop = loop or asyncio.new_event_loop()
+        self.thread = None
+        if self._owns_loop:
+            self.thread = threading.Thread(target=self.loop.run_forever, name="mcp-agent-warmup", daemon=True)
+            self.thread.start()
+
+        self._lock = threading.Lock()
+        self._future: Optional[Future] = None
+        self._llm_config: Optional[Dict[str, Any]] = None
+        self._agent: Optional[MCPAgent] = None
+        self._agent_key: Optional[tuple] = None
+        self._reload_lock: Optional[asyncio.Lock] = None
+        self._active_runs = 0
+        self._drains = set()  # Tasks closing replaced agents' sessions once their turns finish
+        self._leases: Dict[int, int] = {}  # id(agent) -> callers holding it from lease_agent
+        self.closed = False
+        self.last_used = time.time()
+        self.status: Dict[str, Any] = {
+            'state': 'idle',  # idle, warming, ready, reloading, failed
+            'stage': 'Not started',
+            'progress': 0.0,
+            'error': None,
+            'started_at': None,
+            'finished_at': None,
+        }
+
+        MCPAgent.add_cache_listener(self.restart, self.workspace_id)
+
+    def start(self, llm_config: Optional[Dict[str, Any]] = None):
+        """Start (or restart) warm-up for the given default LLM configuration."""
+        with self._lock:
+            if self.closed:
+                print(f"AgentWarmer: Workspace {self.workspace_id} is shut down, not warming")
+                return
+            if self._future is not None and not self._future.done():
+                self._future.cancel()
+            self._llm_config = llm_config
+            self._set_status('warming', 'Queued', 0.0, started_at=time.time(), finished_at=None)
+            self._future = asyncio.run_coroutine_threadsafe(self._warm(llm_config), self.loop)
+            self.last_used = time.time()
+
+    def restart(self):
+        """Re-run warm-up with the last LLM configuration (used as a cache listener)."""
+        print("AgentWarmer: Cache cleared, restarting warm-up")
+        self.start(self._llm_config)
+
+    def reload_servers(self):
+        """Hot-reload changed MCP servers on the warm agent without a full re-warm.
+
+        Falls back to ``MCPAgent.clear_cache`` (and therefore a full warm-up) when no warm
+        agent is available yet.
+        """
+        with self._lock:
+            if self.closed:
+                return
+            agent = self._agent if self.status['state'] in ('ready', 'reloading') else None
+            if agent is None:
+                print("AgentWarmer: No warm agent to reload, clearing cache instead")
+            else:
+                self._set_status('reloading', 'Reloading changed servers', 0.5)
+                self._future = asyncio.run_coroutine_threadsafe(self._reload(agent), self.loop)
+        if agent is None:
+            MCPAgent.clear_cache(self.workspace_id)
+
+    @contextmanager
+    def lease_agent(self, llm_config: Optional[Dict[str, Any]]) -> Iterator[Optional[MCPAgent]]:
+        """Yield the pre-warmed agent if it was built for ``llm_config`` and is usable, else None.
+
+        The agent's sessions stay open until the block exits, even if a re-warm or reload
+        replaces it meanwhile, so run the turn inside the block.
+        """
+        self.last_used = time.time()
+        agent = None
+        with self._lock:
+            # A reloading agent keeps serving turns with its previous tool set until the swap
+            if self.status['state'] in ('ready', 'reloading') and self._agent_key == llm_config_key(llm_config):
+                agent = self._agent
+                self._leases[id(agent)] = self._leases.get(id(agent), 0) + 1
+        try:
+            yield agent
+        finally:
+            if agent is not None:
+                with self._lock:
+                    self._leases[id(agent)] -= 1
+                    if not self._leases[id(agent)]:
+                        del self._leases[id(agent)]
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None):
+        """Run a coroutine on the warm-up loop from a synchronous caller and return its result.
+
+        Raises ``WarmerClosed`` (without running the coroutine) once the warmer is shut down.
+        """
+        with self._lock:
+            if self.closed:
+                coro.close()
+                raise WarmerClosed(f"Workspace {self.workspace_id} was shut down")
+            self._active_runs += 1
+        try:
+            return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+        finally:
+            with self._lock:
+                self._active_runs -= 1
+                self.last_used = time.time()
+
+    @property
+    def busy(self) -> bool:
+        """Whether a turn or warm-up is running, or an agent is leased, right now."""
+        return self._active_runs > 0 or bool(self._leases) \
+            or (self._future is not None and not self._future.done())
+
+    def close_if_idle(self) -> bool:
+        """Mark the warmer closed unless it is busy; call ``shutdown`` next if this returns True.
+
+        Checking and closing under the lock ``run`` takes means no turn can start between
+        the eviction decision and the shutdown.
+        """
+        with self._lock:
+            if self.busy:
+                return False
+            self.closed = True
+            return True
+
+    def shutdown(self):
+        """Stop warming and close this workspace's MCP sessions, e.g. when it is evicted.
+
+        Clears the workspace's ``MCPAgent`` cache without notifying listeners, so nothing
+        re-warms it. Afterwards the warmer refuses turns (see ``run``).
+        """
+        MCPAgent.remove_cache_listener(self.restart)
+        with self._lock:
+            self.closed = True
+            if self._future is not None and not self._future.done():
+                self._future.cancel()
+            agent, self._agent, self._agent_key = self._agent, None, None
+            self._set_status('idle', 'Shut down', 0.0)
+        cached = MCPAgent.evict_cache(self.workspace_id)
+        clients = [agent.client if agent is not None else None, cached['client'] if cached else None]
+        clients = list({id(client): client for client in clients if client is not None}.values())
+
+        async def close():
+            for client in clients:
+                try:
+                    await client.close_sessions()
+                except Exception as e:
+                    print(f"AgentWarmer: Failed to close sessions for workspace {self.workspace_id}: {e}")
+            if self._owns_loop:
+                self.loop.stop()
+
+        asyncio.run_coroutine_threadsafe(close(), self.loop)
+        print(f"AgentWarmer: Shut down workspace {self.workspace_id}")
+
+    def _set_status(self, state: str, stage: str, progress: float, **extra):
+        self.status = {**self.status, 'state': state, 'stage': stage,
+                       'progress': max(0.0, min(progress, 1.0)), **extra}
+
+    async def _warm(self, llm_config: Optional[Dict[str, Any]]):
+        previous_agent = self._agent
+        agent = None
+        try:
+            def on_progress(stage: str, fraction: float):
+                self._set_status('warming', stage, fraction)
+
+            if not llm_config:
+                self._set_status('idle', 'No LLM configuration to warm', 0.0, finished_at=time.time())
+                return
+
+            agent = MCPAgent(db_manager=self.db_manager)
+            await agent.initialize_agent(llm_config, on_progress=on_progress)
+
+            with self._lock:
+                self._agent = agent
+                self._agent_key = llm_config_key(llm_config)
+                self._set_status('ready', 'Ready', 1.0, error=None, finished_at=time.time())
+                self.last_used = time.time()  # Idle time counts from when the agent is usable
+            print(f"AgentWarmer: Warm-up finished in {self.status['finished_at'] - self.status['started_at']:.2f}s")
+        except asyncio.CancelledError:
+            print("AgentWarmer: Warm-up cancelled")
+            if agent is not None:
+                await agent.client.close_sessions()
+            raise
+        except Exception as e:
+            print(f"AgentWarmer: Warm-up failed: {e}")
+            import traceback
+            traceback.print_exc()
+            self._set_status('failed', 'Warm-up failed', 0.0, error=str(e), finished_at=time.time())
+            return
+
+        # Close the sessions of the agent we replaced, unless it is still the cached client
+        if previous_agent is not None and previous_agent is not self._agent \
+                and previous_agent.client is not MCPAgent.cached_client(self.workspace_id):
+            drain = asyncio.create_task(self._close_when_idle(previous_agent))
+            self._drains.add(drain)
+            drain.add_done_callback(self._drains.discard)
+
+    async def _wait_idle(self, agent: MCPAgent, poll_interval: float = 0.1):
+        """Wait until no caller holds ``agent`` from ``lease_agent`` and no turn runs on it."""
+        while True:
+            with self._lock:
+                if not self._leases.get(id(agent)) and agent.active_turns == 0:
+                    return
+            await asyncio.sleep(poll_interval)
+
+    async def _close_when_idle(self, agent: MCPAgent):
+        """Close a replaced agent's sessions once the turns still using it finish."""
+        await self._wait_idle(agent)
+        try:
+            await agent.client.close_sessions()
+        except Exception as e:
+            print(f"AgentWarmer: Failed to close replaced sessions for workspace {self.workspace_id}: {e}")
+
+    async def _reload(self, agent: MCPAgent):
+        if self._reload_lock is None:
+            self._reload_lock = asyncio.Lock()
+        # Serialize reloads so back-to-back Settings edits are applied in order
+        async with self._reload_lock:
+            try:
+                # Retired sessions close only once turns holding the agent (or its old tools) finish
+                diff = await agent.reload_servers(wait_idle=lambda: self._wait_idle(agent))
+                failed = diff.get('failed') or {}
+                self._set_status('ready', 'Ready', 1.0,
+                                 error=f"Failed servers: {', '.join(failed)}" if failed else None)
+            except Exception as e:
+                print(f"AgentWarmer: Hot reload failed, falling back to full warm-up: {e}")
+                MCPAgent.clear_cache(self.workspace_id)
@@ -0,0 +1,110 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from chat.warmup import AgentWarmer
+from database import DatabaseManager
+
+
+class WorkspaceAgents:
+    """
+    One ``AgentWarmer`` per workspace, all on a single background event loop.
+
+    Each workspace keeps its own discovered tools, MCP sessions and compiled agent. At
+    most ``max_workspaces`` stay warm: opening another evicts the least recently used
+    one, and workspaces idle for ``idle_seconds`` are evicted by a periodic sweep.
+    Eviction closes the workspace's sessions; its next use warms it up again. A
+    workspace with a turn in flight is never evicted. An evicted warmer refuses further
+    turns with ``WarmerClosed``, so callers that held on to it call ``warmer`` again.
+    """
+
+    def __init__(self, db_manager: Optional[DatabaseManager] = None, max_workspaces: Optional[int] = None,
+                 idle_seconds: Optional[float] = None, sweep_interval: float = 60.0):
+        self.db_manager = db_manager or DatabaseManager()
+        self.max_workspaces = max(1, max_workspaces if max_workspaces is not None
+                                  else int(os.getenv('MCP_WORKSPACE_CACHE_SIZE', 8)))
+        self.idle_seconds = idle_seconds if idle_seconds is not None \
+            else float(os.getenv('MCP_WORKSPACE_IDLE_SECONDS', 1800))
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="mcp-workspace-agents", daemon=True)
+        self.thread.start()
+
+        self._lock = threading.Lock()
+        self._warmers: "OrderedDict[int, AgentWarmer]" = OrderedDict()  # Least recently used first
+        self.stats = {'opened': 0, 'evicted_lru': 0, 'evicted_idle': 0}
+        if sweep_interval > 0 and self.idle_seconds > 0:
+            asyncio.run_coroutine_threadsafe(self._sweep_forever(sweep_interval), self.loop)
+
+    def warmer(self, workspace_id: int, llm_config: Optional[Dict[str, Any]] = None) -> AgentWarmer:
+        """The warmer for a workspace, created (and warming ``llm_config``) on first use."""
+        with self._lock:
+            warmer = self._warmers.get(workspace_id)
+            if warmer is None:
+                warmer = AgentWarmer(self.db_manager.for_workspace(workspace_id), loop=self.loop)
+                self._warmers[workspace_id] = warmer
+                self.stats['opened'] += 1
+                print(f"WorkspaceAgents: Opened workspace {workspace_id} ({len(self._warmers)} warm)")
+                warmer.start(llm_config)
+            self._warmers.move_to_end(workspace_id)
+            warmer.last_used = time.time()
+            evicted = self._pop_lru(keep=workspace_id)
+        for victim_id, victim in evicted:
+            print(f"WorkspaceAgents: Evicting least recently used workspace {victim_id}")
+            victim.shutdown()
+        return warmer
+
+    def evict(self, workspace_id: int) -> bool:
+        """Close a workspace's sessions and drop its agent (e.g. after deleting it)."""
+        with self._lock:
+            warmer = self._warmers.pop(workspace_id, None)
+        if warmer is None:
+            return False
+        warmer.shutdown()
+        return True
+
+    def evict_idle(self) -> List[int]:
+        """Evict workspaces unused for longer than ``idle_seconds``; returns their ids."""
+        cutoff = time.time() - self.idle_seconds
+        with self._lock:
+            idle = [(workspace_id, warmer) for workspace_id, warmer in self._warmers.items()
+                    if warmer.last_used < cutoff and warmer.close_if_idle()]
+            for workspace_id, _ in idle:
+                del self._warmers[workspace_id]
+            self.stats['evicted_idle'] += len(idle)
+        for workspace_id, warmer in idle:
+            print(f"WorkspaceAgents: Evicting workspace {workspace_id} after {self.idle_seconds:.0f}s idle")
+            warmer.shutdown()
+        return [workspace_id for workspace_id, _ in idle]
+
+    def _pop_lru(self, keep: int) -> List[tuple]:
+        evicted = []
+        for workspace_id in list(self._warmers):
+            if len(self._warmers) <= self.max_workspaces:
+                break
+            if workspace_id == keep or not self._warmers[workspace_id].close_if_idle():
+                continue
+            evicted.append((workspace_id, self._warmers.pop(workspace_id)))
+        self.stats['evicted_lru'] += len(evicted)
+        return evicted
+
+    async def _sweep_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            # Shutting a warmer down schedules work on this loop, so don't block it here
+            await asyncio.get_running_loop().run_in_executor(None, self.evict_idle)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Warm workspaces, most recently used first."""
+        now = time.time()
+        with self._lock:
+            warmers = list(self._warmers.items())
+        return [{
+            'workspace_id': workspace_id,
+            'state': warmer.status['state'],
+            'stage': warmer.status['stage'],
+            'idle_s': round(now - warmer.last_used, 1),
+            'busy': warmer.busy,
+        } for workspace_id, warmer in reversed(warmers)]
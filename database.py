@@ -1,126 +1,441 @@
 import sqlite3
 import os
-import json
-from typing import List, Dict, Optional, Any
+import serialization
+import time
+from typing import List, Dict, Optional, Any, Callable, Tuple
+
+# Workspace that existing configuration is migrated into and that managers use by default
+DEFAULT_WORKSPACE_ID = 1
+
+# Columns returned for an MCP server; env and headers come from mcp_server_settings
+SERVER_COLUMNS = ('id', 'workspace_id', 'name', 'description', 'transport', 'command', 'args', 'url', 'enabled')
+
+# Kinds of normalized per-server key/value rows
+SETTING_KINDS = ('env', 'headers')
+
+
+def _columns(cursor: sqlite3.Cursor, table: str) -> List[str]:
+    return [row[1] for row in cursor.execute(f'PRAGMA table_info({table})')]
+
+
+def _add_column(cursor: sqlite3.Cursor, table: str, column: str):
+    """Add ``column`` (a column definition) to ``table`` unless it already exists."""
+    if column.split()[0] not in _columns(cursor, table):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+
+
+def _migration_baseline(cursor: sqlite3.Cursor):
+    # The schema before versioning; databases created then may lack the later columns
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS mcp_servers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            description TEXT,
+            transport TEXT NOT NULL,
+            command TEXT,
+            args TEXT,
+            env TEXT,
+            url TEXT,
+            enabled BOOLEAN DEFAULT 1
+        )
+    ''')
+    _add_column(cursor, 'mcp_servers', 'env TEXT')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS llm_configs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            provider TEXT NOT NULL,
+            api_key TEXT NOT NULL,
+            model TEXT,
+            base_url TEXT,
+            enabled BOOLEAN DEFAULT 1
+        )
+    ''')
+    # Routing and rate limit columns
+    for column in ("fallbacks TEXT", "hedge_delay_ms INTEGER", "rpm_limit INTEGER", "tpm_limit INTEGER"):
+        _add_column(cursor, 'llm_configs', column)
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS system_instructions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content TEXT
+        )
+    ''')
+
+    # Response cache (see chat/response_cache.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS response_cache (
+            cache_key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_used_at REAL NOT NULL,
+            hits INTEGER DEFAULT 0
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_response_cache_last_used ON response_cache (last_used_at)')
+
+
+def _migration_enabled_indexes(cursor: sqlite3.Cursor):
+    # Names are UNIQUE and so already indexed; these cover the enabled_only listings
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_mcp_servers_enabled ON mcp_servers (enabled)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_llm_configs_enabled ON llm_configs (enabled)')
+
+
+def _migration_instruction_history(cursor: sqlite3.Cursor):
+    # Revisions move to instruction_history; a one-row pointer names the active one
+    cursor.execute('''
+        CREATE TABLE instruction_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content TEXT,
+            created_at REAL NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE active_instruction (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            history_id INTEGER REFERENCES instruction_history (id)
+        )
+    ''')
+    cursor.execute('INSERT INTO instruction_history (id, content, created_at) '
+                   'SELECT id, content, ? FROM system_instructions ORDER BY id', (time.time(),))
+    cursor.execute('INSERT INTO active_instruction (id, history_id) '
+                   'VALUES (1, (SELECT MAX(id) FROM instruction_history))')
+    cursor.execute('DROP TABLE system_instructions')
+
+
+def _migration_server_settings(cursor: sqlite3.Cursor):
+    # One row per environment variable or HTTP header instead of a JSON blob
+    cursor.execute('''
+        CREATE TABLE mcp_server_settings (
+            server_id INTEGER NOT NULL REFERENCES mcp_servers (id) ON DELETE CASCADE,
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT,
+            PRIMARY KEY (server_id, kind, key)
+        ) WITHOUT ROWID
+    ''')
+    rows = []
+    for server_id, env in cursor.execute('SELECT id, env FROM mcp_servers WHERE env IS NOT NULL').fetchall():
+        try:
+            env = serialization.loads(env)
+        except (serialization.JSONDecodeError, TypeError):
+            env = None
+        if isinstance(env, dict):
+            rows.extend((server_id, 'env', str(key), None if value is None else str(value))
+                        for key, value in env.items())
+    cursor.executemany('INSERT INTO mcp_server_settings (server_id, kind, key, value) VALUES (?, ?, ?, ?)', rows)
+    # The legacy column is left in place (but emptied) so older code can still open the file
+    cursor.execute('UPDATE mcp_servers SET env = NULL')
+
+
+def _migration_workspaces(cursor: sqlite3.Cursor):
+    # Servers, LLM configurations and instructions belong to a workspace; everything that
+    # existed before moves to the default one
+    cursor.execute('''
+        CREATE TABLE workspaces (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            description TEXT,
+            created_at REAL NOT NULL
+        )
+    ''')
+    cursor.execute('INSERT INTO workspaces (id, name, created_at) VALUES (?, ?, ?)',
+                   (DEFAULT_WORKSPACE_ID, 'Default', time.time()))
+
+    # Names become unique per workspace, which SQLite can only do by rebuilding the tables
+    cursor.execute(f'''
+        CREATE TABLE mcp_servers_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            workspace_id INTEGER NOT NULL DEFAULT {DEFAULT_WORKSPACE_ID} REFERENCES workspaces (id),
+            name TEXT NOT NULL,
+            description TEXT,
+            transport TEXT NOT NULL,
+            command TEXT,
+            args TEXT,
+            env TEXT,
+            url TEXT,
+            enabled BOOLEAN DEFAULT 1,
+            UNIQUE (workspace_id, name)
+        )
+    ''')
+    columns = 'id, name, description, transport, command, args, env, url, enabled'
+    cursor.execute(f'INSERT INTO mcp_servers_new ({columns}) SELECT {columns} FROM mcp_servers')
+    cursor.execute('DROP TABLE mcp_servers')
+    cursor.execute('ALTER TABLE mcp_servers_new RENAME TO mcp_servers')
+    cursor.execute('CREATE INDEX idx_mcp_servers_workspace_enabled ON mcp_servers (workspace_id, enabled)')
+
+    cursor.execute(f'''
+        CREATE TABLE llm_configs_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            workspace_id INTEGER NOT NULL DEFAULT {DEFAULT_WORKSPACE_ID} REFERENCES workspaces (id),
+            name TEXT NOT NULL,
+            provider TEXT NOT NULL,
+            api_key TEXT NOT NULL,
+            model TEXT,
+            base_url TEXT,
+            enabled BOOLEAN DEFAULT 1,
+            fallbacks TEXT,
+            hedge_delay_ms INTEGER,
+            rpm_limit INTEGER,
+            tpm_limit INTEGER,
+            UNIQUE (workspace_id, name)
+        )
+    ''')
+    columns = 'id, name, provider, api_key, model, base_url, enabled, fallbacks, hedge_delay_ms, rpm_limit, tpm_limit'
+    cursor.execute(f'INSERT INTO llm_configs_new ({columns}) SELECT {columns} FROM llm_configs')
+    cursor.execute('DROP TABLE llm_configs')
+    cursor.execute('ALTER TABLE llm_configs_new RENAME TO llm_configs')
+    cursor.execute('CREATE INDEX idx_llm_configs_workspace_enabled ON llm_configs (workspace_id, enabled)')
+
+    # One active-instruction pointer per workspace
+    _add_column(cursor, 'instruction_history', f'workspace_id INTEGER NOT NULL DEFAULT {DEFAULT_WORKSPACE_ID}')
+    cursor.execute('CREATE INDEX idx_instruction_history_workspace ON instruction_history (workspace_id, id)')
+    cursor.execute('''
+        CREATE TABLE active_instructions (
+            workspace_id INTEGER PRIMARY KEY REFERENCES workspaces (id),
+            history_id INTEGER REFERENCES instruction_history (id)
+        )
+    ''')
+    cursor.execute('INSERT INTO active_instructions (workspace_id, history_id) '
+                   'SELECT ?, history_id FROM active_instruction WHERE id = 1', (DEFAULT_WORKSPACE_ID,))
+    cursor.execute('DROP TABLE active_instruction')
+
+
+# Schema migrations in order: (version, name, function). Append new ones; never edit
+# or renumber one that has shipped.
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Cursor], None]]] = [
+    (1, "baseline", _migration_baseline),
+    (2, "enabled_indexes", _migration_enabled_indexes),
+    (3, "instruction_history", _migration_instruction_history),
+    (4, "server_settings", _migration_server_settings),
+    (5, "workspaces", _migration_workspaces),
+]
+
 
 class DatabaseManager:
-    def __init__(self, db_path: str = "mcp_config.db"):
+    """
+    SQLite-backed configuration store.
+
+    A manager is bound to one workspace: server, LLM configuration and instruction
+    methods only see and change that workspace's rows. Use ``for_workspace`` to get a
+    manager for another workspace of the same database.
+    """
+
+    def __init__(self, db_path: str = "mcp_config.db", workspace_id: int = DEFAULT_WORKSPACE_ID):
         self.db_path = db_path
+        self.workspace_id = workspace_id
+        # Saved instruction revisions to keep; older ones are pruned on save
+        self.instruction_history_limit = int(os.getenv('MCP_INSTRUCTION_HISTORY_LIMIT', 50))
         self.init_database()
     
     def init_database(self):
-        """Initialize the database with required tables."""
+        """Initialize the database, applying any pending schema migrations."""
+        self.migrate()
+    
+    def schema_version(self) -> int:
+        """The latest migration applied to the database (0 for a new file)."""
         conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Create MCP servers table
+        try:
+            return self._schema_version(conn.cursor())
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _schema_version(cursor: sqlite3.Cursor) -> int:
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS mcp_servers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL,
-                description TEXT,
-                transport TEXT NOT NULL,
-                command TEXT,
-                args TEXT,
-                env TEXT,
-                url TEXT,
-                enabled BOOLEAN DEFAULT 1
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at REAL NOT NULL
             )
         ''')
+        return cursor.execute('SELECT COALESCE(MAX(version), 0) FROM schema_migrations').fetchone()[0]
+    
+    def migrate(self) -> int:
+        """Apply pending migrations, each in its own transaction; returns the schema version.
 
-        # Add env column if it doesn't exist (for database migration)
+        Safe to call from several processes at once: the version is re-read after taking
+        the write lock, so each migration runs exactly once.
+        """
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        cursor = conn.cursor()
         try:
-            cursor.execute("ALTER TABLE mcp_servers ADD COLUMN env TEXT")
-        except sqlite3.OperationalError:
-            # Column already exists
-            pass
+            version = self._schema_version(cursor)
+            for number, name, migration in MIGRATIONS:
+                if number <= version:
+                    continue
+                cursor.execute('BEGIN IMMEDIATE')
+                try:
+                    if self._schema_version(cursor) >= number:
+                        cursor.execute('COMMIT')
+                        continue
+                    migration(cursor)
+                    cursor.execute('INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)',
+                                   (number, name, time.time()))
+                    cursor.execute('COMMIT')
+                except Exception:
+                    cursor.execute('ROLLBACK')
+                    raise
+                version = number
+                print(f"DatabaseManager: Applied migration {number} ({name}) to {self.db_path}")
+            return version
+        finally:
+            conn.close()
+    
+    def for_workspace(self, workspace_id: int) -> "DatabaseManager":
+        """A manager for another workspace of the same database file."""
+        if workspace_id == self.workspace_id:
+            return self
+        manager = DatabaseManager(self.db_path, workspace_id)
+        manager.instruction_history_limit = self.instruction_history_limit
+        return manager
+    
+    def get_workspaces(self) -> List[Dict[str, Any]]:
+        """Retrieve all workspaces, the default one first."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
         
-        # Create LLM configurations table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS llm_configs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL,
-                provider TEXT NOT NULL,
-                api_key TEXT NOT NULL,
-                model TEXT,
-                base_url TEXT,
-                enabled BOOLEAN DEFAULT 1
-            )
-        ''')
+        cursor.execute('SELECT id, name, description, created_at FROM workspaces ORDER BY id')
+        workspaces = [dict(zip(('id', 'name', 'description', 'created_at'), row)) for row in cursor.fetchall()]
         
-        # Create system instructions table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS system_instructions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                content TEXT
-            )
-        ''')
+        conn.close()
+        return workspaces
+    
+    def get_workspace(self, workspace_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Retrieve one workspace (this manager's by default)."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
         
-        # Initialize with default empty instruction if table is empty
-        cursor.execute('SELECT COUNT(*) FROM system_instructions')
-        count = cursor.fetchone()[0]
-        if count == 0:
-            cursor.execute('INSERT INTO system_instructions (content) VALUES (?)', (None,))
+        cursor.execute('SELECT id, name, description, created_at FROM workspaces WHERE id = ?',
+                       (self.workspace_id if workspace_id is None else workspace_id,))
+        row = cursor.fetchone()
         
-        conn.commit()
         conn.close()
+        return dict(zip(('id', 'name', 'description', 'created_at'), row)) if row else None
+    
+    def add_workspace(self, name: str, description: Optional[str] = None) -> Optional[int]:
+        """Add a workspace and return its id, or None if the name is taken."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            
+            cursor.execute('INSERT INTO workspaces (name, description, created_at) VALUES (?, ?, ?)',
+                           (name, description, time.time()))
+            workspace_id = cursor.lastrowid
+            
+            conn.commit()
+            return workspace_id
+        except sqlite3.IntegrityError:
+            # Workspace with this name already exists
+            return None
+        except Exception:
+            return None
+        finally:
+            # Also releases the write lock a failed insert may still hold
+            conn.close()
+    
+    def delete_workspace(self, workspace_id: int) -> bool:
+        """Delete a workspace with all of its servers, LLM configurations and instructions.
+
+        The default workspace can't be deleted.
+        """
+        if workspace_id == DEFAULT_WORKSPACE_ID:
+            return False
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            cursor.execute('DELETE FROM mcp_server_settings WHERE server_id IN '
+                           '(SELECT id FROM mcp_servers WHERE workspace_id = ?)', (workspace_id,))
+            for table in ('mcp_servers', 'llm_configs', 'active_instructions', 'instruction_history'):
+                cursor.execute(f'DELETE FROM {table} WHERE workspace_id = ?', (workspace_id,))
+            cursor.execute('DELETE FROM workspaces WHERE id = ?', (workspace_id,))
+            deleted = cursor.rowcount > 0
+            
+            conn.commit()
+            conn.close()
+            return deleted
+        except Exception:
+            return False
+    
+    def _owns(self, cursor: sqlite3.Cursor, table: str, row_id: int) -> bool:
+        """Whether row ``row_id`` of ``table`` belongs to this manager's workspace."""
+        cursor.execute(f'SELECT 1 FROM {table} WHERE id = ? AND workspace_id = ?', (row_id, self.workspace_id))
+        return cursor.fetchone() is not None
+    
+    @staticmethod
+    def _write_settings(cursor: sqlite3.Cursor, server_id: int, kind: str, values: Optional[Dict[str, Any]]):
+        """Replace a server's ``kind`` rows (env or headers) with ``values``."""
+        cursor.execute('DELETE FROM mcp_server_settings WHERE server_id = ? AND kind = ?', (server_id, kind))
+        if values:
+            cursor.executemany(
+                'INSERT INTO mcp_server_settings (server_id, kind, key, value) VALUES (?, ?, ?, ?)',
+                [(server_id, kind, str(key), None if value is None else str(value)) for key, value in values.items()])
     
     def add_mcp_server(self, name: str, transport: str, command: Optional[str] = None,
                       args: Optional[Any] = None, env: Optional[Dict[str, str]] = None,
-                      url: Optional[str] = None, description: Optional[str] = None) -> bool:
+                      url: Optional[str] = None, description: Optional[str] = None,
+                      headers: Optional[Dict[str, str]] = None) -> bool:
         """Add a new MCP server configuration."""
+        conn = sqlite3.connect(self.db_path)
         try:
-            conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
 
-            # Convert args and env to JSON string for storage
-            args_str = json.dumps(args) if args is not None else None
-            env_str = json.dumps(env) if env is not None else None
+            # Convert args to a JSON string for storage
+            args_str = serialization.dumps(args) if args is not None else None
 
             cursor.execute('''
-                INSERT INTO mcp_servers (name, description, transport, command, args, env, url)
+                INSERT INTO mcp_servers (workspace_id, name, description, transport, command, args, url)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (name, description, transport, command, args_str, env_str, url))
+            ''', (self.workspace_id, name, description, transport, command, args_str, url))
+            server_id = cursor.lastrowid
+            self._write_settings(cursor, server_id, 'env', env)
+            self._write_settings(cursor, server_id, 'headers', headers)
 
             conn.commit()
-            conn.close()
             return True
         except sqlite3.IntegrityError:
             # Server with this name already exists
             return False
         except Exception:
             return False
+        finally:
+            # Also releases the write lock a failed insert may still hold
+            conn.close()
     
     def get_mcp_servers(self, enabled_only: bool = True) -> List[Dict[str, Any]]:
-        """Retrieve all MCP server configurations."""
+        """Retrieve all MCP server configurations, with their ``env`` and ``headers`` dicts."""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
 
-        if enabled_only:
-            cursor.execute('SELECT * FROM mcp_servers WHERE enabled = 1')
-        else:
-            cursor.execute('SELECT * FROM mcp_servers')
+        where = ' AND enabled = 1' if enabled_only else ''
+        cursor.execute(f"SELECT {', '.join(SERVER_COLUMNS)} FROM mcp_servers WHERE workspace_id = ?{where} ORDER BY id",
+                       (self.workspace_id,))
+        servers = [dict(zip(SERVER_COLUMNS, row)) for row in cursor.fetchall()]
 
-        rows = cursor.fetchall()
-        columns = [description[0] for description in cursor.description]
-
-        servers = []
-        for row in rows:
-            server = dict(zip(columns, row))
-            # Convert args and env JSON strings back to original format
+        by_id = {}
+        for server in servers:
+            # Convert the args JSON string back to its original format
             if server['args']:
                 try:
-                    server['args'] = json.loads(server['args'])
-                except (json.JSONDecodeError, TypeError):
+                    server['args'] = serialization.loads(server['args'])
+                except (serialization.JSONDecodeError, TypeError):
                     # If parsing fails, keep as string
                     pass
-            if server['env']:
-                try:
-                    server['env'] = json.loads(server['env'])
-                except (json.JSONDecodeError, TypeError):
-                    # If parsing fails, keep as dict with error
-                    server['env'] = {}
-            servers.append(server)
+            server.update({kind: {} for kind in SETTING_KINDS})
+            by_id[server['id']] = server
+
+        if by_id:
+            cursor.execute('''
+                SELECT s.server_id, s.kind, s.key, s.value FROM mcp_server_settings s
+                JOIN mcp_servers m ON m.id = s.server_id
+                WHERE m.workspace_id = ?
+            ''' + (' AND m.enabled = 1' if enabled_only else ''), (self.workspace_id,))
+            for server_id, kind, key, value in cursor.fetchall():
+                if server_id in by_id and kind in SETTING_KINDS:
+                    by_id[server_id][kind][key] = value
 
         conn.close()
         return servers
@@ -134,21 +449,29 @@ class DatabaseManager:
             # Build dynamic update query
             fields = []
             values = []
+            settings = {}
             for key, value in kwargs.items():
-                if key in ['name', 'description', 'transport', 'command', 'args', 'env', 'url', 'enabled']:
+                if key in ['name', 'description', 'transport', 'command', 'args', 'url', 'enabled']:
                     fields.append(f"{key} = ?")
-                    # Convert args and env to JSON string for storage
-                    if key in ['args', 'env']:
-                        value = json.dumps(value) if value is not None else None
+                    # Convert args to a JSON string for storage
+                    if key == 'args':
+                        value = serialization.dumps(value) if value is not None else None
                     values.append(value)
+                elif key in SETTING_KINDS:
+                    settings[key] = value
 
-            if not fields:
+            if not fields and not settings:
                 return False
 
-            values.append(server_id)
-            query = f"UPDATE mcp_servers SET {', '.join(fields)} WHERE id = ?"
-
-            cursor.execute(query, values)
+            if not self._owns(cursor, 'mcp_servers', server_id):
+                conn.close()
+                return False
+            if fields:
+                values.append(server_id)
+                query = f"UPDATE mcp_servers SET {', '.join(fields)} WHERE id = ?"
+                cursor.execute(query, values)
+            for kind, value in settings.items():
+                self._write_settings(cursor, server_id, kind, value)
             conn.commit()
             conn.close()
             return True
@@ -161,6 +484,11 @@ class DatabaseManager:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
+            if not self._owns(cursor, 'mcp_servers', server_id):
+                conn.close()
+                return False
+            # Foreign keys are off by default in SQLite, so the cascade isn't relied on
+            cursor.execute('DELETE FROM mcp_server_settings WHERE server_id = ?', (server_id,))
             cursor.execute('DELETE FROM mcp_servers WHERE id = ?', (server_id,))
             
             conn.commit()
@@ -170,25 +498,37 @@ class DatabaseManager:
             return False
     
     def add_llm_config(self, name: str, provider: str, api_key: str, 
-                      model: Optional[str] = None, base_url: Optional[str] = None) -> bool:
-        """Add a new LLM configuration."""
+                      model: Optional[str] = None, base_url: Optional[str] = None,
+                      fallbacks: Optional[List[str]] = None, hedge_delay_ms: Optional[int] = None,
+                      rpm_limit: Optional[int] = None, tpm_limit: Optional[int] = None) -> bool:
+        """Add a new LLM configuration.
+
+        ``fallbacks`` lists the names of configurations to try, in order, when this one
+        fails; ``hedge_delay_ms`` starts a request to the next one if this one hasn't
+        produced a first token within that many milliseconds. ``rpm_limit`` and
+        ``tpm_limit`` cap requests and tokens per minute sent from this process.
+        """
+        conn = sqlite3.connect(self.db_path)
         try:
-            conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
+            fallbacks_str = serialization.dumps(fallbacks) if fallbacks else None
             cursor.execute('''
-                INSERT INTO llm_configs (name, provider, api_key, model, base_url)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (name, provider, api_key, model, base_url))
+                INSERT INTO llm_configs (workspace_id, name, provider, api_key, model, base_url, fallbacks,
+                                         hedge_delay_ms, rpm_limit, tpm_limit)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (self.workspace_id, name, provider, api_key, model, base_url, fallbacks_str, hedge_delay_ms, rpm_limit, tpm_limit))
             
             conn.commit()
-            conn.close()
             return True
         except sqlite3.IntegrityError:
             # Config with this name already exists
             return False
         except Exception:
             return False
+        finally:
+            # Also releases the write lock a failed insert may still hold
+            conn.close()
     
     def get_llm_configs(self, enabled_only: bool = True) -> List[Dict[str, Any]]:
         """Retrieve all LLM configurations."""
@@ -196,21 +536,48 @@ class DatabaseManager:
         cursor = conn.cursor()
         
         if enabled_only:
-            cursor.execute('SELECT * FROM llm_configs WHERE enabled = 1')
+            cursor.execute('SELECT * FROM llm_configs WHERE workspace_id = ? AND enabled = 1 ORDER BY id',
+                           (self.workspace_id,))
         else:
-            cursor.execute('SELECT * FROM llm_configs')
+            cursor.execute('SELECT * FROM llm_configs WHERE workspace_id = ? ORDER BY id', (self.workspace_id,))
         
         rows = cursor.fetchall()
         columns = [description[0] for description in cursor.description]
         
-        configs = []
-        for row in rows:
-            config = dict(zip(columns, row))
-            configs.append(config)
+        configs = [self._llm_config_from_row(columns, row) for row in rows]
         
         conn.close()
         return configs
     
+    def get_llm_config(self, name: Optional[str] = None, config_id: Optional[int] = None,
+                       enabled_only: bool = True) -> Optional[Dict[str, Any]]:
+        """Retrieve a single LLM configuration by name or id (an indexed lookup)."""
+        if name is None and config_id is None:
+            raise ValueError("Either name or config_id is required")
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        column, value = ('id', config_id) if config_id is not None else ('name', name)
+        query = f'SELECT * FROM llm_configs WHERE {column} = ? AND workspace_id = ?'
+        if enabled_only:
+            query += ' AND enabled = 1'
+        cursor.execute(query, (value, self.workspace_id))
+        row = cursor.fetchone()
+        columns = [description[0] for description in cursor.description]
+        
+        conn.close()
+        return self._llm_config_from_row(columns, row) if row else None
+    
+    @staticmethod
+    def _llm_config_from_row(columns: List[str], row: tuple) -> Dict[str, Any]:
+        config = dict(zip(columns, row))
+        # Convert the fallbacks JSON string back to a list of configuration names
+        try:
+            config['fallbacks'] = serialization.loads(config['fallbacks']) if config.get('fallbacks') else []
+        except (serialization.JSONDecodeError, TypeError):
+            config['fallbacks'] = []
+        return config
+    
     def update_llm_config(self, config_id: int, **kwargs) -> bool:
         """Update an existing LLM configuration."""
         try:
@@ -221,20 +588,25 @@ class DatabaseManager:
             fields = []
             values = []
             for key, value in kwargs.items():
-                if key in ['name', 'provider', 'api_key', 'model', 'base_url', 'enabled']:
+                if key in ['name', 'provider', 'api_key', 'model', 'base_url', 'enabled', 'hedge_delay_ms',
+                           'rpm_limit', 'tpm_limit']:
                     fields.append(f"{key} = ?")
                     values.append(value)
+                elif key == 'fallbacks':
+                    fields.append("fallbacks = ?")
+                    values.append(serialization.dumps(value) if value else None)
             
             if not fields:
                 return False
                 
-            values.append(config_id)
-            query = f"UPDATE llm_configs SET {', '.join(fields)} WHERE id = ?"
+            values.extend((config_id, self.workspace_id))
+            query = f"UPDATE llm_configs SET {', '.join(fields)} WHERE id = ? AND workspace_id = ?"
             
             cursor.execute(query, values)
+            updated = cursor.rowcount > 0  # False for another workspace's configuration
             conn.commit()
             conn.close()
-            return True
+            return updated
         except Exception:
             return False
     
@@ -244,20 +616,25 @@ class DatabaseManager:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
-            cursor.execute('DELETE FROM llm_configs WHERE id = ?', (config_id,))
+            cursor.execute('DELETE FROM llm_configs WHERE id = ? AND workspace_id = ?', (config_id, self.workspace_id))
+            deleted = cursor.rowcount > 0
             
             conn.commit()
             conn.close()
-            return True
+            return deleted
         except Exception:
             return False
     
     def get_system_instructions(self) -> Optional[str]:
-        """Retrieve the system instructions."""
+        """Retrieve the active system instructions."""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
-        cursor.execute('SELECT content FROM system_instructions ORDER BY id DESC LIMIT 1')
+        cursor.execute('''
+            SELECT h.content FROM active_instructions a
+            JOIN instruction_history h ON h.id = a.history_id
+            WHERE a.workspace_id = ?
+        ''', (self.workspace_id,))
         row = cursor.fetchone()
         
         conn.close()
@@ -267,16 +644,136 @@ class DatabaseManager:
         return None
     
     def update_system_instructions(self, content: Optional[str]) -> bool:
-        """Update the system instructions."""
+        """Save a new revision of the system instructions and make it active.
+
+        Revisions beyond ``instruction_history_limit`` are pruned, oldest first.
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            cursor.execute('INSERT INTO instruction_history (workspace_id, content, created_at) VALUES (?, ?, ?)',
+                           (self.workspace_id, content, time.time()))
+            self._activate_instruction(cursor, cursor.lastrowid)
+            self._prune_instruction_history(cursor)
+            
+            conn.commit()
+            conn.close()
+            return True
+        except Exception:
+            return False
+    
+    def get_instruction_history(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent instruction revisions first, each flagged ``active`` or not."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT h.id, h.content, h.created_at, h.id = a.history_id FROM instruction_history h
+            LEFT JOIN active_instructions a ON a.workspace_id = h.workspace_id
+            WHERE h.workspace_id = ?
+            ORDER BY h.id DESC LIMIT ?
+        ''', (self.workspace_id, limit))
+        history = [{'id': row[0], 'content': row[1], 'created_at': row[2], 'active': bool(row[3])}
+                   for row in cursor.fetchall()]
+        
+        conn.close()
+        return history
+    
+    def activate_instruction(self, history_id: int) -> bool:
+        """Make an earlier revision the active system instructions again."""
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
-            # Insert new instruction (keeping history)
-            cursor.execute('INSERT INTO system_instructions (content) VALUES (?)', (content,))
+            cursor.execute('SELECT 1 FROM instruction_history WHERE id = ? AND workspace_id = ?',
+                           (history_id, self.workspace_id))
+            if cursor.fetchone() is None:
+                conn.close()
+                return False
+            self._activate_instruction(cursor, history_id)
             
             conn.commit()
             conn.close()
             return True
         except Exception:
-            return False
\ No newline at end of file
+            return False
+    
+    def _activate_instruction(self, cursor: sqlite3.Cursor, history_id: int):
+        cursor.execute('INSERT OR REPLACE INTO active_instructions (workspace_id, history_id) VALUES (?, ?)',
+                       (self.workspace_id, history_id))
+    
+    def _prune_instruction_history(self, cursor: sqlite3.Cursor):
+        # Keep the newest revisions, and the active one wherever it is
+        cursor.execute('''
+            DELETE FROM instruction_history
+            WHERE workspace_id = ?
+            AND id < (SELECT COALESCE(MIN(id), 0) FROM
+                      (SELECT id FROM instruction_history WHERE workspace_id = ? ORDER BY id DESC LIMIT ?))
+            AND id NOT IN (SELECT history_id FROM active_instructions WHERE history_id IS NOT NULL)
+        ''', (self.workspace_id, self.workspace_id, max(1, self.instruction_history_limit)))
+
+    def get_cached_response(self, cache_key: str, ttl_seconds: float) -> Optional[str]:
+        """Return a cached response that is younger than ``ttl_seconds``, or None."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        now = time.time()
+
+        cursor.execute('SELECT response, created_at FROM response_cache WHERE cache_key = ?', (cache_key,))
+        row = cursor.fetchone()
+        response = None
+        if row and now - row[1] <= ttl_seconds:
+            response = row[0]
+            cursor.execute('UPDATE response_cache SET last_used_at = ?, hits = hits + 1 WHERE cache_key = ?',
+                           (now, cache_key))
+        elif row:
+            cursor.execute('DELETE FROM response_cache WHERE cache_key = ?', (cache_key,))
+
+        conn.commit()
+        conn.close()
+        return response
+
+    def put_cached_response(self, cache_key: str, response: str, ttl_seconds: float,
+                            max_entries: int, max_bytes: int) -> bool:
+        """Store a response, then evict expired and least recently used entries over the limits."""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            now = time.time()
+
+            cursor.execute('''
+                INSERT OR REPLACE INTO response_cache (cache_key, response, size, created_at, last_used_at, hits)
+                VALUES (?, ?, ?, ?, ?, 0)
+            ''', (cache_key, response, len(response.encode('utf-8')), now, now))
+            cursor.execute('DELETE FROM response_cache WHERE created_at < ?', (now - ttl_seconds,))
+
+            cursor.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache')
+            count, total_bytes = cursor.fetchone()
+            if count > max_entries or total_bytes > max_bytes:
+                cursor.execute('SELECT cache_key, size FROM response_cache ORDER BY last_used_at ASC')
+                evict = []
+                for key, size in cursor.fetchall():
+                    if count <= max_entries and total_bytes <= max_bytes:
+                        break
+                    evict.append((key,))
+                    count -= 1
+                    total_bytes -= size
+                cursor.executemany('DELETE FROM response_cache WHERE cache_key = ?', evict)
+
+            conn.commit()
+            conn.close()
+            return True
+        except Exception:
+            return False
+
+    def clear_response_cache(self) -> bool:
+        """Delete every cached response."""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM response_cache')
+            conn.commit()
+            conn.close()
+            return True
+        except Exception:
+            return False
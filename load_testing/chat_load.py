@@ -0,0 +1,278 @@
+"""Load generator for concurrent chat sessions.
+
+Drives many simultaneous ``MCPAgent.execute`` conversations against the stub
+LLM in ``load_testing/stubs.py`` and the synthetic servers registered by
+``load_testing/scenarios.py``, then reports throughput, latency percentiles,
+error rates, and stdio subprocess count / RSS sampled over time:
+
+    python load_testing/chat_load.py --scenario baseline --sessions 200 \\
+        --arrival-rate 20 --turns 3 --think-time 0.5 --quiet
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from chat.agent import is_error_response
+from database import DatabaseManager
+from load_testing.scenarios import DEFAULT_SCRATCH_DB, SCENARIOS, setup_scenario
+from load_testing.stubs import StubChatModel
+
+try:
+    import psutil
+except ImportError:  # psutil is optional; fall back to /proc on Linux
+    psutil = None
+
+
+def _read_rss_bytes() -> Optional[int]:
+    """Resident set size of this process, or None if it can't be determined."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _count_child_processes() -> Optional[int]:
+    """Number of descendant processes (the stdio MCP servers), or None if unknown."""
+    if psutil is not None:
+        return len(psutil.Process().children(recursive=True))
+    if not os.path.isdir("/proc"):
+        return None
+    parents: Dict[int, int] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat:
+                # The command name may contain spaces, so split after the closing paren
+                fields = stat.read().rsplit(")", 1)[1].split()
+            parents[int(entry)] = int(fields[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    descendants = set()
+    frontier = {os.getpid()}
+    while frontier:
+        frontier = {pid for pid, ppid in parents.items() if ppid in frontier and pid not in descendants}
+        descendants |= frontier
+    return len(descendants)
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(percent / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+class StubbedMCPAgent:
+    """Factory for MCPAgent instances whose chat model is a ``StubChatModel``."""
+
+    def __init__(self, db_manager: DatabaseManager, llm_options: Dict[str, Any]):
+        from chat.agent import MCPAgent
+
+        class _Agent(MCPAgent):
+            def _create_chat_model(self, config: Dict[str, Any]):
+                return StubChatModel(**llm_options)
+
+        self.agent_class = _Agent
+        self.db_manager = db_manager
+
+    async def create(self):
+        agent = self.agent_class(db_manager=self.db_manager)
+        await agent.initialize_agent({'provider': 'stub', 'model': None, 'api_key': '', 'base_url': None})
+        return agent
+
+
+class LoadRun:
+    """Arrival process, session workers and resource sampler for one load run."""
+
+    def __init__(self, factory: StubbedMCPAgent, sessions: int, arrival_rate: float,
+                 turns: int, think_time: float, share_agent: bool, sample_interval: float,
+                 seed: Optional[int] = None):
+        self.factory = factory
+        self.sessions = sessions
+        self.arrival_rate = arrival_rate
+        self.turns = turns
+        self.think_time = think_time
+        self.share_agent = share_agent
+        self.sample_interval = sample_interval
+        self.rng = random.Random(seed)
+        self.latencies: List[float] = []
+        self.errors: Dict[str, int] = {}
+        self.samples: List[Dict[str, Any]] = []
+        self.active_sessions = 0
+        self.shared_agent = None
+        self.token_usage: Dict[str, int] = {}
+        self.tool_stats: Dict[str, Dict[str, Any]] = {}
+
+    async def _turn(self, agent, session_id: int, turn: int, history: List[tuple]):
+        prompt = f"Session {session_id} turn {turn}: please use a tool if helpful."
+        start = time.perf_counter()
+        try:
+            response = await agent.execute(prompt, history)
+            if is_error_response(response):
+                raise RuntimeError(response)
+            self.latencies.append(time.perf_counter() - start)
+            history.extend([("human", prompt), ("ai", response)])
+        except Exception as e:
+            key = type(e).__name__ if not isinstance(e, RuntimeError) else str(e)[:80]
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def _add_usage(self, agent):
+        for key, value in agent.usage_totals.items():
+            self.token_usage[key] = self.token_usage.get(key, 0) + value
+        # Agents share the cached MCP client, so its registry already covers every session
+        self.tool_stats = {name: {"server": stats["server"], "calls": stats["calls"], "errors": stats["errors"],
+                                  "mean_s": round(stats["mean_seconds"], 4)}
+                           for name, stats in agent.client.tool_stats().items() if stats["calls"]}
+
+    async def _session(self, session_id: int):
+        self.active_sessions += 1
+        try:
+            agent = self.shared_agent or await self.factory.create()
+            history: List[tuple] = []
+            for turn in range(self.turns):
+                await self._turn(agent, session_id, turn, history)
+                if turn < self.turns - 1 and self.think_time > 0:
+                    await asyncio.sleep(self.rng.expovariate(1 / self.think_time))
+            if agent is not self.shared_agent:
+                self._add_usage(agent)
+        except Exception as e:
+            key = f"session setup: {type(e).__name__}"
+            self.errors[key] = self.errors.get(key, 0) + 1
+        finally:
+            self.active_sessions -= 1
+
+    async def _sampler(self, started: float, stop: asyncio.Event):
+        while not stop.is_set():
+            self.samples.append({
+                "t": round(time.perf_counter() - started, 3),
+                "active_sessions": self.active_sessions,
+                "child_processes": _count_child_processes(),
+                "rss_mb": round((_read_rss_bytes() or 0) / 1_048_576, 1),
+            })
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.sample_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self) -> Dict[str, Any]:
+        if self.share_agent:
+            self.shared_agent = await self.factory.create()
+
+        started = time.perf_counter()
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(self._sampler(started, stop))
+
+        tasks = []
+        for session_id in range(self.sessions):
+            tasks.append(asyncio.create_task(self._session(session_id)))
+            if self.arrival_rate > 0 and session_id < self.sessions - 1:
+                # Poisson arrivals: exponential inter-arrival times
+                await asyncio.sleep(self.rng.expovariate(self.arrival_rate))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+        stop.set()
+        await sampler
+        if self.shared_agent is not None:
+            self._add_usage(self.shared_agent)
+            await self.shared_agent.client.close_sessions()
+
+        completed = len(self.latencies)
+        failed = sum(self.errors.values())
+        attempted = completed + failed
+        return {
+            "sessions": self.sessions,
+            "turns_per_session": self.turns,
+            "elapsed_s": round(elapsed, 3),
+            "completed_turns": completed,
+            "failed_turns": failed,
+            "error_rate": round(failed / attempted, 4) if attempted else 0.0,
+            "throughput_turns_per_s": round(completed / elapsed, 3) if elapsed else 0.0,
+            "latency_s": {
+                "p50": round(_percentile(self.latencies, 50), 4),
+                "p95": round(_percentile(self.latencies, 95), 4),
+                "p99": round(_percentile(self.latencies, 99), 4),
+                "max": round(max(self.latencies), 4) if self.latencies else 0.0,
+            },
+            "errors": self.errors,
+            "token_usage": {
+                **self.token_usage,
+                "cache_hit_rate": round(self.token_usage.get("cached_input_tokens", 0)
+                                        / self.token_usage["input_tokens"], 4)
+                if self.token_usage.get("input_tokens") else 0.0,
+            },
+            "tool_calls": self.tool_stats,
+            "peak_child_processes": max((s["child_processes"] or 0 for s in self.samples), default=0),
+            "peak_rss_mb": max((s["rss_mb"] for s in self.samples), default=0.0),
+            "samples": self.samples,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent chat session load generator")
+    parser.add_argument("--db", default=DEFAULT_SCRATCH_DB, help="Scratch database path")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS),
+                        help="Register this scenario in --db before running")
+    parser.add_argument("--sessions", type=int, default=50, help="Total conversations to start")
+    parser.add_argument("--arrival-rate", type=float, default=10.0,
+                        help="New sessions per second (0 = start all at once)")
+    parser.add_argument("--turns", type=int, default=3, help="Turns per session")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Mean seconds between turns")
+    parser.add_argument("--agent-per-session", action="store_true",
+                        help="Build a fresh MCPAgent per session, as app.py does per message")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--tool-probability", type=float, default=0.5)
+    parser.add_argument("--sample-interval", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    parser.add_argument("--quiet", action="store_true", help="Suppress agent logging during the run")
+    args = parser.parse_args(argv)
+
+    if args.scenario:
+        setup_scenario(args.scenario, args.db)
+    factory = StubbedMCPAgent(DatabaseManager(args.db), {
+        "latency_ms": args.llm_latency_ms,
+        "jitter_ms": args.llm_jitter_ms,
+        "error_rate": args.llm_error_rate,
+        "tool_call_probability": args.tool_probability,
+        "seed": args.seed,
+    })
+    load_run = LoadRun(factory, args.sessions, args.arrival_rate, args.turns, args.think_time,
+                       share_agent=not args.agent_per_session,
+                       sample_interval=args.sample_interval, seed=args.seed)
+
+    with open(os.devnull, "w") as devnull:
+        redirect = contextlib.redirect_stdout(devnull) if args.quiet else contextlib.nullcontext()
+        with redirect:
+            report = asyncio.run(load_run.run())
+
+    summary = {key: value for key, value in report.items() if key != "samples"}
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"ChatLoad: Full report with {len(report['samples'])} samples written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
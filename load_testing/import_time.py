@@ -0,0 +1,112 @@
+"""Import-time benchmark for the application's entry modules.
+
+Runs ``python -X importtime -c "import <module>"`` in fresh interpreters and
+reports the module's cumulative import time, the interpreter's wall-clock
+start-up time and the slowest imports it pulled in:
+
+    python load_testing/import_time.py --repeat 5 --output import_times.json
+    python load_testing/import_time.py --baseline import_times.json
+
+``--baseline`` compares against a report saved earlier with ``--output``.
+Each run is a cold interpreter, but the OS file cache is warm after the first,
+so the median of several runs is reported.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules imported at the start of every Streamlit script run of app.py
+DEFAULT_MODULES = ["database", "chat.agent", "chat.warmup", "chat.profiling", "mcp_client.manager"]
+
+
+def _parse_importtime(stderr: str) -> Dict[str, Dict[str, int]]:
+    """Map module name -> {'self_us', 'cumulative_us'} from ``-X importtime`` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue  # Header line
+        modules[fields[2].strip()] = {"self_us": self_us, "cumulative_us": cumulative_us}
+    return modules
+
+
+def measure(module: str, repeat: int = 5, top: int = 10) -> Dict[str, Any]:
+    """Import ``module`` in ``repeat`` fresh interpreters and summarize the timings."""
+    cumulative: List[int] = []
+    wall: List[float] = []
+    modules: Dict[str, Dict[str, int]] = {}
+    for _ in range(repeat):
+        started = time.perf_counter()
+        completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                   cwd=REPO_ROOT, capture_output=True, text=True)
+        wall.append(time.perf_counter() - started)
+        if completed.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed: {completed.stderr.strip().splitlines()[-1:]}")
+        modules = _parse_importtime(completed.stderr)
+        cumulative.append(modules.get(module, {}).get("cumulative_us", 0))
+    slowest = sorted(modules.items(), key=lambda item: item[1]["self_us"], reverse=True)[:top]
+    return {
+        "module": module,
+        "import_ms": round(statistics.median(cumulative) / 1000, 1),
+        "interpreter_ms": round(statistics.median(wall) * 1000, 1),
+        "modules_loaded": len(modules),
+        "slowest_self_ms": {name: round(stats["self_us"] / 1000, 1) for name, stats in slowest},
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    previous = {result["module"]: result for result in baseline.get("results", [])}
+    rows = []
+    for result in results:
+        before: Optional[Dict[str, Any]] = previous.get(result["module"])
+        if before is None:
+            continue
+        rows.append({
+            "module": result["module"],
+            "import_ms": [before["import_ms"], result["import_ms"]],
+            "change_pct": round((result["import_ms"] - before["import_ms"]) / before["import_ms"] * 100, 1)
+            if before["import_ms"] else None,
+            "modules_loaded": [before["modules_loaded"], result["modules_loaded"]],
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure import time of the application's modules")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="Modules to import")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list per module")
+    parser.add_argument("--baseline", help="Earlier --output report to compare against")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    results = []
+    for module in args.modules:
+        result = measure(module, args.repeat, args.top)
+        print(f"ImportTime: {module}: {result['import_ms']}ms import, "
+              f"{result['interpreter_ms']}ms interpreter, {result['modules_loaded']} modules")
+        results.append(result)
+
+    report: Dict[str, Any] = {"python": sys.version.split()[0], "repeat": args.repeat, "results": results}
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(results, json.load(f))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Replay recorded agent turns against stub backends.
+
+Turns recorded with ``MCP_TRACE_DIR`` set (see ``chat/tracing.py``) are re-run
+through ``create_agent`` with ``ReplayChatModel`` and ``replay_tools`` from
+``load_testing/stubs.py``, so a slow conversation can be reproduced and
+profiled without the provider or the MCP servers:
+
+    python load_testing/replay.py traces/trace-20250101.jsonl --speed 0
+    python load_testing/replay.py traces/trace-20250101.jsonl --trace 3 --profile replay.prof
+
+With ``--speed 1`` the recorded LLM and tool latencies are reproduced, so the
+replayed turn time minus the recorded backend time is the agent's own overhead.
+"""
+import argparse
+import asyncio
+import contextlib
+import cProfile
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from langchain.agents import create_agent
+
+from chat.tracing import TraceRecorder, load_traces
+from load_testing.stubs import ReplayChatModel, replay_tools
+
+
+def _backend_seconds(events: List[Dict[str, Any]]) -> float:
+    return sum(event.get('duration_s') or 0 for event in events)
+
+
+async def replay_trace(trace: Dict[str, Any], speed: float = 1.0) -> Dict[str, Any]:
+    """Re-run one recorded turn and compare its timings with the recording."""
+    llm_events = [event for event in trace['events'] if event['type'] == 'llm']
+    tool_events = [event for event in trace['events'] if event['type'] == 'tool']
+    agent = create_agent(
+        model=ReplayChatModel(events=llm_events, speed=speed),
+        tools=replay_tools(trace.get('tools') or [], tool_events, speed) or None,
+        system_prompt=trace.get('system_prompt') or None,
+    )
+
+    messages = [{"role": "user" if role == "human" else "assistant", "content": content}
+                for role, content in trace.get('history') or []]
+    messages.append({"role": "user", "content": trace['input']})
+
+    recorder = TraceRecorder(trace['input'], trace.get('history'))
+    error = None
+    try:
+        await agent.ainvoke({"messages": messages}, {"callbacks": [recorder]})
+    except Exception as e:
+        error = e
+    replayed = recorder.finish(error=error)
+
+    replayed_llm = [event for event in replayed['events'] if event['type'] == 'llm']
+    replayed_tools = [event for event in replayed['events'] if event['type'] == 'tool']
+    recorded_backend = _backend_seconds(llm_events) + _backend_seconds(tool_events)
+    return {
+        "trace_id": trace.get('trace_id'),
+        "input": trace['input'][:80],
+        "recorded_s": trace.get('duration_s'),
+        "recorded_backend_s": round(recorded_backend, 4),
+        "replayed_s": replayed['duration_s'],
+        # Time spent outside the (scaled) LLM and tool calls during the replay
+        "agent_overhead_s": round(replayed['duration_s'] - recorded_backend * speed, 4),
+        "llm_calls": [len(llm_events), len(replayed_llm)],
+        "tool_calls": [len(tool_events), len(replayed_tools)],
+        "slowest": sorted(({"type": event['type'], "name": event.get('name'), "duration_s": event['duration_s']}
+                           for event in trace['events'] if 'duration_s' in event),
+                          key=lambda event: event['duration_s'], reverse=True)[:3],
+        "recorded_error": trace.get('error'),
+        "replay_error": replayed.get('error'),
+        "matched": ([event.get('name') for event in tool_events] == [event.get('name') for event in replayed_tools]
+                    and len(llm_events) == len(replayed_llm)),
+    }
+
+
+async def replay_traces(traces: List[Dict[str, Any]], speed: float) -> List[Dict[str, Any]]:
+    results = []
+    for trace in traces:
+        results.append(await replay_trace(trace, speed))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded agent turns against stub backends")
+    parser.add_argument("trace_file", help="JSONL trace file written with MCP_TRACE_DIR")
+    parser.add_argument("--trace", type=int, action="append",
+                        help="Index of a trace in the file to replay (repeatable; default: all)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Multiplier for recorded latencies (0 = no waiting)")
+    parser.add_argument("--profile", help="Write cProfile stats of the replay to this path")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    traces = load_traces(args.trace_file)
+    if args.trace:
+        traces = [traces[index] for index in args.trace]
+    print(f"Replay: Replaying {len(traces)} trace(s) from {args.trace_file} at speed {args.speed}")
+
+    profiler: Optional[cProfile.Profile] = cProfile.Profile() if args.profile else None
+    started = time.perf_counter()
+    with profiler or contextlib.nullcontext():
+        results = asyncio.run(replay_traces(traces, args.speed))
+    elapsed = time.perf_counter() - started
+    if profiler is not None:
+        profiler.dump_stats(args.profile)
+        print(f"Replay: Profile written to {args.profile} (inspect with python -m pstats)")
+
+    report = {
+        "traces": len(results),
+        "elapsed_s": round(elapsed, 3),
+        "diverged": sum(1 for result in results if not result["matched"]),
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
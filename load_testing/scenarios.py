@@ -0,0 +1,173 @@
+"""Scale-testing scenarios built on ``mcp_servers/load_server.py``.
+
+Each scenario registers a set of synthetic stdio servers in a scratch
+``mcp_config.db`` and can then time the discovery and agent construction path
+against it:
+
+    python load_testing/scenarios.py list
+    python load_testing/scenarios.py setup wide --db scratch/mcp_config.db
+    python load_testing/scenarios.py measure --db scratch/mcp_config.db --repeat 3
+
+The real ``mcp_config.db`` is never touched unless it is passed explicitly.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+# Allow running as a script from the repository root or from this directory
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from database import DatabaseManager
+
+LOAD_SERVER_PATH = os.path.join(REPO_ROOT, "mcp_servers", "load_server.py")
+DEFAULT_SCRATCH_DB = os.path.join(REPO_ROOT, "scratch", "mcp_config.db")
+
+# Scenario name -> list of (server count, load server environment)
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "baseline": {
+        "description": "One small server, comparable to the bundled examples.",
+        "servers": [(1, {"LOAD_SERVER_TOOLS": "5", "LOAD_SERVER_PARAMS": "2"})],
+    },
+    "wide": {
+        "description": "Many servers with a handful of tools each (session fan-out).",
+        "servers": [(25, {"LOAD_SERVER_TOOLS": "8", "LOAD_SERVER_PARAMS": "3"})],
+    },
+    "deep": {
+        "description": "A few servers with hundreds of tools each (listing and prompt size).",
+        "servers": [(3, {"LOAD_SERVER_TOOLS": "300", "LOAD_SERVER_PARAMS": "4"})],
+    },
+    "large_schema": {
+        "description": "Tools with large input schemas and long descriptions.",
+        "servers": [(2, {"LOAD_SERVER_TOOLS": "100", "LOAD_SERVER_PARAMS": "40",
+                         "LOAD_SERVER_DESC_WORDS": "60"})],
+    },
+    "slow_flaky": {
+        "description": "Servers with call latency, jitter, errors and large payloads.",
+        "servers": [(5, {"LOAD_SERVER_TOOLS": "20", "LOAD_SERVER_LATENCY_MS": "200",
+                         "LOAD_SERVER_JITTER_MS": "300", "LOAD_SERVER_ERROR_RATE": "0.1",
+                         "LOAD_SERVER_PAYLOAD_BYTES": "65536"})],
+    },
+}
+
+
+def setup_scenario(name: str, db_path: str, reset: bool = True) -> List[str]:
+    """Register the servers of scenario ``name`` in the database at ``db_path``.
+
+    Returns the names of the registered servers.
+    """
+    if name not in SCENARIOS:
+        raise ValueError(f"Unknown scenario '{name}'. Available: {', '.join(SCENARIOS)}")
+
+    directory = os.path.dirname(os.path.abspath(db_path))
+    os.makedirs(directory, exist_ok=True)
+    db_manager = DatabaseManager(db_path)
+
+    if reset:
+        for server in db_manager.get_mcp_servers(enabled_only=False):
+            db_manager.delete_mcp_server(server['id'])
+
+    registered = []
+    for group_index, (count, env) in enumerate(SCENARIOS[name]["servers"]):
+        for server_index in range(count):
+            server_name = f"{name}-{group_index}-{server_index:03d}"
+            server_env = dict(env)
+            server_env["LOAD_SERVER_NAME"] = server_name
+            server_env.setdefault("LOAD_SERVER_SEED", str(server_index))
+            ok = db_manager.add_mcp_server(
+                server_name,
+                "stdio",
+                command=sys.executable,
+                args=[LOAD_SERVER_PATH],
+                env=server_env,
+                description=f"Synthetic load server ({SCENARIOS[name]['description']})",
+            )
+            if ok:
+                registered.append(server_name)
+            else:
+                print(f"Scenarios: Failed to register '{server_name}' (already exists?)")
+
+    print(f"Scenarios: Registered {len(registered)} servers for '{name}' in {db_path}")
+    return registered
+
+
+async def measure(db_path: str, repeat: int = 1) -> List[Dict[str, float]]:
+    """Time discovery, prompt building and agent construction against ``db_path``."""
+    from langchain.agents import create_agent
+    from langchain_openai import ChatOpenAI
+    from pydantic import SecretStr
+    from chat.agent import MCPAgent
+
+    db_manager = DatabaseManager(db_path)
+    results = []
+    for iteration in range(repeat):
+        MCPAgent.clear_cache()
+        timings: Dict[str, float] = {}
+
+        start = time.perf_counter()
+        agent = MCPAgent(db_manager=db_manager)
+        timings["config_s"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        tools, failed_servers, resources = await agent.client.get_tools_with_failures()
+        timings["discovery_s"] = time.perf_counter() - start
+
+        server_info = {name: {'description': '', 'tools': sorted(agent.client.registry.tools_of(name))}
+                       for name in agent.client.client.connections.keys()
+                       if name not in failed_servers}
+        start = time.perf_counter()
+        prompt = agent._create_enhanced_system_prompt(
+            db_manager.get_system_instructions(), server_info, tools, resources)
+        timings["prompt_s"] = time.perf_counter() - start
+
+        # The model is never called, so a placeholder key is enough
+        chat_model = ChatOpenAI(model="gpt-3.5-turbo", api_key=SecretStr("load-test"))
+        start = time.perf_counter()
+        create_agent(model=chat_model, tools=tools or None, system_prompt=prompt)
+        timings["create_agent_s"] = time.perf_counter() - start
+
+        await agent.client.close_sessions()
+
+        timings["servers"] = len(server_info)
+        timings["failed_servers"] = len(failed_servers)
+        timings["tools"] = len(tools)
+        timings["prompt_chars"] = len(prompt)
+        results.append(timings)
+        print(f"Scenarios: Run {iteration + 1}/{repeat}: " + ", ".join(
+            f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+            for key, value in timings.items()))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Synthetic MCP server scale-testing scenarios")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("list", help="List available scenarios")
+
+    setup_parser = subparsers.add_parser("setup", help="Register a scenario in a scratch database")
+    setup_parser.add_argument("scenario", choices=sorted(SCENARIOS))
+    setup_parser.add_argument("--db", default=DEFAULT_SCRATCH_DB, help="Scratch database path")
+    setup_parser.add_argument("--keep", action="store_true", help="Keep existing servers in the database")
+
+    measure_parser = subparsers.add_parser("measure", help="Time discovery and agent construction")
+    measure_parser.add_argument("--db", default=DEFAULT_SCRATCH_DB, help="Scratch database path")
+    measure_parser.add_argument("--repeat", type=int, default=1)
+
+    args = parser.parse_args(argv)
+    if args.command == "list":
+        for name, scenario in SCENARIOS.items():
+            total = sum(count for count, _ in scenario["servers"])
+            print(f"{name:14} {total:3d} servers  {scenario['description']}")
+    elif args.command == "setup":
+        setup_scenario(args.scenario, args.db, reset=not args.keep)
+    elif args.command == "measure":
+        asyncio.run(measure(args.db, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Serialization benchmark: stdlib json vs orjson on the payloads the app handles.
+
+Times ``dumps``/``loads`` for each backend in ``serialization.BACKENDS`` on
+large structured tool results, a long text result, a trace line and the small
+config blobs ``DatabaseManager`` reads and writes on every page load:
+
+    python load_testing/serialization_bench.py --records 20000 --output serialization.json
+
+Each case is timed ``--repeat`` times and the median is reported, along with
+the speed-up of every backend relative to ``json``.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import string
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+import serialization
+
+
+def _records(count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """Rows like a database or search tool returns: mixed types, nested tags, unicode."""
+    return [{
+        "id": i,
+        "name": "".join(rng.choices(string.ascii_letters, k=12)),
+        "score": rng.random() * 100,
+        "active": i % 3 != 0,
+        "tags": rng.sample(["alpha", "beta", "gamma", "delta", "épsilon", "zeta"], 3),
+        "owner": {"id": rng.randint(1, 1000), "email": f"user{i}@example.com"},
+        "notes": None if i % 5 else "Long free-text note " * 4,
+    } for i in range(count)]
+
+
+def build_cases(records: int, seed: int = 0) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    rows = _records(records, rng)
+    return {
+        "tool_result_records": rows,
+        "tool_result_content_blocks": [{"type": "text", "text": json.dumps(row)} for row in rows[:records // 4]],
+        "tool_result_text": {"type": "text", "text": " ".join(
+            "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 10))) for _ in range(records * 10))},
+        "trace_line": {
+            "version": 1, "trace_id": "0" * 32, "input": "Summarize the open tickets",
+            "events": [{"type": "tool", "name": "search", "args": {"query": "open"}, "start_s": 0.1,
+                        "duration_s": 0.2, "output": {"text": json.dumps(rows[:200])}}] * 5,
+        },
+        "config_args": ["mcp_servers/math.py", "--log-level", "info"],
+        "config_env": {f"VAR_{i}": f"value-{i}" for i in range(20)},
+    }
+
+
+def _median_ms(func: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) * 1000, 4)
+
+
+def bench_case(backend: serialization.JsonBackend, value: Any, repeat: int) -> Dict[str, Any]:
+    # Small blobs are timed in batches so the timer resolution doesn't dominate
+    encoded = backend.dumps(value)
+    batch = max(1, 100000 // max(len(encoded), 1))
+    dumps_ms = _median_ms(lambda: [backend.dumps(value) for _ in range(batch)], repeat) / batch
+    loads_ms = _median_ms(lambda: [backend.loads(encoded) for _ in range(batch)], repeat) / batch
+    return {"bytes": len(encoded.encode("utf-8")), "dumps_ms": round(dumps_ms, 4), "loads_ms": round(loads_ms, 4)}
+
+
+def run(records: int = 20000, repeat: int = 7) -> Dict[str, Any]:
+    cases = build_cases(records)
+    backends = {name: cls() for name, cls in serialization.BACKENDS.items()
+                if name == "json" or serialization.orjson is not None}
+    results: Dict[str, Dict[str, Any]] = {}
+    for case, value in cases.items():
+        results[case] = {name: bench_case(backend, value, repeat) for name, backend in backends.items()}
+        baseline = results[case]["json"]
+        for name, row in results[case].items():
+            if name != "json":
+                row["dumps_speedup"] = round(baseline["dumps_ms"] / row["dumps_ms"], 1) if row["dumps_ms"] else None
+                row["loads_speedup"] = round(baseline["loads_ms"] / row["loads_ms"], 1) if row["loads_ms"] else None
+    return {
+        "python": sys.version.split()[0],
+        "orjson": getattr(serialization.orjson, "__version__", None),
+        "records": records,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare JSON backends on large tool payloads")
+    parser.add_argument("--records", type=int, default=20000, help="Rows in the structured tool result")
+    parser.add_argument("--repeat", type=int, default=7, help="Timed runs per case (median is reported)")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    report = run(args.records, args.repeat)
+    for case, rows in report["results"].items():
+        summary = ", ".join(f"{name} {row['dumps_ms']}/{row['loads_ms']}ms" for name, row in rows.items())
+        print(f"SerializationBench: {case} ({rows['json']['bytes']} bytes) dumps/loads: {summary}")
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Stub backends used by the load-testing and replay tools.
+
+``StubChatModel`` is a LangChain chat model that never leaves the process: it
+sleeps for a configurable latency and either answers directly or calls one of
+the tools bound to it, so a full ``create_agent`` loop (model -> tool -> model)
+can be exercised without a provider account.
+
+``ReplayChatModel`` and ``replay_tools`` play back a turn recorded by
+``chat.tracing.TraceRecorder``: the recorded LLM responses and tool outputs
+are returned in order, after the recorded latencies scaled by ``speed``.
+"""
+import asyncio
+import random
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+
+class StubChatModel(BaseChatModel):
+    """Chat model with synthetic latency and optional tool calling."""
+
+    latency_ms: float = 50.0
+    jitter_ms: float = 0.0
+    tool_call_probability: float = 0.5
+    error_rate: float = 0.0
+    reply_chars: int = 200
+    seed: Optional[int] = None
+    # Report a repeated system prompt as cached input tokens, like provider prefix caching
+    simulate_prompt_cache: bool = True
+
+    _rng: Any = None
+    _seen_prompts: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat-model"
+
+    def bind_tools(self, tools: Sequence[Any], *, tool_choice: Any = None, **kwargs: Any):
+        """Bind tools the same way OpenAI-compatible models do."""
+        formatted_tools = [convert_to_openai_tool(tool) for tool in tools]
+        return self.bind(tools=formatted_tools, **kwargs)
+
+    def _random(self) -> random.Random:
+        if self._rng is None:
+            self._rng = random.Random(self.seed)
+        return self._rng
+
+    def _delay(self) -> float:
+        delay_ms = self.latency_ms
+        if self.jitter_ms > 0:
+            delay_ms += self._random().uniform(0, self.jitter_ms)
+        return delay_ms / 1000
+
+    def _respond(self, messages: List[BaseMessage], tools: Optional[List[Dict[str, Any]]]) -> AIMessage:
+        rng = self._random()
+        if self.error_rate > 0 and rng.random() < self.error_rate:
+            raise RuntimeError("Synthetic LLM failure")
+
+        # Only call a tool at the start of a turn, never right after a tool result
+        after_tool = bool(messages) and isinstance(messages[-1], ToolMessage)
+        if tools and not after_tool and rng.random() < self.tool_call_probability:
+            function = rng.choice(tools)["function"]
+            schema = function.get("parameters") or {}
+            args = {name: "x" for name in schema.get("required", [])}
+            return AIMessage(content="", tool_calls=[{
+                "name": function["name"],
+                "args": args,
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "tool_call",
+            }])
+
+        content = ("Stub reply. " * (self.reply_chars // 12 + 1))[:self.reply_chars]
+        prompt_tokens = sum(len(str(message.content)) for message in messages) // 4
+        return AIMessage(content=content, usage_metadata={
+            "input_tokens": prompt_tokens,
+            "output_tokens": len(content) // 4,
+            "total_tokens": prompt_tokens + len(content) // 4,
+            "input_token_details": {"cache_read": self._cached_tokens(messages)},
+        })
+
+    def _cached_tokens(self, messages: List[BaseMessage]) -> int:
+        if not self.simulate_prompt_cache or not messages or not isinstance(messages[0], SystemMessage):
+            return 0
+        if self._seen_prompts is None:
+            self._seen_prompts = set()
+        prompt = str(messages[0].content)
+        if prompt in self._seen_prompts:
+            return len(prompt) // 4
+        self._seen_prompts.add(prompt)
+        return 0
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self._delay())
+        message = self._respond(messages, kwargs.get("tools"))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                         **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self._delay())
+        message = self._respond(messages, kwargs.get("tools"))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model that returns the LLM responses of a recorded trace, in order."""
+
+    # Recorded 'llm' events: {'duration_s', 'response': {'content', 'tool_calls'}, 'usage'}
+    events: List[Dict[str, Any]]
+    # Multiplier for recorded latencies (0 replays without waiting)
+    speed: float = 1.0
+
+    _cursor: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay-chat-model"
+
+    def bind_tools(self, tools: Sequence[Any], *, tool_choice: Any = None, **kwargs: Any):
+        formatted_tools = [convert_to_openai_tool(tool) for tool in tools]
+        return self.bind(tools=formatted_tools, **kwargs)
+
+    def _next_event(self) -> Dict[str, Any]:
+        index = self._cursor or 0
+        if index >= len(self.events):
+            raise RuntimeError(f"Replay diverged: the trace has only {len(self.events)} LLM responses")
+        self._cursor = index + 1
+        return self.events[index]
+
+    def _result(self, event: Dict[str, Any]) -> ChatResult:
+        if event.get('error'):
+            raise RuntimeError(f"Recorded LLM failure: {event['error']}")
+        response = event.get('response') or {}
+        message = AIMessage(
+            content=response.get('content') or "",
+            tool_calls=[{"name": call["name"], "args": call.get("args") or {},
+                         "id": call.get("id") or f"call_{uuid.uuid4().hex[:12]}", "type": "tool_call"}
+                        for call in response.get('tool_calls') or []],
+            usage_metadata=event.get('usage'),
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        event = self._next_event()
+        time.sleep((event.get('duration_s') or 0) * self.speed)
+        return self._result(event)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                         **kwargs: Any) -> ChatResult:
+        event = self._next_event()
+        await asyncio.sleep((event.get('duration_s') or 0) * self.speed)
+        return self._result(event)
+
+
+def replay_tools(tool_definitions: List[Dict[str, Any]], events: List[Dict[str, Any]],
+                 speed: float = 1.0) -> List[Any]:
+    """Tools that return a trace's recorded outputs, per tool name in call order.
+
+    Tools named in ``events`` but missing from ``tool_definitions`` (e.g. traces written
+    without definitions) get a permissive schema.
+    """
+    from langchain_core.tools import StructuredTool, ToolException
+
+    recorded: Dict[str, List[Dict[str, Any]]] = {}
+    for event in events:
+        recorded.setdefault(event['name'], []).append(event)
+    functions = {definition['function']['name']: definition['function'] for definition in tool_definitions or []}
+    for name in recorded:
+        functions.setdefault(name, {'name': name, 'description': '', 'parameters': {'type': 'object'}})
+
+    def make_tool(function: Dict[str, Any]):
+        queue = recorded.get(function['name'], [])
+
+        async def replay(**arguments: Any):
+            if not queue:
+                raise ToolException(f"Replay diverged: no more recorded calls to '{function['name']}'")
+            event = queue.pop(0)
+            await asyncio.sleep((event.get('duration_s') or 0) * speed)
+            if event.get('error'):
+                raise ToolException(event['error'])
+            return (event.get('output') or {}).get('text', "")
+
+        return StructuredTool(
+            name=function['name'],
+            description=function.get('description') or "",
+            args_schema=function.get('parameters') or {'type': 'object'},
+            coroutine=replay,
+        )
+
+    return [make_tool(function) for function in functions.values()]
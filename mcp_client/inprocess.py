@@ -0,0 +1,92 @@
+import contextlib
+import hashlib
+import importlib
+import importlib.util
+import os
+import sys
+import threading
+from typing import Any, Dict
+
+from mcp.server.fastmcp import FastMCP
+from mcp.shared.memory import create_connected_server_and_client_session
+
+# Server objects imported so far, by target
+_servers: Dict[str, Any] = {}
+_servers_lock = threading.Lock()
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _split_target(target: str):
+    """``path/to/server.py[:attr]`` or ``package.module[:attr]`` -> (location, attribute)."""
+    location, separator, attribute = target.strip().rpartition(":")
+    # A suffix that isn't an identifier is part of the path (e.g. a Windows drive letter)
+    if not separator or not attribute.isidentifier():
+        return target.strip(), "mcp"
+    return location, attribute
+
+
+def _import_file(path: str):
+    resolved = path if os.path.isabs(path) else next(
+        (candidate for candidate in (os.path.abspath(path), os.path.join(REPO_ROOT, path)) if os.path.exists(candidate)),
+        os.path.abspath(path))
+    if not os.path.exists(resolved):
+        raise FileNotFoundError(f"In-process server file not found: {path}")
+    # A private module name, so e.g. mcp_servers/math.py can't shadow the math module
+    digest = hashlib.sha1(resolved.encode("utf-8")).hexdigest()[:8]
+    module_name = f"_mcp_inprocess_{os.path.splitext(os.path.basename(resolved))[0]}_{digest}"
+    spec = importlib.util.spec_from_file_location(module_name, resolved)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"Cannot import in-process server from {resolved}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    # Like running it as a script: its directory comes first, so sibling imports resolve
+    directory = os.path.dirname(resolved)
+    sys.path.insert(0, directory)
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        sys.modules.pop(module_name, None)
+        raise
+    finally:
+        sys.path.remove(directory)
+    return module
+
+
+def load_server(target: str) -> Any:
+    """Import (once) the FastMCP object named by ``target``.
+
+    ``target`` is a Python file or a module name, optionally followed by ``:attribute``
+    (default ``mcp``), e.g. ``mcp_servers/calculator.py`` or ``my_tools.server:app``.
+    """
+    with _servers_lock:
+        server = _servers.get(target)
+        if server is not None:
+            return server
+        location, attribute = _split_target(target)
+        is_file = location.endswith(".py") or "/" in location or os.sep in location
+        module = _import_file(location) if is_file else importlib.import_module(location)
+        server = getattr(module, attribute, None)
+        if not isinstance(server, FastMCP):
+            raise TypeError(f"'{attribute}' in {location} is not a FastMCP server")
+        _servers[target] = server
+        print(f"InProcessServer: Loaded '{server.name}' from {target}")
+        return server
+
+
+@contextlib.asynccontextmanager
+async def inprocess_session(connection: Dict[str, Any]):
+    """Initialized session to an in-process server, connected over memory streams.
+
+    The server runs on the caller's event loop and shares the process (and its
+    environment): only use it for trusted code. Synchronous tools block the loop while
+    they run, so CPU-heavy servers are better left on stdio.
+    """
+    env = connection.get('env') or {}
+    for key, value in env.items():
+        if os.environ.get(key) not in (None, value):
+            print(f"InProcessServer: Overriding environment variable {key} for '{connection['target']}'")
+        os.environ[key] = str(value)
+    server = load_server(connection['target'])
+    async with create_connected_server_and_client_session(server) as session:
+        yield session
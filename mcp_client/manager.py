@@ -1,10 +1,16 @@
 from langchain_mcp_adapters.client import MultiServerMCPClient
 from langchain_mcp_adapters.tools import load_mcp_tools
-from langchain_mcp_adapters.resources import load_mcp_resources
-from typing import Dict, Any, Optional, cast
+from typing import Awaitable, Callable, Dict, Any, List, Optional, cast
 from langchain_mcp_adapters.sessions import Connection as MCPConnection
+import asyncio
 
 from mcp_servers import fetch_mcp_servers_as_config
+from mcp_client.resources import ResourceCatalog, list_resources
+from mcp_client.registry import ToolRegistry
+from mcp_client.results import ResultShaper
+from mcp_client.inprocess import inprocess_session
+from mcp_client.supervisor import stdio_supervisor
+from mcp_client.validation import with_validation
 
 class MCPManager:
     """
@@ -17,8 +23,14 @@ class MCPManager:
             server_configs = cast(Dict[str, MCPConnection], fetch_mcp_servers_as_config())
         self.server_configs = server_configs
         self.client = MultiServerMCPClient(self.server_configs)
-        self.sessions = {}  # Store persistent session context managers
+        self.sessions = {}  # Store (owner task, stop event) for each persistent session
         self.active_sessions = {}  # Store active session objects
+        self.registry = ToolRegistry()  # Tool ownership, schemas, annotations and call stats
+        self.server_resources = {}  # Server name -> resource metadata listed from that server
+        self.resources = ResourceCatalog()  # Resource listings and lazily read bodies
+        self.failed_servers = {}  # Server name -> error message from the last load
+        self.results = ResultShaper()  # Offloads oversized tool results behind handles
+        self._retiring_tasks = set()  # Tasks closing detached sessions once their callers are idle
 
     async def list_servers(self):
         """List all configured MCP servers."""
@@ -48,70 +60,197 @@ class MCPManager:
             # Return empty lists for both tools and resources
             return [], []
 
-    async def get_tools_with_failures(self):
-        """Fetch all available tools from configured MCP servers, handling individual failures gracefully.
+    async def _session_owner(self, server_name: str, ready: asyncio.Future, stop: asyncio.Event):
+        """Hold a persistent session open inside a single task until ``stop`` is set.
+
+        The MCP transports use anyio cancel scopes, which must be exited by the task that
+        entered them. Owning each session in a dedicated task lets any other task (e.g. the
+        background warm-up or a Settings change) close it later.
+
+        See ``_connect`` for how the session itself is created.
+        """
+        try:
+            async with self._connect(server_name) as session:
+                ready.set_result(session)
+                await stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                print(f"MCPManager: Session for '{server_name}' ended with error: {e}")
+        finally:
+            if self.sessions.get(server_name, (None,))[0] is asyncio.current_task():
+                self.sessions.pop(server_name, None)
+                self.active_sessions.pop(server_name, None)
+
+    def _connect(self, server_name: str):
+        """Session context for a server: in-process, leased from a warm stdio pool, or via the adapters."""
+        connection = self.client.connections[server_name]
+        if connection.get('transport') == 'inprocess':
+            return inprocess_session(connection)
+        supervisor = stdio_supervisor() if connection.get('transport') == 'stdio' else None
+        if supervisor is not None:
+            return supervisor.lease(server_name, connection)
+        return self.client.session(server_name)
+
+    async def open_session(self, server_name: str):
+        """Open (or reuse) the persistent session for a server and return it."""
+        if server_name in self.active_sessions:
+            return self.active_sessions[server_name]
+
+        ready = asyncio.get_running_loop().create_future()
+        stop = asyncio.Event()
+        task = asyncio.create_task(self._session_owner(server_name, ready, stop))
+        self.sessions[server_name] = (task, stop)
+        try:
+            session = await ready
+        except BaseException:
+            # Failed or cancelled while opening: make sure the owner task doesn't linger
+            self.sessions.pop(server_name, None)
+            stop.set()
+            task.cancel()
+            raise
+        self.active_sessions[server_name] = session
+        return session
+
+    async def close_session(self, server_name: str):
+        """Close the persistent session for a single server, if one is open."""
+        entry = self.sessions.pop(server_name, None)
+        self.active_sessions.pop(server_name, None)
+        if entry is not None:
+            await self._stop_session_owner(server_name, *entry)
+
+    async def _stop_session_owner(self, server_name: str, task: asyncio.Task, stop: asyncio.Event):
+        """Signal a session owner task to exit its session and wait for it."""
+        stop.set()
+        try:
+            await task
+            print(f"MCPManager: Closed session for '{server_name}'")
+        except Exception as e:
+            print(f"MCPManager: Error closing session for '{server_name}': {e}")
+
+    async def _load_server(self, server_name: str):
+        """Open (or reuse) the session for one server and load its tools and resources.
 
         Returns:
-            tuple: (tools_list, failed_servers_dict, resources_list)
-                - tools_list: List of successfully loaded tools
-                - failed_servers_dict: Dict mapping server names to their error messages
-                - resources_list: List of successfully loaded resources
+            tuple: (tools_list, resources_list)
         """
-        all_tools = []
-        all_resources = []
-        failed_servers = {}
+        print(f"MCPManager: Fetching tools from server '{server_name}'...")
+        # Open (or reuse) the persistent session owned by a dedicated task
+        session = await self.open_session(server_name)
+        # Arguments are checked against each tool's schema (compiled here, once) before dispatch
+        tools = [with_validation(tool) for tool in await load_mcp_tools(session)]
+        tools = self.results.wrap_tools(tools)
+        # List resources without reading their bodies; handle "Method not found" gracefully
+        try:
+            resources = await self.resources.list_server(server_name, session)
+        except Exception as resource_error:
+            if "Method not found" in str(resource_error):
+                print(f"MCPManager: Server '{server_name}' doesn't support resources method, continuing with tools only")
+                self.resources.forget_server(server_name)
+                resources = []
+            else:
+                # Re-raise if it's a different error
+                raise resource_error
+        if tools:
+            print(f"MCPManager: Successfully loaded {len(tools)} tools from '{server_name}'")
+        else:
+            print(f"MCPManager: No tools returned from '{server_name}'")
+        if resources:
+            print(f"MCPManager: Successfully loaded {len(resources)} resources from '{server_name}'")
+        else:
+            print(f"MCPManager: No resources returned from '{server_name}'")
+        return tools, resources
 
-        print("MCPManager: Attempting to fetch tools with individual failure handling...")
+    def _explain_error(self, error_msg: str) -> str:
+        """Append a hint for common connection problems to an error message."""
+        if "401 Unauthorized" in error_msg:
+            error_msg += " - This indicates an authentication issue with the remote MCP server. Please check your API key or authentication credentials."
+        elif "TaskGroup" in error_msg and "unhandled errors" in error_msg:
+            # This might contain a 401 error, let's provide a general auth error message
+            error_msg += " - This indicates an issue with the connection to the remote MCP server. This could be due to authentication problems, network issues, or server configuration errors."
+        elif "Connection refused" in error_msg:
+            error_msg += " - This indicates that the server is not reachable. Please check the URL and ensure the server is running."
+        elif "timeout" in error_msg.lower():
+            error_msg += " - This indicates a timeout error. The server might be slow to respond or unreachable."
+        return error_msg
 
-        # Process each server individually to handle failures gracefully
-        for server_name, connection in self.client.connections.items():
+    async def _load_servers(self, server_names: List[str],
+                            on_progress: Optional[Callable[[str, int, int], None]] = None) -> Dict[str, str]:
+        """Load tools and resources for the given servers into the per-server indexes.
+
+        Returns:
+            dict: Mapping of failed server names to their error messages
+        """
+        failed_servers = {}
+        for index, server_name in enumerate(server_names):
             try:
-                print(f"MCPManager: Fetching tools from server '{server_name}'...")
-                # Open persistent session using context manager but store it properly
-                session_cm = self.client.session(server_name)
-                session = await session_cm.__aenter__()
-                self.sessions[server_name] = session_cm  # Store the context manager
-                self.active_sessions[server_name] = session  # Store the session object
-                tools = await load_mcp_tools(session)
-                # Try to get resources, but handle "Method not found" gracefully
-                try:
-                    resources = await load_mcp_resources(session)
-                except Exception as resource_error:
-                    if "Method not found" in str(resource_error):
-                        print(f"MCPManager: Server '{server_name}' doesn't support resources method, continuing with tools only")
-                        resources = []
-                    else:
-                        # Re-raise if it's a different error
-                        raise resource_error
-                if tools:
-                    all_tools.extend(tools)
-                    print(f"MCPManager: Successfully loaded {len(tools)} tools from '{server_name}'")
-                else:
-                    print(f"MCPManager: No tools returned from '{server_name}'")
-                if resources:
-                    all_resources.extend(resources)
-                    print(f"MCPManager: Successfully loaded {len(resources)} resources from '{server_name}'")
-                else:
-                    print(f"MCPManager: No resources returned from '{server_name}'")
+                tools, resources = await self._load_server(server_name)
+                self.registry.register_server(server_name, tools)
+                self.server_resources[server_name] = resources
             except Exception as e:
                 error_msg = str(e)
                 print(f"MCPManager: Failed to load tools from '{server_name}': {error_msg}")
-
-                # Provide more detailed error information for common issues
-                if "401 Unauthorized" in error_msg:
-                    error_msg += " - This indicates an authentication issue with the remote MCP server. Please check your API key or authentication credentials."
-                elif "TaskGroup" in error_msg and "unhandled errors" in error_msg:
-                    # This might contain a 401 error, let's provide a general auth error message
-                    error_msg += " - This indicates an issue with the connection to the remote MCP server. This could be due to authentication problems, network issues, or server configuration errors."
-                elif "Connection refused" in error_msg:
-                    error_msg += " - This indicates that the server is not reachable. Please check the URL and ensure the server is running."
-                elif "timeout" in error_msg.lower():
-                    error_msg += " - This indicates a timeout error. The server might be slow to respond or unreachable."
-
-                failed_servers[server_name] = error_msg
+                self.registry.forget_server(server_name)
+                self.server_resources.pop(server_name, None)
+                self.resources.forget_server(server_name)
+                failed_servers[server_name] = self._explain_error(error_msg)
                 import traceback
                 traceback.print_exc()
+            finally:
+                if on_progress:
+                    on_progress(server_name, index + 1, len(server_names))
+        return failed_servers
+
+    def loaded_tools(self) -> List[Any]:
+        """All currently loaded tools, in server configuration order.
+
+        When any server tool is loaded, ``read_result_chunk`` is appended so the model can
+        page through results that were offloaded for being too large.
+        """
+        tools = self.registry.tools(self.client.connections)
+        if tools:
+            tools.append(self.results.read_tool())
+        return tools
+
+    def server_for_tool(self, tool_name: str) -> Optional[str]:
+        """Name of the server that owns a loaded tool."""
+        return self.registry.server_of(tool_name)
 
+    def tool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Call counts, errors and latency per loaded tool."""
+        return self.registry.stats_snapshot()
+
+    def loaded_resources(self) -> List[Any]:
+        """All currently loaded resources, in server configuration order."""
+        return [resource for name in self.client.connections if name in self.server_resources
+                for resource in self.server_resources[name]]
+
+    async def get_tools_with_failures(self, on_progress: Optional[Callable[[str, int, int], None]] = None):
+        """Fetch all available tools from configured MCP servers, handling individual failures gracefully.
+
+        Args:
+            on_progress: Optional callback invoked after each server is processed with
+                (server_name, servers_done, servers_total).
+
+        Returns:
+            tuple: (tools_list, failed_servers_dict, resources_list)
+                - tools_list: List of successfully loaded tools
+                - failed_servers_dict: Dict mapping server names to their error messages
+                - resources_list: List of successfully loaded resources
+        """
+        print("MCPManager: Attempting to fetch tools with individual failure handling...")
+
+        # Process each server individually to handle failures gracefully
+        self.registry.clear()
+        self.server_resources.clear()
+        for server_name in list(self.resources.server_entries):
+            self.resources.forget_server(server_name)
+        failed_servers = await self._load_servers(list(self.client.connections.keys()), on_progress)
+        self.failed_servers = failed_servers
+
+        all_tools = self.loaded_tools()
+        all_resources = self.loaded_resources()
         print(f"MCPManager: Total tools loaded: {len(all_tools)}")
         print(f"MCPManager: Total resources loaded: {len(all_resources)}")
         if failed_servers:
@@ -120,17 +259,35 @@ class MCPManager:
         return all_tools, failed_servers, all_resources
 
     async def get_resources(self):
-        """Fetch all available resources from configured MCP servers with individual failure handling."""
+        """List available resources from configured MCP servers with individual failure handling.
+
+        Uses the listings gathered during tool discovery and only lists servers that have not
+        been loaded yet, reusing their persistent sessions. Bodies are not read; use
+        ``read_resource`` or ``read_resource_chunked`` for that.
+
+        Returns:
+            tuple: (resource metadata list, failed_servers_dict)
+        """
         try:
             print("MCPManager: Attempting to fetch resources...")
-            # Use the failure-tolerant method to get resources
-            tools, failures, resources = await self.get_tools_with_failures()
+            failures = dict(self.failed_servers)
+            for server_name in self.client.connections:
+                if server_name in self.server_resources or server_name in failures:
+                    continue
+                try:
+                    session = await self.open_session(server_name)
+                    self.server_resources[server_name] = await self.resources.list_server(server_name, session)
+                except Exception as e:
+                    if "Method not found" in str(e):
+                        self.server_resources[server_name] = []
+                    else:
+                        failures[server_name] = self._explain_error(str(e))
+            resources = self.loaded_resources()
             if failures:
                 print(f"MCPManager: Some servers failed ({len(failures)} failures), but {len(resources)} resources loaded successfully")
-                return resources, failures
             else:
                 print(f"MCPManager: Successfully fetched {len(resources)} resources from all servers")
-                return resources, failures
+            return resources, failures
         except Exception as e:
             print(f"MCPManager: Error fetching resources: {e}")
             import traceback
@@ -138,6 +295,22 @@ class MCPManager:
             # Return empty list for resources and empty dict for failures
             return [], {}
 
+    async def read_resource(self, uri: str, max_bytes: Optional[int] = None):
+        """Read a resource body on demand (cached), using the owning server's session.
+
+        Returns:
+            list: LangChain Blobs with the resource contents
+        """
+        return await self.resources.read(uri, self.open_session, max_bytes=max_bytes)
+
+    def read_resource_chunked(self, uri: str, chunk_size: int = 64 * 1024, max_bytes: Optional[int] = None):
+        """Async iterator over a resource body in chunks of at most ``chunk_size``.
+
+        The whole body is read first, capped like ``read_resource``; see
+        ``ResourceCatalog.read_chunked``.
+        """
+        return self.resources.read_chunked(uri, self.open_session, chunk_size=chunk_size, max_bytes=max_bytes)
+
     async def get_connection_status(self):
         """Get the status of all MCP server connections."""
         try:
@@ -175,11 +348,11 @@ class MCPManager:
 
             print(f"{self.client.connections.get(server_name)} Config")
             # Try to get tools from this specific server using session
-            async with self.client.session(server_name) as session:
+            async with self._connect(server_name) as session:
                 tools = await load_mcp_tools(session)
-                # Try to get resources, but handle "Method not found" gracefully
+                # Try to list resources, but handle "Method not found" gracefully
                 try:
-                    resources = await load_mcp_resources(session)
+                    resources = await list_resources(session)
                 except Exception as resource_error:
                     if "Method not found" in str(resource_error):
                         print(f"MCPManager: Server '{server_name}' doesn't support resources method, continuing with tools only")
@@ -224,23 +397,84 @@ class MCPManager:
 
     async def close_sessions(self):
         """Close all persistent sessions."""
-        for server_name, session in self.sessions.items():
-            try:
-                await session.__aexit__(None, None, None)
-                print(f"MCPManager: Closed session for '{server_name}'")
-            except Exception as e:
-                print(f"MCPManager: Error closing session for '{server_name}': {e}")
-        self.sessions.clear()
+        for server_name in list(self.sessions.keys()):
+            await self.close_session(server_name)
+
+    async def refresh(self, new_configs: Dict[str, MCPConnection],
+                      on_ready: Optional[Callable[[Dict[str, Any]], None]] = None,
+                      wait_idle: Optional[Callable[[], Awaitable[None]]] = None) -> Dict[str, Any]:
+        """Hot-reload configuration, touching only the servers whose configuration changed.
+
+        Sessions of unchanged servers stay open. Removed and changed servers are detached
+        first, added and changed servers are opened and listed, then ``on_ready`` is called
+        with the diff so the caller can swap in the new tool set. The detached sessions are
+        closed once ``wait_idle`` returns, in a background task, so calls still in flight on
+        the previous tool set can complete; without ``wait_idle`` they are closed right away.
+
+        Errors, including ones raised by ``on_ready``, are re-raised after the detached
+        sessions are handed off, so the caller can fall back to a full reload.
+
+        Returns:
+            dict: {'added', 'removed', 'changed', 'unchanged': server name lists,
+                   'failed': {server name: error message}}
+        """
+        old_configs = self.server_configs
+        diff = {
+            'added': [name for name in new_configs if name not in old_configs],
+            'removed': [name for name in old_configs if name not in new_configs],
+            'changed': [name for name in new_configs
+                        if name in old_configs and new_configs[name] != old_configs[name]],
+            'unchanged': [name for name in new_configs
+                          if name in old_configs and new_configs[name] == old_configs[name]],
+            'failed': {},
+        }
+        print(f"MCPManager: Refreshing configuration: added={diff['added']}, "
+              f"removed={diff['removed']}, changed={diff['changed']}")
+
+        # Detach sessions that must go away without closing them yet
+        retiring = []
+        for server_name in diff['removed'] + diff['changed']:
+            entry = self.sessions.pop(server_name, None)
+            self.active_sessions.pop(server_name, None)
+            self.registry.forget_server(server_name)
+            self.server_resources.pop(server_name, None)
+            self.resources.forget_server(server_name)
+            self.failed_servers.pop(server_name, None)
+            if entry is not None:
+                retiring.append((server_name, entry))
 
-    async def refresh(self, new_configs: Dict[str, MCPConnection]):
-        """Hot-reload configuration and reinitialize the MultiServerMCPClient."""
         try:
-            # Close existing sessions before refreshing
-            await self.close_sessions()
             self.server_configs = new_configs
             self.client = MultiServerMCPClient(new_configs)
+            # Retry servers that failed previously even if their configuration is unchanged
+            retry = [name for name in diff['unchanged'] if name in self.failed_servers]
+            diff['failed'] = await self._load_servers(diff['added'] + diff['changed'] + retry)
+            for server_name in retry:
+                self.failed_servers.pop(server_name, None)
+            self.failed_servers.update(diff['failed'])
+
+            if on_ready:
+                on_ready(diff)
             print("MCPManager: Successfully refreshed configuration")
         except Exception as e:
             print(f"MCPManager: Error refreshing configuration: {e}")
             import traceback
-            traceback.print_exc()
\ No newline at end of file
+            traceback.print_exc()
+            raise
+        finally:
+            # The previous tools stay usable until the caller is idle, even if the refresh failed
+            if retiring and wait_idle is not None:
+                retire = asyncio.create_task(self._retire_sessions(retiring, wait_idle))
+                self._retiring_tasks.add(retire)
+                retire.add_done_callback(self._retiring_tasks.discard)
+            elif retiring:
+                await self._retire_sessions(retiring)
+        return diff
+
+    async def _retire_sessions(self, retiring: List[tuple],
+                               wait_idle: Optional[Callable[[], Awaitable[None]]] = None):
+        """Stop detached session owners, after ``wait_idle`` returns if given."""
+        if wait_idle is not None:
+            await wait_idle()
+        for server_name, (task, stop) in retiring:
+            await self._stop_session_owner(server_name, task, stop)
@@ -0,0 +1,150 @@
+import hashlib
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.tools import BaseTool, StructuredTool
+
+from mcp_client.results import READ_TOOL_NAME
+from mcp_client.tools import wrap_tool
+
+# Tool names accepted by OpenAI-compatible APIs
+_INVALID_NAME_CHARS = re.compile(r'[^A-Za-z0-9_-]')
+MAX_TOOL_NAME_LENGTH = 64
+# Names of built-in tools exposed next to the servers' tools
+RESERVED_TOOL_NAMES = frozenset({READ_TOOL_NAME})
+
+
+def _with_suffix(name: str, server_name: str, tool_name: str) -> str:
+    """``name`` cut short enough to end in a hash of the owning server and original tool name."""
+    digest = hashlib.sha1(f"{server_name}\0{tool_name}".encode('utf-8')).hexdigest()[:8]
+    return f"{name[:MAX_TOOL_NAME_LENGTH - len(digest) - 1]}_{digest}"
+
+
+def namespaced_name(server_name: str, tool_name: str) -> str:
+    """Name used for a tool whose name is also exposed by another server.
+
+    Names over ``MAX_TOOL_NAME_LENGTH`` are truncated and given a hash suffix, so two
+    long names sharing a prefix stay distinct.
+    """
+    name = _INVALID_NAME_CHARS.sub('_', f"{server_name}__{tool_name}")
+    if len(name) <= MAX_TOOL_NAME_LENGTH:
+        return name
+    return _with_suffix(name, server_name, tool_name)
+
+
+class ToolRegistry:
+    """
+    Index of discovered MCP tools: owning server, schema, annotations and call stats.
+
+    Each server's tools are registered as they are discovered. A name exposed by more
+    than one server is namespaced as ``<server>__<tool>`` for every server that has it,
+    so the exposed names don't depend on discovery order and each call reaches the
+    server that owns the tool. Tools named like a built-in (``RESERVED_TOOL_NAMES``) are
+    namespaced too, and names that still clash after namespacing (e.g. two server/tool
+    pairs sanitized to the same string) all get a hash suffix.
+    """
+
+    def __init__(self):
+        self.server_tools: Dict[str, List[BaseTool]] = {}  # Server -> tools as discovered
+        self.by_name: Dict[str, Dict[str, Any]] = {}  # Exposed name -> registry entry
+        self.stats: Dict[Tuple[str, str], Dict[str, Any]] = {}  # (server, tool) -> call stats
+
+    def register_server(self, server_name: str, tools: List[BaseTool]):
+        """Record (or replace) the tools discovered on a server."""
+        self.server_tools[server_name] = [self._instrument(server_name, tool) for tool in tools]
+        self._rebuild()
+
+    def forget_server(self, server_name: str):
+        if self.server_tools.pop(server_name, None) is not None:
+            self._rebuild()
+
+    def clear(self):
+        self.server_tools.clear()
+        self.by_name.clear()
+
+    def _rebuild(self):
+        owners = Counter(tool.name for tools in self.server_tools.values() for tool in tools)
+        candidates = []  # (server, tool, exposed name)
+        for server_name, tools in self.server_tools.items():
+            for tool in tools:
+                shared = owners[tool.name] > 1 or tool.name in RESERVED_TOOL_NAMES
+                candidates.append((server_name, tool,
+                                   namespaced_name(server_name, tool.name) if shared else tool.name))
+        claims = Counter(name for _, _, name in candidates)
+
+        by_name = {}
+        for server_name, tool, name in candidates:
+            if claims[name] > 1 or name in RESERVED_TOOL_NAMES:
+                name = _with_suffix(name, server_name, tool.name)
+            if name in by_name:
+                # A server listing the same tool twice: keep the first
+                continue
+            exposed = tool if name == tool.name else tool.model_copy(update={'name': name})
+            by_name[name] = {
+                'name': exposed.name,
+                'original_name': tool.name,
+                'server': server_name,
+                'schema': tool.args_schema if isinstance(tool.args_schema, dict) else None,
+                'annotations': dict(tool.metadata or {}),
+                'tool': exposed,
+                'stats': self._stats_for(server_name, tool.name),
+            }
+        self.by_name = by_name
+
+    def _stats_for(self, server_name: str, tool_name: str) -> Dict[str, Any]:
+        # Keyed by owner and original name so stats survive renames and reconnects
+        return self.stats.setdefault((server_name, tool_name), {
+            'calls': 0, 'errors': 0, 'total_seconds': 0.0, 'last_called_at': None})
+
+    def _instrument(self, server_name: str, tool: BaseTool) -> BaseTool:
+        """Wrap a tool so every call updates its stats."""
+        if not isinstance(tool, StructuredTool) or tool.coroutine is None:
+            return tool
+        call_tool = tool.coroutine
+        stats = self._stats_for(server_name, tool.name)
+
+        async def timed_call(**arguments: Any):
+            started = time.perf_counter()
+            stats['calls'] += 1
+            stats['last_called_at'] = time.time()
+            try:
+                return await call_tool(**arguments)
+            except Exception:
+                stats['errors'] += 1
+                raise
+            finally:
+                stats['total_seconds'] += time.perf_counter() - started
+
+        return wrap_tool(tool, coroutine=timed_call)
+
+    def tools(self, server_order: Optional[Iterable[str]] = None) -> List[BaseTool]:
+        """Exposed tools, grouped by server in ``server_order`` (default: registration order)."""
+        order = list(server_order) if server_order is not None else list(self.server_tools)
+        rank = {name: index for index, name in enumerate(order)}
+        entries = [entry for entry in self.by_name.values() if entry['server'] in rank]
+        entries.sort(key=lambda entry: rank[entry['server']])
+        return [entry['tool'] for entry in entries]
+
+    def entry(self, tool_name: str) -> Optional[Dict[str, Any]]:
+        return self.by_name.get(tool_name)
+
+    def server_of(self, tool_name: str) -> Optional[str]:
+        """Server that owns an exposed tool name."""
+        entry = self.by_name.get(tool_name)
+        return entry['server'] if entry else None
+
+    def tools_of(self, server_name: str) -> List[str]:
+        """Exposed names of a server's tools."""
+        return [name for name, entry in self.by_name.items() if entry['server'] == server_name]
+
+    def stats_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Call stats per exposed tool name, with mean latency."""
+        snapshot = {}
+        for name, entry in self.by_name.items():
+            stats = dict(entry['stats'])
+            stats['server'] = entry['server']
+            stats['mean_seconds'] = stats['total_seconds'] / stats['calls'] if stats['calls'] else 0.0
+            snapshot[name] = stats
+        return snapshot
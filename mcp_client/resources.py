@@ -0,0 +1,148 @@
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Union
+
+from langchain_core.documents.base import Blob
+from langchain_mcp_adapters.resources import get_mcp_resource
+
+
+class ResourceTooLargeError(ValueError):
+    """Raised when a resource exceeds the configured size limit."""
+
+
+async def list_resources(session) -> List[Any]:
+    """List every resource a session exposes, following pagination cursors."""
+    resources = []
+    cursor = None
+    while True:
+        result = await session.list_resources(cursor)
+        resources.extend(result.resources)
+        cursor = result.nextCursor
+        if not cursor:
+            return resources
+
+
+def _blob_size(blob: Blob) -> int:
+    data = blob.data
+    if isinstance(data, str):
+        return len(data.encode("utf-8"))
+    return len(data or b"")
+
+
+class ResourceCatalog:
+    """
+    Resource metadata per server, with lazily fetched and size-bounded content.
+
+    Discovery only lists resources (URI, name, MIME type, size). Bodies are read on
+    demand through the session the tool path already holds, kept in a byte-bounded
+    LRU cache, and can be handed out in chunks once read.
+    """
+
+    def __init__(self, max_resource_bytes: int = 5 * 1024 * 1024,
+                 max_cache_bytes: int = 32 * 1024 * 1024):
+        self.max_resource_bytes = max_resource_bytes  # Largest body read unless overridden
+        self.max_cache_bytes = max_cache_bytes  # Total bytes of cached bodies
+        self.server_entries: Dict[str, List[Dict[str, Any]]] = {}  # Server -> resource metadata
+        self.by_uri: Dict[str, Dict[str, Any]] = {}  # URI -> resource metadata
+        self._cache: "OrderedDict[str, List[Blob]]" = OrderedDict()
+        self._cache_sizes: Dict[str, int] = {}
+        self._cache_bytes = 0
+
+    async def list_server(self, server_name: str, session) -> List[Dict[str, Any]]:
+        """List a server's resources (without reading their bodies) and index them."""
+        self.forget_server(server_name)
+        entries = []
+        for resource in await list_resources(session):
+            uri = str(resource.uri)
+            entry = {
+                'server': server_name,
+                'uri': uri,
+                'name': resource.name,
+                'description': resource.description,
+                'mime_type': resource.mimeType,
+                'size': resource.size,
+            }
+            entries.append(entry)
+            self.by_uri[uri] = entry
+        self.server_entries[server_name] = entries
+        return entries
+
+    def forget_server(self, server_name: str):
+        """Drop a server's listing and any cached bodies (e.g. on reload or removal)."""
+        for entry in self.server_entries.pop(server_name, []):
+            if self.by_uri.get(entry['uri']) is entry:
+                del self.by_uri[entry['uri']]
+            self._evict(entry['uri'])
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """All known resource metadata entries."""
+        return [entry for entries in self.server_entries.values() for entry in entries]
+
+    def find(self, uri: str) -> Optional[Dict[str, Any]]:
+        """Metadata for a URI, or None if no loaded server exposes it."""
+        return self.by_uri.get(uri)
+
+    async def read(self, uri: str, get_session: Callable[[str], Awaitable[Any]],
+                   max_bytes: Optional[int] = None) -> List[Blob]:
+        """Read a resource body, serving it from the cache when possible.
+
+        Args:
+            uri: Resource URI.
+            get_session: Coroutine function returning the session for a server name.
+            max_bytes: Size limit for this read; defaults to ``max_resource_bytes``.
+
+        Raises:
+            KeyError: If the URI is not in the catalog.
+            ResourceTooLargeError: If the advertised or actual size exceeds the limit.
+        """
+        limit = self.max_resource_bytes if max_bytes is None else max_bytes
+        if uri in self._cache:
+            self._cache.move_to_end(uri)
+            if self._cache_sizes[uri] > limit:
+                raise ResourceTooLargeError(f"Resource '{uri}' is {self._cache_sizes[uri]} bytes (limit {limit})")
+            return self._cache[uri]
+
+        entry = self.find(uri)
+        if entry is None:
+            raise KeyError(f"Unknown resource '{uri}'")
+        if entry['size'] is not None and entry['size'] > limit:
+            raise ResourceTooLargeError(f"Resource '{uri}' is {entry['size']} bytes (limit {limit})")
+
+        session = await get_session(entry['server'])
+        blobs = await get_mcp_resource(session, uri)
+        size = sum(_blob_size(blob) for blob in blobs)
+        if size > limit:
+            raise ResourceTooLargeError(f"Resource '{uri}' is {size} bytes (limit {limit})")
+        self._store(uri, blobs, size)
+        return blobs
+
+    async def read_chunked(self, uri: str, get_session: Callable[[str], Awaitable[Any]],
+                           chunk_size: int = 64 * 1024,
+                           max_bytes: Optional[int] = None) -> AsyncIterator[Union[str, bytes]]:
+        """Read a resource body with ``read`` and yield it in chunks of at most ``chunk_size``.
+
+        This does not stream: MCP ``resources/read`` returns a whole body per request, so
+        the body is fetched and held in memory first, subject to the same ``max_bytes``
+        limit (``max_resource_bytes`` by default) as ``read``. Chunking only bounds how
+        much is handed to the caller at once.
+        """
+        for blob in await self.read(uri, get_session, max_bytes=max_bytes):
+            data = blob.data if blob.data is not None else b""
+            for start in range(0, len(data), chunk_size):
+                yield data[start:start + chunk_size]
+
+    def _store(self, uri: str, blobs: List[Blob], size: int):
+        # Bodies larger than the whole cache are returned but never cached
+        if size > self.max_cache_bytes:
+            return
+        self._evict(uri)
+        self._cache[uri] = blobs
+        self._cache_sizes[uri] = size
+        self._cache_bytes += size
+        while self._cache_bytes > self.max_cache_bytes and self._cache:
+            oldest = next(iter(self._cache))
+            self._evict(oldest)
+
+    def _evict(self, uri: str):
+        if uri in self._cache:
+            del self._cache[uri]
+            self._cache_bytes -= self._cache_sizes.pop(uri)
@@ -0,0 +1,193 @@
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from langchain_core.tools import BaseTool, StructuredTool
+from pydantic import BaseModel, Field
+
+import serialization
+from mcp_client.tools import wrap_tool
+
+# Rough characters-per-token ratio used when tiktoken (or its encoding file) is unavailable
+CHARS_PER_TOKEN = 4
+
+# Name of the built-in tool that pages through stored results
+READ_TOOL_NAME = "read_result_chunk"
+
+_encoder = None
+_encoder_failed = False
+
+
+def _get_encoder():
+    """Load the tiktoken encoding once; remember failures (e.g. offline) instead of retrying."""
+    global _encoder, _encoder_failed
+    if _encoder is None and not _encoder_failed:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            print(f"ResultShaper: tiktoken unavailable, estimating tokens from length: {e}")
+            _encoder_failed = True
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in ``text`` (tiktoken cl100k_base, or a length-based estimate)."""
+    encoder = _get_encoder()
+    if encoder is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def _content_to_text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "\n".join(item if isinstance(item, str) else _value_to_text(item) for item in content)
+    return _value_to_text(content)
+
+
+def _value_to_text(value: Any) -> str:
+    # Structured content (e.g. content blocks or structured tool output) as JSON, not repr
+    if isinstance(value, (dict, list)):
+        return serialization.dumps(value)
+    return str(value)
+
+
+class ResultStore:
+    """In-process, byte-bounded LRU store of oversized tool results addressed by handle."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entries: int = 256):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+
+    def put(self, text: str, tool_name: str) -> str:
+        """Store a result and return its handle."""
+        handle = f"res_{uuid.uuid4().hex[:12]}"
+        size = len(text.encode("utf-8"))
+        self._entries[handle] = {'text': text, 'tool': tool_name, 'size': size, 'created_at': time.time()}
+        self._bytes += size
+        while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted['size']
+        return handle
+
+    def get(self, handle: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(handle)
+        if entry is not None:
+            self._entries.move_to_end(handle)
+        return entry
+
+    def read(self, handle: str, offset: int = 0, max_chars: int = 8000) -> Dict[str, Any]:
+        """Return a slice of a stored result and the offset to continue from.
+
+        Raises:
+            KeyError: If the handle is unknown or has been evicted.
+        """
+        entry = self.get(handle)
+        if entry is None:
+            raise KeyError(f"Unknown or expired result handle '{handle}'")
+        text = entry['text']
+        offset = max(offset, 0)
+        chunk = text[offset:offset + max(max_chars, 1)]
+        end = offset + len(chunk)
+        return {
+            'handle': handle,
+            'tool': entry['tool'],
+            'offset': offset,
+            'next_offset': end if end < len(text) else None,
+            'total_chars': len(text),
+            'content': chunk,
+        }
+
+
+class ReadResultChunkInput(BaseModel):
+    handle: str = Field(description="Handle of a stored tool result, e.g. 'res_0123abcd4567'.")
+    offset: int = Field(default=0, description="Character offset to start reading from.")
+    max_chars: int = Field(default=8000, description="Maximum number of characters to return.")
+
+
+class ResultShaper:
+    """
+    Keeps large tool results out of the LLM context.
+
+    Wrapped tools measure each result in tokens. Results above ``max_tokens`` are stored
+    in a ``ResultStore`` and replaced by a preview plus a handle the model can page
+    through with the ``read_result_chunk`` tool.
+    """
+
+    def __init__(self, store: Optional[ResultStore] = None, max_tokens: int = 2000,
+                 preview_tokens: int = 500, chunk_chars: int = 8000):
+        self.store = store or ResultStore()
+        self.max_tokens = max_tokens
+        self.preview_tokens = preview_tokens
+        self.chunk_chars = chunk_chars
+        self._read_tool: Optional[BaseTool] = None
+
+    def _is_oversized(self, text: str) -> bool:
+        # Cheap bounds first: a token is at least one character and rarely more than ~10
+        if len(text) <= self.max_tokens:
+            return False
+        if len(text) > self.max_tokens * 10:
+            return True
+        return count_tokens(text) > self.max_tokens
+
+    def shape(self, tool_name: str, content: Any) -> Any:
+        """Return ``content`` unchanged, or a preview with a handle if it is too large."""
+        text = _content_to_text(content)
+        if not self._is_oversized(text):
+            return content
+        handle = self.store.put(text, tool_name)
+        preview = text[:self.preview_tokens * CHARS_PER_TOKEN]
+        print(f"ResultShaper: Stored {len(text)} character result from '{tool_name}' as {handle}")
+        return (
+            f"{preview}\n\n[Result truncated: showing the first {len(preview)} of {len(text)} characters. "
+            f"The full result is stored as handle '{handle}'. Call read_result_chunk with "
+            f"handle='{handle}' and offset={len(preview)} to read more, only if you need it.]"
+        )
+
+    def wrap_tool(self, tool: BaseTool) -> BaseTool:
+        """Wrap an MCP tool so its results pass through ``shape``."""
+        if not isinstance(tool, StructuredTool) or tool.coroutine is None:
+            return tool
+        call_tool = tool.coroutine
+        shaper = self
+
+        async def shaped_call(**arguments: Any):
+            result = await call_tool(**arguments)
+            if tool.response_format == "content_and_artifact":
+                content, artifact = result
+                return shaper.shape(tool.name, content), artifact
+            return shaper.shape(tool.name, result)
+
+        return wrap_tool(tool, coroutine=shaped_call)
+
+    def read_tool(self) -> BaseTool:
+        """The ``read_result_chunk`` tool serving stored results (created once)."""
+        if self._read_tool is None:
+            store = self.store
+            default_chars = self.chunk_chars
+
+            async def read_result_chunk(handle: str, offset: int = 0, max_chars: int = default_chars) -> Dict[str, Any]:
+                try:
+                    return store.read(handle, offset, min(max_chars, default_chars))
+                except KeyError as e:
+                    return {'handle': handle, 'error': str(e.args[0])}
+
+            self._read_tool = StructuredTool.from_function(
+                coroutine=read_result_chunk,
+                name=READ_TOOL_NAME,
+                description="Read part of a large tool result that was truncated. Pass the handle from "
+                            "the truncation note and the offset to continue from; the response includes "
+                            "next_offset (null when the end is reached).",
+                args_schema=ReadResultChunkInput,
+                # Only reads the in-process store, so turns that page through results can be cached
+                metadata={'readOnlyHint': True},
+            )
+        return self._read_tool
+
+    def wrap_tools(self, tools: List[BaseTool]) -> List[BaseTool]:
+        return [self.wrap_tool(tool) for tool in tools]
@@ -0,0 +1,382 @@
+import asyncio
+import contextlib
+import os
+import time
+import uuid
+import weakref
+from typing import Any, Dict, List, Optional
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+import serialization
+
+try:
+    import psutil
+except ImportError:  # psutil is optional; fall back to /proc on Linux
+    psutil = None
+
+# Environment variable that tags every process of one pooled server instance
+WORKER_MARKER = "MCP_POOL_WORKER_ID"
+
+
+def _descendant_pids() -> List[int]:
+    if psutil is not None:
+        return [child.pid for child in psutil.Process().children(recursive=True)]
+    parents: Dict[int, int] = {}
+    for entry in os.listdir("/proc") if os.path.isdir("/proc") else []:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat:
+                # The command name may contain spaces, so split after the closing paren
+                parents[int(entry)] = int(stat.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    descendants, frontier = set(), {os.getpid()}
+    while frontier:
+        frontier = {pid for pid, ppid in parents.items() if ppid in frontier and pid not in descendants}
+        descendants |= frontier
+    return list(descendants)
+
+
+def _has_marker(pid: int, marker: str) -> bool:
+    try:
+        if psutil is not None:
+            return psutil.Process(pid).environ().get(WORKER_MARKER) == marker
+        with open(f"/proc/{pid}/environ", "rb") as environ:
+            return f"{WORKER_MARKER}={marker}".encode() in environ.read().split(b"\0")
+    except Exception:
+        return False
+
+
+def _rss_bytes(pid: int) -> int:
+    try:
+        if psutil is not None:
+            return psutil.Process(pid).memory_info().rss
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except Exception:
+        pass
+    return 0
+
+
+def find_worker_pids(marker: str) -> List[int]:
+    """Processes of one worker (a launcher like ``uv run`` and the server it starts)."""
+    return [pid for pid in _descendant_pids() if _has_marker(pid, marker)]
+
+
+class PooledSession:
+    """
+    MCP session handed out by a ``StdioPool``.
+
+    Looks like a ``ClientSession`` but forwards each request to the current warm worker,
+    moving to a fresh worker between calls once the current one has served ``max_calls``
+    tool calls, grown past its memory limit or died. Tools bound to this object keep working
+    across those swaps.
+    """
+
+    def __init__(self, pool: "StdioPool", worker: Dict[str, Any]):
+        self._pool = pool
+        self._worker = worker
+
+    async def _current(self) -> Dict[str, Any]:
+        worker = self._worker
+        # Checking the process first lets a call skip a crashed server instead of failing
+        if worker['state'] == 'leased':
+            self._pool.check_alive(worker)
+        if worker['state'] != 'leased' or worker['calls'] >= self._pool.max_calls:
+            reason = worker['state'] if worker['state'] != 'leased' else f"{worker['calls']} calls"
+            print(f"StdioPool: Replacing worker for '{self._pool.name}' ({reason})")
+            self._worker = await self._pool.checkout()
+            self._pool.retire(worker)
+        return self._worker
+
+    async def _request(self, method: str, *args: Any, **kwargs: Any):
+        worker = await self._current()
+        if method == 'call_tool':
+            worker['calls'] += 1
+        worker['in_flight'] += 1
+        try:
+            return await getattr(worker['session'], method)(*args, **kwargs)
+        except Exception:
+            # A dead server surfaces as a closed stream; make sure the next call moves on
+            self._pool.check_alive(worker)
+            raise
+        finally:
+            worker['in_flight'] -= 1
+            if worker['state'] == 'retiring' and not worker['in_flight']:
+                worker['stop'].set()
+
+    async def call_tool(self, *args: Any, **kwargs: Any):
+        return await self._request('call_tool', *args, **kwargs)
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._worker['session'], name)
+        if not asyncio.iscoroutinefunction(attribute):
+            return attribute
+
+        async def forward(*args: Any, **kwargs: Any):
+            return await self._request(name, *args, **kwargs)
+
+        return forward
+
+    def release(self):
+        self._pool.retire(self._worker)
+
+
+class StdioPool:
+    """
+    Warm, initialized processes of one stdio MCP server.
+
+    ``size`` idle workers are kept started and initialized, so a session open only takes
+    one off the pool. Workers are never returned to the pool after use (a server may keep
+    per-session state); they are stopped and replaced in the background. A monitor task
+    replaces workers that died and marks ones that grew by more than
+    ``max_memory_growth_mb`` for recycling.
+
+    The pool counts open leases and closes itself (stopping its workers) once it has had
+    none for ``idle_close_seconds``, e.g. after its server was edited or removed, or the
+    workspace using it was evicted.
+    """
+
+    def __init__(self, name: str, connection: Dict[str, Any], size: int = 1, max_calls: int = 1000,
+                 max_memory_growth_mb: Optional[float] = 256, check_interval: float = 5.0,
+                 idle_close_seconds: Optional[float] = 300):
+        self.name = name
+        self.connection = connection
+        self.size = size
+        self.max_calls = max_calls
+        self.max_memory_growth_mb = max_memory_growth_mb
+        self.check_interval = check_interval
+        self.workers: List[Dict[str, Any]] = []
+        self.stats = {'started': 0, 'crashed': 0, 'recycled': 0, 'checkouts': 0, 'warm_checkouts': 0}
+        self.closed = False
+        self.idle_close_seconds = idle_close_seconds
+        self.leases = 0
+        self.idle_since: Optional[float] = time.time()  # Set while no lease is open
+        self._monitor: Optional[asyncio.Task] = None
+
+    def _parameters(self, marker: str) -> StdioServerParameters:
+        connection = self.connection
+        params = {'command': connection['command'], 'args': connection.get('args') or [],
+                  'env': {**(connection.get('env') or {}), WORKER_MARKER: marker}, 'cwd': connection.get('cwd')}
+        for key in ('encoding', 'encoding_error_handler'):
+            if connection.get(key):
+                params[key] = connection[key]
+        return StdioServerParameters(**params)
+
+    def start(self):
+        """Fill the pool and start the monitor (call from the loop that will use it)."""
+        if self._monitor is None:
+            self._monitor = asyncio.create_task(self._watch())
+        self._top_up()
+
+    def _top_up(self):
+        idle = sum(1 for worker in self.workers if worker['state'] in ('starting', 'idle'))
+        for _ in range(max(self.size - idle, 0)):
+            self._spawn()
+
+    def _spawn(self) -> Dict[str, Any]:
+        worker = {
+            'marker': uuid.uuid4().hex,
+            'state': 'starting',
+            'ready': asyncio.get_running_loop().create_future(),
+            'stop': asyncio.Event(),
+            'session': None,
+            'pids': [],
+            'baseline_rss': 0,
+            'calls': 0,
+            'in_flight': 0,
+            'started_at': time.time(),
+        }
+        worker['task'] = asyncio.create_task(self._run_worker(worker))
+        self.workers.append(worker)
+        self.stats['started'] += 1
+        return worker
+
+    async def _run_worker(self, worker: Dict[str, Any]):
+        """Own one server process and its initialized session until told to stop."""
+        try:
+            async with stdio_client(self._parameters(worker['marker'])) as (read, write), \
+                    ClientSession(read, write) as session:
+                await session.initialize()
+                worker['session'] = session
+                worker['pids'] = find_worker_pids(worker['marker'])
+                worker['baseline_rss'] = sum(_rss_bytes(pid) for pid in worker['pids'])
+                if worker['state'] == 'starting':
+                    worker['state'] = 'idle'
+                worker['ready'].set_result(session)
+                await worker['stop'].wait()
+        except Exception as e:
+            if not worker['ready'].done():
+                worker['ready'].set_exception(e)
+            print(f"StdioPool: Worker for '{self.name}' failed: {e}")
+            worker['state'] = 'dead'
+        finally:
+            if worker in self.workers:
+                self.workers.remove(worker)
+            if worker['state'] in ('starting', 'idle'):
+                worker['state'] = 'dead'
+
+    async def checkout(self) -> Dict[str, Any]:
+        """Take a warm worker (waiting for one that is still starting if needed)."""
+        if self.closed:
+            raise RuntimeError(f"Process pool for '{self.name}' is closed")
+        self.stats['checkouts'] += 1
+        candidates = [worker for worker in self.workers if worker['state'] == 'idle']
+        if candidates:
+            self.stats['warm_checkouts'] += 1
+        else:
+            candidates = [worker for worker in self.workers if worker['state'] == 'starting'] or [self._spawn()]
+        worker = candidates[0]
+        worker['state'] = 'leased'
+        try:
+            await worker['ready']
+        except BaseException:
+            worker['state'] = 'dead'
+            worker['stop'].set()
+            raise
+        finally:
+            self._top_up()
+        return worker
+
+    def retire(self, worker: Dict[str, Any]):
+        """Stop a worker once its in-flight requests have finished."""
+        if worker['state'] in ('retiring', 'stopped'):
+            return
+        worker['state'] = 'retiring'
+        if not worker['in_flight']:
+            worker['stop'].set()
+
+    def check_alive(self, worker: Dict[str, Any]) -> bool:
+        pids = worker['pids']
+        if not pids or any(_rss_bytes(pid) for pid in pids):
+            return True
+        if worker['state'] in ('idle', 'leased'):
+            print(f"StdioPool: Worker for '{self.name}' exited unexpectedly")
+            self.stats['crashed'] += 1
+            idle = worker['state'] == 'idle'
+            worker['state'] = 'dead'
+            worker['stop'].set()
+            if idle:
+                self._top_up()
+        return False
+
+    async def _watch(self):
+        while not self.closed:
+            await asyncio.sleep(self.check_interval)
+            if self.idle_close_seconds and self.idle_since is not None \
+                    and time.time() - self.idle_since > self.idle_close_seconds:
+                print(f"StdioPool: Closing unused pool for '{self.name}'")
+                # close() cancels this task, so run it separately
+                asyncio.create_task(self.close())
+                return
+            for worker in list(self.workers):
+                if worker['state'] not in ('idle', 'leased') or not self.check_alive(worker):
+                    continue
+                if self.max_memory_growth_mb and worker['state'] == 'leased':
+                    growth = sum(_rss_bytes(pid) for pid in worker['pids']) - worker['baseline_rss']
+                    if growth > self.max_memory_growth_mb * 1024 * 1024:
+                        print(f"StdioPool: Worker for '{self.name}' grew by {growth / 1048576:.0f}MB, recycling")
+                        self.stats['recycled'] += 1
+                        worker['state'] = 'recycle'
+            self._top_up()
+
+    @contextlib.asynccontextmanager
+    async def lease(self):
+        """A ``PooledSession`` for the duration of the ``async with`` block."""
+        self.leases += 1
+        self.idle_since = None
+        try:
+            session = PooledSession(self, await self.checkout())
+            try:
+                yield session
+            finally:
+                session.release()
+        finally:
+            self.leases -= 1
+            if not self.leases:
+                self.idle_since = time.time()
+
+    async def close(self):
+        self.closed = True
+        if self._monitor is not None:
+            self._monitor.cancel()
+        for worker in list(self.workers):
+            worker['state'] = 'stopped'
+            worker['stop'].set()
+        await asyncio.gather(*(worker['task'] for worker in list(self.workers)), return_exceptions=True)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'leases': self.leases,
+            'workers': [{'state': worker['state'], 'calls': worker['calls'], 'pids': worker['pids']}
+                        for worker in self.workers],
+        }
+
+
+class StdioSupervisor:
+    """
+    Warm process pools for every stdio server used on one event loop.
+
+    Pools are keyed by the server's full connection settings, so every ``MCPManager``
+    on the loop (e.g. one rebuilt after a Settings change) shares them and an edited
+    server gets a new pool. A pool nobody has leased from for ``idle_close_seconds``
+    closes itself, so pools of edited or removed servers don't keep processes running.
+    """
+
+    def __init__(self, size: int, max_calls: int = 1000, max_memory_growth_mb: Optional[float] = 256,
+                 idle_close_seconds: Optional[float] = 300):
+        self.size = size
+        self.max_calls = max_calls
+        self.max_memory_growth_mb = max_memory_growth_mb
+        self.idle_close_seconds = idle_close_seconds
+        self.pools: Dict[str, StdioPool] = {}
+
+    @classmethod
+    def from_env(cls) -> Optional["StdioSupervisor"]:
+        size = int(os.getenv('MCP_STDIO_POOL_SIZE', 0))
+        if size <= 0:
+            return None
+        growth = float(os.getenv('MCP_STDIO_MAX_MEMORY_GROWTH_MB', 256))
+        return cls(size, max_calls=int(os.getenv('MCP_STDIO_MAX_CALLS', 1000)),
+                   max_memory_growth_mb=growth or None,
+                   idle_close_seconds=float(os.getenv('MCP_STDIO_POOL_IDLE_SECONDS', 300)) or None)
+
+    def pool(self, server_name: str, connection: Dict[str, Any]) -> StdioPool:
+        # Forget pools that closed themselves
+        self.pools = {key: pool for key, pool in self.pools.items() if not pool.closed}
+        key = serialization.dumps(connection, sort_keys=True)
+        pool = self.pools.get(key)
+        if pool is None:
+            pool = self.pools[key] = StdioPool(server_name, connection, self.size, self.max_calls,
+                                               self.max_memory_growth_mb,
+                                               idle_close_seconds=self.idle_close_seconds)
+            pool.start()
+        return pool
+
+    def lease(self, server_name: str, connection: Dict[str, Any]):
+        return self.pool(server_name, connection).lease()
+
+    async def close(self):
+        pools, self.pools = list(self.pools.values()), {}
+        await asyncio.gather(*(pool.close() for pool in pools), return_exceptions=True)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {pool.name: pool.snapshot() for pool in self.pools.values()}
+
+
+_supervisors: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Optional[StdioSupervisor]]" = \
+    weakref.WeakKeyDictionary()
+
+
+def stdio_supervisor() -> Optional[StdioSupervisor]:
+    """The supervisor for the running loop, or None unless ``MCP_STDIO_POOL_SIZE`` is set."""
+    loop = asyncio.get_running_loop()
+    if loop not in _supervisors:
+        _supervisors[loop] = StdioSupervisor.from_env()
+    return _supervisors[loop]
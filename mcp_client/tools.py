@@ -0,0 +1,19 @@
+from typing import Any, Callable
+
+from langchain_core.tools import BaseTool, StructuredTool
+
+
+def wrap_tool(tool: BaseTool, coroutine: Callable[..., Any]) -> StructuredTool:
+    """Copy of ``tool`` (name, schema, response format and annotations) calling ``coroutine``.
+
+    Used by the wrappers that sit between the agent and an MCP tool's own coroutine
+    (result shaping, argument validation, call stats).
+    """
+    return StructuredTool(
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+        coroutine=coroutine,
+        response_format=tool.response_format,
+        metadata=tool.metadata,
+    )
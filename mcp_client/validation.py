@@ -0,0 +1,81 @@
+from typing import Any, Dict, List, Optional
+
+from jsonschema import validators
+from langchain_core.tools import BaseTool, StructuredTool, ToolException
+
+import serialization
+from mcp_client.tools import wrap_tool
+
+# Compiled validators shared by tools with identical input schemas
+_validator_cache: Dict[str, Any] = {}
+
+
+class ToolArgumentsError(ToolException):
+    """Raised before dispatch when tool arguments don't match the tool's input schema."""
+
+    def __init__(self, tool_name: str, missing: List[str], invalid: List[Dict[str, str]]):
+        self.tool_name = tool_name
+        self.missing = missing  # Required parameters that were not provided
+        self.invalid = invalid  # [{'field': ..., 'message': ...}] for provided but invalid values
+        parts = []
+        if missing:
+            parts.append(f"missing required parameters: {', '.join(missing)}")
+        if invalid:
+            parts.append("invalid parameters: " + "; ".join(f"{item['field']}: {item['message']}" for item in invalid))
+        super().__init__(f"Invalid arguments for tool '{tool_name}': {'; '.join(parts)}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'tool_name': self.tool_name, 'missing_params': self.missing, 'invalid_params': self.invalid}
+
+
+def compile_schema(schema: Any) -> Optional[Any]:
+    """Build (or reuse) a jsonschema validator for a tool input schema.
+
+    Returns None when the tool has no usable JSON schema, in which case calls are not
+    pre-validated.
+    """
+    if not isinstance(schema, dict) or not schema:
+        return None
+    key = serialization.dumps(schema, sort_keys=True)
+    validator = _validator_cache.get(key)
+    if validator is None:
+        validator_class = validators.validator_for(schema)
+        try:
+            validator_class.check_schema(schema)
+        except Exception as e:
+            print(f"ToolValidation: Skipping pre-validation for an invalid schema: {e}")
+            return None
+        validator = validator_class(schema)
+        _validator_cache[key] = validator
+    return validator
+
+
+def validate_arguments(tool_name: str, validator: Any, arguments: Dict[str, Any]):
+    """Raise ``ToolArgumentsError`` if ``arguments`` don't satisfy the compiled schema."""
+    missing: List[str] = []
+    invalid: List[Dict[str, str]] = []
+    for error in validator.iter_errors(arguments):
+        path = ".".join(str(part) for part in error.absolute_path)
+        if error.validator == "required" and isinstance(error.instance, dict):
+            prefix = f"{path}." if path else ""
+            missing.extend(f"{prefix}{name}" for name in error.validator_value if name not in error.instance)
+        else:
+            invalid.append({'field': path or "(arguments)", 'message': error.message})
+    if missing or invalid:
+        raise ToolArgumentsError(tool_name, sorted(set(missing)), invalid)
+
+
+def with_validation(tool: BaseTool) -> BaseTool:
+    """Wrap an MCP tool so its arguments are checked locally before the server is called."""
+    if not isinstance(tool, StructuredTool) or tool.coroutine is None:
+        return tool
+    validator = compile_schema(tool.args_schema)
+    if validator is None:
+        return tool
+    call_tool = tool.coroutine
+
+    async def validated_call(**arguments: Any):
+        validate_arguments(tool.name, validator, arguments)
+        return await call_tool(**arguments)
+
+    return wrap_tool(tool, coroutine=validated_call)
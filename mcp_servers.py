@@ -1,10 +1,10 @@
 import json
 from database import DatabaseManager
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
-def fetch_mcp_servers_as_config() -> Dict[str, Dict[str, Any]]:
+def fetch_mcp_servers_as_config(db_manager: Optional[DatabaseManager] = None) -> Dict[str, Dict[str, Any]]:
     """Fetch MCP servers from database and format them as server_config."""
-    db_manager = DatabaseManager()
+    db_manager = db_manager or DatabaseManager()
     servers = db_manager.get_mcp_servers(enabled_only=True)
 
     server_config = {}
@@ -22,12 +22,16 @@ def fetch_mcp_servers_as_config() -> Dict[str, Dict[str, Any]]:
             print(f"Warning: Skipping server '{name}' due to missing or invalid command for stdio transport")
             continue
 
+        if transport == 'inprocess' and not command.strip():
+            print(f"Warning: Skipping server '{name}' due to missing server module for inprocess transport")
+            continue
+
         if transport in ['http', 'sse', 'streamable_http'] and not url.strip():
             print(f"Warning: Skipping server '{name}' due to missing or invalid URL for {transport} transport")
             continue
 
         # Skip unknown transports
-        if transport not in ['stdio', 'streamable_http', 'sse']:
+        if transport not in ['stdio', 'streamable_http', 'sse', 'inprocess']:
             print(f"Warning: Skipping server '{name}' due to unknown transport '{transport}'")
             continue
 
@@ -49,6 +53,11 @@ def fetch_mcp_servers_as_config() -> Dict[str, Dict[str, Any]]:
                 print(f"Added stdio server '{name}' with args: {args_list}")
             if env_dict:
                 server_config[name]["env"] = env_dict
+        elif transport == 'inprocess':
+            # Python file or module (optionally ":attribute") holding a FastMCP object
+            server_config[name]["target"] = command.strip()
+            if env_dict:
+                server_config[name]["env"] = env_dict
         elif transport in ['http', 'sse', 'streamable_http']:
             if url:
                 server_config[name]["url"] = url
@@ -57,9 +66,9 @@ def fetch_mcp_servers_as_config() -> Dict[str, Dict[str, Any]]:
                 server_config[name]["args"] = args_list
             
             # Convert environment variables to HTTP headers for HTTP-based transports
+            headers = {}
             if env_dict:
                 # Create headers from environment variables
-                headers = {}
                 for key, value in env_dict.items():
                     # Convert environment variable names to header names
                     # For example, COMPOSIO_API_KEY -> Authorization or custom header
@@ -69,6 +78,9 @@ def fetch_mcp_servers_as_config() -> Dict[str, Dict[str, Any]]:
                     else:
                         # For other environment variables, use them as custom headers
                         headers[key] = value
+            # Explicitly configured headers win over ones derived from env
+            headers.update(server.get('headers') or {})
+            if headers:
                 server_config[name]["headers"] = headers
             # Note: env not supported for http/sse transports - would cause TypeError
             # if env_dict:
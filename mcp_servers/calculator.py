@@ -1,7 +1,100 @@
+import ast
+from typing import Dict, List, Literal, Optional, Union
+
+import numpy as np
 from mcp.server.fastmcp import FastMCP
 
 mcp = FastMCP("Calculator")
 
+Number = Union[float, int]
+Operand = Union[Number, List[Number]]
+
+BATCH_OPERATIONS = {
+    "add": np.add,
+    "subtract": np.subtract,
+    "multiply": np.multiply,
+    "divide": np.divide,
+    "power": np.power,
+}
+
+REDUCTIONS = {
+    "sum": np.sum,
+    "mean": np.mean,
+    "min": np.min,
+    "max": np.max,
+    "std": np.std,
+    "median": np.median,
+    "product": np.prod,
+    "count": np.size,
+}
+
+# Names an expression may call, all applied element-wise
+EXPRESSION_FUNCTIONS = {
+    "abs": np.abs,
+    "sqrt": np.sqrt,
+    "exp": np.exp,
+    "log": np.log,
+    "log10": np.log10,
+    "sin": np.sin,
+    "cos": np.cos,
+    "tan": np.tan,
+    "round": np.round,
+    "floor": np.floor,
+    "ceil": np.ceil,
+    "minimum": np.minimum,
+    "maximum": np.maximum,
+}
+
+EXPRESSION_CONSTANTS = {"pi": np.pi, "e": np.e}
+
+_BINARY_OPERATORS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.divide,
+    ast.Pow: np.power,
+    ast.Mod: np.mod,
+    ast.FloorDiv: np.floor_divide,
+}
+
+_UNARY_OPERATORS = {
+    ast.USub: np.negative,
+    ast.UAdd: np.positive,
+}
+
+def _as_array(values: Operand) -> np.ndarray:
+    return np.asarray(values, dtype=float)
+
+def _to_result(array: np.ndarray, decimals: Optional[int] = None):
+    """Convert a NumPy result to JSON-friendly floats; non-finite values become None."""
+    if decimals is not None:
+        array = np.round(array, decimals)
+    if array.ndim == 0:
+        value = float(array)
+        return value if np.isfinite(value) else None
+    return [float(v) if np.isfinite(v) else None for v in array.tolist()]
+
+def _evaluate(node: ast.AST, variables: Dict[str, np.ndarray]) -> np.ndarray:
+    """Evaluate a whitelisted arithmetic expression tree over NumPy arrays."""
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body, variables)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return np.asarray(float(node.value))
+    if isinstance(node, ast.Name):
+        if node.id in variables:
+            return variables[node.id]
+        if node.id in EXPRESSION_CONSTANTS:
+            return np.asarray(EXPRESSION_CONSTANTS[node.id])
+        raise ValueError(f"Unknown variable '{node.id}'")
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+        return _BINARY_OPERATORS[type(node.op)](_evaluate(node.left, variables), _evaluate(node.right, variables))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+        return _UNARY_OPERATORS[type(node.op)](_evaluate(node.operand, variables))
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in EXPRESSION_FUNCTIONS \
+            and not node.keywords:
+        return EXPRESSION_FUNCTIONS[node.func.id](*(_evaluate(arg, variables) for arg in node.args))
+    raise ValueError(f"Unsupported expression element: {ast.dump(node)[:80]}")
+
 @mcp.tool(
     description="Subtract two numbers.",
     structured_output=True,
@@ -40,5 +133,65 @@ def power(base: float, exponent: float) -> float:
     """Raise base to the power of exponent."""
     return base ** exponent
 
+@mcp.tool(
+    description="Apply one arithmetic operation (add, subtract, multiply, divide, power) element-wise "
+                "to arrays of numbers in a single call. Either operand may be a single number, which "
+                "is applied to every element.",
+    structured_output=True,
+    title="Batch Arithmetic Tool",
+)
+def batch_calculate(operation: Literal["add", "subtract", "multiply", "divide", "power"],
+                    x: Operand, y: Operand, decimals: Optional[int] = None) -> Union[Optional[float], List[Optional[float]]]:
+    """Vectorized arithmetic over arrays with NumPy broadcasting."""
+    x_array, y_array = _as_array(x), _as_array(y)
+    if operation == "divide" and np.any(y_array == 0):
+        raise ValueError("Cannot divide by zero")
+    with np.errstate(all="ignore"):
+        return _to_result(BATCH_OPERATIONS[operation](x_array, y_array), decimals)
+
+@mcp.tool(
+    description="Summarize an array of numbers in one call. Supported statistics: "
+                "sum, mean, min, max, std, median, product, count (default: sum).",
+    structured_output=True,
+    title="Array Statistics Tool",
+)
+def aggregate(values: List[Number],
+              statistics: Optional[List[Literal["sum", "mean", "min", "max", "std",
+                                                "median", "product", "count"]]] = None,
+              decimals: Optional[int] = None) -> Dict[str, Optional[float]]:
+    """Reduce an array to the requested statistics."""
+    statistics = statistics or ["sum"]
+    array = _as_array(values)
+    if array.size == 0:
+        raise ValueError("Cannot aggregate an empty list")
+    with np.errstate(all="ignore"):
+        return {name: _to_result(np.asarray(REDUCTIONS[name](array)), decimals) for name in statistics}
+
+@mcp.tool(
+    description="Evaluate an arithmetic expression element-wise over arrays, e.g. "
+                "'price * qty * (1 + tax)' with variables {'price': [...], 'qty': [...], 'tax': 0.2}. "
+                "Supports + - * / ** % //, parentheses, pi, e and the functions abs, sqrt, exp, log, "
+                "log10, sin, cos, tan, round, floor, ceil, minimum, maximum. Optionally reduce the "
+                "result with sum, mean, min, max, std, median, product or count. Non-finite results "
+                "are returned as null.",
+    structured_output=True,
+    title="Array Expression Tool",
+)
+def evaluate_expression(expression: str, variables: Optional[Dict[str, Operand]] = None,
+                        reduce: Optional[Literal["sum", "mean", "min", "max", "std",
+                                                 "median", "product", "count"]] = None,
+                        decimals: Optional[int] = None) -> Union[Optional[float], List[Optional[float]]]:
+    """Safely evaluate an expression over NumPy arrays (no names or calls outside the whitelist)."""
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression: {e.msg}")
+    arrays = {name: _as_array(value) for name, value in (variables or {}).items()}
+    with np.errstate(all="ignore"):
+        result = _evaluate(tree, arrays)
+        if reduce is not None:
+            result = np.asarray(REDUCTIONS[reduce](result))
+    return _to_result(np.asarray(result), decimals)
+
 if __name__ == "__main__":
     mcp.run(transport="stdio")
\ No newline at end of file
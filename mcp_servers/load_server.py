@@ -0,0 +1,112 @@
+"""Synthetic FastMCP server for scale-testing tool discovery and selection.
+
+Every knob is read from the environment so the server can be registered in
+``mcp_servers`` like any other stdio server (the ``env`` column is passed
+through to the subprocess):
+
+    LOAD_SERVER_NAME         Server name reported to clients (default "Load Server")
+    LOAD_SERVER_TOOLS        Number of generated tools (default 10)
+    LOAD_SERVER_PARAMS       Parameters per tool, i.e. schema size (default 3)
+    LOAD_SERVER_DESC_WORDS   Words in each tool/parameter description (default 12)
+    LOAD_SERVER_LATENCY_MS   Artificial latency added to every call (default 0)
+    LOAD_SERVER_JITTER_MS    Random extra latency, 0..jitter (default 0)
+    LOAD_SERVER_ERROR_RATE   Probability in [0, 1] that a call fails (default 0)
+    LOAD_SERVER_PAYLOAD_BYTES  Size of the text returned by each call (default 64)
+    LOAD_SERVER_SEED         Seed for the error/jitter generator (default unset)
+"""
+import asyncio
+import inspect
+import os
+import random
+from typing import Annotated
+
+from mcp.server.fastmcp import FastMCP
+from pydantic import Field
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+settings = {
+    "name": os.getenv("LOAD_SERVER_NAME", "Load Server"),
+    "tools": _env_int("LOAD_SERVER_TOOLS", 10),
+    "params": _env_int("LOAD_SERVER_PARAMS", 3),
+    "desc_words": _env_int("LOAD_SERVER_DESC_WORDS", 12),
+    "latency_ms": _env_float("LOAD_SERVER_LATENCY_MS", 0),
+    "jitter_ms": _env_float("LOAD_SERVER_JITTER_MS", 0),
+    "error_rate": _env_float("LOAD_SERVER_ERROR_RATE", 0),
+    "payload_bytes": _env_int("LOAD_SERVER_PAYLOAD_BYTES", 64),
+}
+
+_seed = os.getenv("LOAD_SERVER_SEED")
+_rng = random.Random(int(_seed) if _seed else None)
+
+_WORDS = (
+    "compute transform record metric sample value series window batch "
+    "aggregate filter project resolve lookup index segment payload stream"
+).split()
+
+mcp = FastMCP(settings["name"])
+
+
+def _description(prefix: str, words: int) -> str:
+    """Build a deterministic filler description of roughly ``words`` words."""
+    filler = " ".join(_WORDS[i % len(_WORDS)] for i in range(max(words, 0)))
+    return f"{prefix} {filler}".strip()
+
+
+def _make_tool(index: int):
+    """Create a tool function whose signature has ``settings['params']`` parameters."""
+    tool_name = f"load_tool_{index:04d}"
+
+    async def tool(**kwargs) -> str:
+        delay_ms = settings["latency_ms"]
+        if settings["jitter_ms"] > 0:
+            delay_ms += _rng.uniform(0, settings["jitter_ms"])
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+        if settings["error_rate"] > 0 and _rng.random() < settings["error_rate"]:
+            raise RuntimeError(f"Synthetic failure in {tool_name}")
+        header = f"{tool_name}({', '.join(f'{k}={v}' for k, v in sorted(kwargs.items()))})"
+        padding = max(settings["payload_bytes"] - len(header) - 1, 0)
+        return f"{header} " + ("x" * padding) if padding else header
+
+    # FastMCP derives the input schema from the signature, so publish one
+    # parameter per configured field: the first half required, the rest optional.
+    required = max(settings["params"] // 2, 1) if settings["params"] else 0
+    parameters = []
+    for position in range(settings["params"]):
+        parameters.append(inspect.Parameter(
+            f"field_{position:02d}",
+            inspect.Parameter.KEYWORD_ONLY,
+            annotation=Annotated[str, Field(description=_description(
+                f"Field {position}.", settings["desc_words"]))],
+            default=inspect.Parameter.empty if position < required else "",
+        ))
+    tool.__signature__ = inspect.Signature(parameters, return_annotation=str)
+    tool.__name__ = tool_name
+    return tool_name, tool
+
+
+for _index in range(settings["tools"]):
+    _name, _fn = _make_tool(_index)
+    mcp.add_tool(
+        _fn,
+        name=_name,
+        title=f"Load Tool {_index}",
+        description=_description(f"Synthetic tool #{_index}.", settings["desc_words"]),
+    )
+
+if __name__ == "__main__":
+    mcp.run(transport="stdio")
@@ -0,0 +1,31 @@
+import os
+from urllib.parse import unquote, urlparse
+from urllib.request import url2pathname
+
+# Directory the file tools may read and write; defaults to the server's working directory
+DATA_DIR_ENV = "MCP_DATA_DIR"
+
+
+def data_root() -> str:
+    return os.path.realpath(os.getenv(DATA_DIR_ENV) or os.getcwd())
+
+
+def resolve_path(path_or_uri: str) -> str:
+    """Turn a filesystem path or file:// URI into a local path inside the data root.
+
+    Relative paths are taken relative to the root. Symlinks are resolved before the
+    check, so a link pointing outside the root is refused as well.
+    """
+    parsed = urlparse(path_or_uri)
+    if parsed.scheme == "file":
+        path = url2pathname(unquote(parsed.path))
+    elif parsed.scheme and len(parsed.scheme) > 1:
+        # Single-letter schemes are Windows drive letters, not URIs
+        raise ValueError(f"Unsupported URI scheme '{parsed.scheme}'. Use a file path or a file:// URI.")
+    else:
+        path = path_or_uri
+    root = data_root()
+    resolved = os.path.realpath(os.path.join(root, os.path.expanduser(path)))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"'{path_or_uri}' is outside the data directory {root} (set {DATA_DIR_ENV} to change it)")
+    return resolved
@@ -1,7 +1,16 @@
+from typing import List, Union
+
+import numpy as np
 from mcp.server.fastmcp import FastMCP
 
 mcp = FastMCP("Math")
 
+def _check_finite(result: np.ndarray) -> np.ndarray:
+    # inf/nan have no JSON representation, so report them instead of returning them
+    if not np.all(np.isfinite(result)):
+        raise ValueError("Result is not a finite number (overflow or non-finite input)")
+    return result
+
 @mcp.tool(
     description="Add two numbers together and return the result.",
     structured_output=True,
@@ -11,5 +20,28 @@ def add(x: int, y: int) -> int:
     """Add two numbers."""
     return x + y
 
+@mcp.tool(
+    description="Add two arrays of numbers element-wise in one call. Either side may be a single "
+                "number, which is added to every element.",
+    structured_output=True,
+    title="Batch Addition Tool",
+)
+def batch_add(x: Union[float, List[float]], y: Union[float, List[float]]) -> Union[float, List[float]]:
+    """Add arrays with NumPy broadcasting."""
+    with np.errstate(all="ignore"):
+        result = np.add(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+    return _check_finite(result).tolist()
+
+@mcp.tool(
+    description="Add up a list of numbers and return the total.",
+    structured_output=True,
+    title="Sum Tool",
+)
+def sum_numbers(values: List[float]) -> float:
+    """Sum a list of numbers."""
+    with np.errstate(all="ignore"):
+        total = np.sum(np.asarray(values, dtype=float))
+    return float(_check_finite(total))
+
 if __name__ == "__main__":
     mcp.run(transport="stdio")
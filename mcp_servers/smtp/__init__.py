@@ -1,2 +0,0 @@
-# This file is kept for backward compatibility but is no longer used
-# The SMTP server models are now defined directly in main.py
\ No newline at end of file
@@ -1,29 +1,227 @@
 import asyncio
 import time
+import uuid
+from collections import OrderedDict
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 import os
-import smtplib
-from typing import List, Dict, Any
+import sys
+from typing import List, Dict, Any, Optional
 
+import aiosmtplib
 from mcp.server.fastmcp import FastMCP
 from dotenv import load_dotenv
 
+# models.py sits next to this file; resolve it whatever the working directory or loader
+if os.path.dirname(os.path.abspath(__file__)) not in sys.path:
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from models import SMTPMessageInput
+
 load_dotenv()
 
 mcp = FastMCP("SMTP Server", instructions="""
 This MCP server allows you to send emails using an SMTP server configuration.
+Use send_email for a single message, send_emails for many messages at once, and
+queue_email with get_delivery_status for fire-and-forget delivery.
               """)
 
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
 config = {
     "host": os.getenv("SMTP_HOST"),
     "port": int(os.getenv("SMTP_PORT", 465)),
     "username": os.getenv("SMTP_USERNAME"),
     "password": os.getenv("SMTP_PASSWORD"),
 }
+# Delivery settings; the defaults match the previous SMTP_SSL behaviour on port 465
+config.update({
+    "sender": os.getenv("SMTP_FROM") or config["username"],
+    "use_tls": _env_bool("SMTP_USE_TLS", config["port"] == 465),
+    "start_tls": _env_bool("SMTP_STARTTLS", config["port"] == 587),
+    "timeout": float(os.getenv("SMTP_TIMEOUT", 10)),
+    "pool_size": max(int(os.getenv("SMTP_POOL_SIZE", 2)), 1),
+    "max_recipients": max(int(os.getenv("SMTP_MAX_RECIPIENTS", 100)), 1),
+    "queue_workers": max(int(os.getenv("SMTP_QUEUE_WORKERS", 1)), 1),
+    "status_history": max(int(os.getenv("SMTP_STATUS_HISTORY", 1000)), 1),
+})
+
+class SMTPConnectionPool:
+    """Pool of persistent, authenticated aiosmtplib connections."""
+
+    def __init__(self, settings: Dict[str, Any]):
+        self.settings = settings
+        self._idle: List[aiosmtplib.SMTP] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.settings["host"],
+            port=self.settings["port"],
+            use_tls=self.settings["use_tls"],
+            start_tls=self.settings["start_tls"],
+            timeout=self.settings["timeout"],
+        )
+        await smtp.connect()
+        if self.settings["username"] and self.settings["password"]:
+            await smtp.login(self.settings["username"], self.settings["password"])
+        return smtp
+
+    async def acquire(self) -> aiosmtplib.SMTP:
+        """Take an idle connection (or open a new one), waiting if the pool is exhausted."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.settings["pool_size"])
+        await self._slots.acquire()
+        try:
+            while self._idle:
+                smtp = self._idle.pop()
+                if smtp.is_connected:
+                    return smtp
+            return await self._connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def release(self, smtp: aiosmtplib.SMTP, broken: bool = False):
+        """Return a connection to the pool, or drop it if it is no longer usable."""
+        if broken or not smtp.is_connected:
+            smtp.close()
+        else:
+            self._idle.append(smtp)
+        if self._slots is not None:
+            self._slots.release()
+
+    async def close(self):
+        """Quit every idle connection."""
+        while self._idle:
+            smtp = self._idle.pop()
+            try:
+                await smtp.quit()
+            except Exception:
+                smtp.close()
+
+class DeliveryEngine:
+    """Builds messages and delivers them over the pool, directly or via a background queue."""
+
+    def __init__(self, settings: Dict[str, Any]):
+        self.settings = settings
+        self.pool = SMTPConnectionPool(settings)
+        self.statuses: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    def _build_message(self, subject: str, body: str) -> MIMEMultipart:
+        # No To header: like the previous per-recipient sends, recipients don't see each other
+        msg = MIMEMultipart()
+        msg["From"] = self.settings["sender"]
+        msg["Subject"] = subject
+        msg.attach(MIMEText(body, "plain"))
+        return msg
+
+    async def _send_envelope(self, msg: MIMEMultipart, recipients: List[str]) -> Dict[str, str]:
+        """Send one SMTP transaction to many recipients, retrying once on a stale connection.
+
+        Returns:
+            dict: Recipients the server refused, mapped to its response
+        """
+        for attempt in range(2):
+            smtp = await self.pool.acquire()
+            try:
+                errors, _ = await smtp.send_message(msg, sender=self.settings["sender"], recipients=recipients)
+            except aiosmtplib.SMTPServerDisconnected:
+                await self.pool.release(smtp, broken=True)
+                if attempt == 0:
+                    continue
+                raise
+            except aiosmtplib.SMTPRecipientsRefused as e:
+                await self.pool.release(smtp)
+                return {error.recipient: error.message for error in e.recipients}
+            except BaseException:
+                await self.pool.release(smtp, broken=True)
+                raise
+            await self.pool.release(smtp)
+            return {recipient: response.message for recipient, response in errors.items()}
+        return {}
+
+    async def deliver(self, to: List[str], subject: str, body: str) -> Dict[str, Any]:
+        """Deliver one message, using as few envelopes as the recipient limit allows."""
+        msg = self._build_message(subject, body)
+        batch_size = self.settings["max_recipients"]
+        batches = [to[i:i + batch_size] for i in range(0, len(to), batch_size)]
+        results = await asyncio.gather(*(self._send_envelope(msg, batch) for batch in batches),
+                                       return_exceptions=True)
+        refused: Dict[str, str] = {}
+        errors = []
+        for batch, result in zip(batches, results):
+            if isinstance(result, BaseException):
+                errors.append(str(result))
+                refused.update({recipient: str(result) for recipient in batch})
+            else:
+                refused.update(result)
+        return {
+            "delivered": [recipient for recipient in to if recipient not in refused],
+            "refused": refused,
+            "errors": errors,
+        }
+
+    def _record(self, delivery_id: str, **fields):
+        status = self.statuses.setdefault(delivery_id, {"id": delivery_id})
+        status.update(fields)
+        self.statuses.move_to_end(delivery_id)
+        while len(self.statuses) > self.settings["status_history"]:
+            self.statuses.popitem(last=False)
+
+    async def enqueue(self, message: SMTPMessageInput) -> str:
+        """Queue a message for background delivery and return its delivery id."""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self.settings["queue_workers"]:
+            self._workers.append(asyncio.create_task(self._worker()))
+        delivery_id = uuid.uuid4().hex
+        self._record(delivery_id, status="queued", to=message.to, subject=message.subject,
+                     queued_at=time.time(), sent_at=None, refused={}, error=None)
+        await self._queue.put((delivery_id, message))
+        return delivery_id
+
+    async def _worker(self):
+        assert self._queue is not None
+        while True:
+            delivery_id, message = await self._queue.get()
+            self._record(delivery_id, status="sending")
+            try:
+                result = await self.deliver(message.to, message.subject, message.body)
+                if not result["delivered"]:
+                    status = "failed"
+                elif result["refused"]:
+                    status = "partial"
+                else:
+                    status = "sent"
+                self._record(delivery_id, status=status, sent_at=time.time(), refused=result["refused"],
+                             error="; ".join(result["errors"]) or None)
+            except Exception as e:
+                self._record(delivery_id, status="failed", error=str(e))
+            finally:
+                self._queue.task_done()
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+engine = DeliveryEngine(config)
+
+def _summarize(result: Dict[str, Any]) -> str:
+    if not result["refused"]:
+        return "Email sent successfully"
+    if not result["delivered"]:
+        return f"Error sending email: {'; '.join(result['errors']) or result['refused']}"
+    return (f"Email sent to {len(result['delivered'])} recipient(s); "
+            f"refused: {', '.join(f'{r} ({reason})' for r, reason in result['refused'].items())}")
 
 @mcp.tool()
-def send_email(to: List[str], subject: str, body: str) -> str:
+async def send_email(to: List[str], subject: str, body: str) -> str:
     """
     Send an email using SMTP server configuration.
 
@@ -32,30 +230,55 @@ def send_email(to: List[str], subject: str, body: str) -> str:
         subject: Subject of the email
         body: Body content of the email
     """
-    """ Send an email using the configured SMTP server."""
     try:
-        print(config)
-        msg = MIMEMultipart()
-        msg["From"] = config["username"]
-        msg["Subject"] = subject
-        msg.attach(MIMEText(body, "plain"))
-        
-        server = smtplib.SMTP_SSL(
-            host=config["host"],
-            port=config["port"],
-            timeout=5
-        )
-        server.login(config["username"], config["password"])
-        for recipient in to:
-            server.sendmail(
-                config["username"],
-                recipient,
-                msg.as_string()
-            )
-        time.sleep(2)
-        return f"Email sent successfully"
+        return _summarize(await engine.deliver(to, subject, body))
     except Exception as e:
         return f"Error sending email: {str(e)}"
 
+@mcp.tool()
+async def send_emails(messages: List[SMTPMessageInput]) -> Dict[str, Any]:
+    """
+    Send many emails in one call over pooled SMTP connections.
+
+    Args:
+        messages: Emails to send, each with recipients, subject and body
+    """
+    results = await asyncio.gather(*(engine.deliver(m.to, m.subject, m.body) for m in messages),
+                                   return_exceptions=True)
+    summaries = []
+    for message, result in zip(messages, results):
+        if isinstance(result, BaseException):
+            summaries.append({"to": message.to, "subject": message.subject, "result": f"Error sending email: {result}"})
+        else:
+            summaries.append({"to": message.to, "subject": message.subject, "result": _summarize(result)})
+    sent = sum(1 for summary in summaries if summary["result"] == "Email sent successfully")
+    return {"sent": sent, "failed": len(summaries) - sent, "results": summaries}
+
+@mcp.tool()
+async def queue_email(to: List[str], subject: str, body: str) -> Dict[str, Any]:
+    """
+    Queue an email for background delivery and return a delivery id immediately.
+
+    Args:
+        to: Recipient email addresses
+        subject: Subject of the email
+        body: Body content of the email
+    """
+    delivery_id = await engine.enqueue(SMTPMessageInput(to=to, subject=subject, body=body))
+    return {"delivery_id": delivery_id, "status": "queued", "queue_depth": engine.queue_depth()}
+
+@mcp.tool()
+def get_delivery_status(delivery_id: str) -> Dict[str, Any]:
+    """
+    Look up the status of a queued email (queued, sending, sent, partial or failed).
+
+    Args:
+        delivery_id: Id returned by queue_email
+    """
+    status = engine.statuses.get(delivery_id)
+    if status is None:
+        return {"delivery_id": delivery_id, "status": "unknown"}
+    return {"delivery_id": delivery_id, **{k: v for k, v in status.items() if k != "id"}}
+
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
\ No newline at end of file
+    mcp.run(transport="stdio")
@@ -11,11 +11,8 @@ class SMTPServerConfig(BaseModel):
 
 class SMTPMessageInput(BaseModel):
     """
-    Model for input data to send via SMTP.
+    Model for input data to send via SMTP: one email, for single, bulk or queued delivery.
     """
-    to: list[str] = Field(..., description="Recipient email address.")
+    to: list[str] = Field(..., description="Recipient email addresses.")
     subject: str = Field(..., description="Subject of the email.")
     body: str = Field(..., description="Body content of the email.")
-
-# This file is no longer needed as the models have been moved to main.py
-# It is kept for backward compatibility
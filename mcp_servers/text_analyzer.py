@@ -1,7 +1,95 @@
-from mcp.server.fastmcp import FastMCP
+import os
+import re
+import sys
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from mcp.server.fastmcp import Context, FastMCP
+
+# Sibling helpers resolve whatever the working directory or loader (stdio or in-process)
+if os.path.dirname(os.path.abspath(__file__)) not in sys.path:
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from local_files import resolve_path
 
 mcp = FastMCP("Text Analyzer")
 
+# Compiled once at import instead of on every call
+WORD_PATTERN = re.compile(r'\b\w+\b')
+SENTENCE_DELIMITER_PATTERN = re.compile(r'[.!?]+')
+
+# Largest partial token carried between chunks before it is processed anyway
+MAX_CARRY_CHARS = 1024 * 1024
+
+
+class TextStats:
+    """Accumulates word, sentence and word-frequency counts over text fed in chunks.
+
+    Each chunk is processed up to its last whitespace character and the remainder is
+    carried into the next chunk, so tokens and sentence delimiters split across chunk
+    boundaries are counted exactly once.
+    """
+
+    def __init__(self):
+        self.words = 0
+        self.sentences = 0
+        self.characters = 0
+        self.word_counts = Counter()
+        self._in_sentence = False
+        self._carry = ""
+
+    def feed(self, chunk: str):
+        self.characters += len(chunk)
+        buffer = self._carry + chunk
+        # Scan back over the trailing partial token (bounded) to the last whitespace
+        split_at = len(buffer)
+        lower_bound = max(len(buffer) - MAX_CARRY_CHARS, 0)
+        while split_at > lower_bound and not buffer[split_at - 1].isspace():
+            split_at -= 1
+        if split_at == lower_bound and lower_bound == 0:
+            # No whitespace yet; keep accumulating
+            self._carry = buffer
+            return
+        if split_at == lower_bound:
+            # A single token longer than MAX_CARRY_CHARS: process it as-is
+            split_at = len(buffer)
+        self._process(buffer[:split_at])
+        self._carry = buffer[split_at:]
+
+    def finish(self) -> "TextStats":
+        if self._carry:
+            self._process(self._carry)
+            self._carry = ""
+        if self._in_sentence:
+            self.sentences += 1
+            self._in_sentence = False
+        return self
+
+    def _process(self, text: str):
+        self.words += len(text.split())
+        self.word_counts.update(WORD_PATTERN.findall(text.lower()))
+        pieces = SENTENCE_DELIMITER_PATTERN.split(text)
+        for index, piece in enumerate(pieces):
+            if piece.strip():
+                self._in_sentence = True
+            # Every piece but the last is followed by a delimiter that closes the sentence
+            if index < len(pieces) - 1 and self._in_sentence:
+                self.sentences += 1
+                self._in_sentence = False
+
+    def summary(self, top_n: int = 5, words_per_minute: int = 200) -> Dict[str, Any]:
+        return {
+            "words": self.words,
+            "sentences": self.sentences,
+            "characters": self.characters,
+            "top_words": self.word_counts.most_common(top_n),
+            "reading_time_minutes": _reading_minutes(self.words, words_per_minute),
+        }
+
+
+def _reading_minutes(word_count: int, words_per_minute: int) -> float:
+    return round(word_count / words_per_minute, 2)
+
+
 @mcp.tool(
     description="Count the number of words in a text.",
     structured_output=True,
@@ -18,8 +106,7 @@ def count_words(text: str) -> int:
 )
 def count_sentences(text: str) -> int:
     """Count the number of sentences in a text."""
-    import re
-    sentences = re.split(r'[.!?]+', text)
+    sentences = SENTENCE_DELIMITER_PATTERN.split(text)
     # Filter out empty strings
     sentences = [s for s in sentences if s.strip()]
     return len(sentences)
@@ -29,14 +116,11 @@ def count_sentences(text: str) -> int:
     structured_output=True,
     title="Common Words Finder Tool",
 )
-def common_words(text: str, top_n: int = 5) -> list:
+def common_words(text: str, top_n: int = 5) -> List[Tuple[str, int]]:
     """Find the most common words in a text."""
-    import re
-    from collections import Counter
-    
     # Convert to lowercase and split into words
-    words = re.findall(r'\b\w+\b', text.lower())
-    
+    words = WORD_PATTERN.findall(text.lower())
+
     # Count words and get top N
     word_counts = Counter(words)
     return word_counts.most_common(top_n)
@@ -48,8 +132,46 @@ def common_words(text: str, top_n: int = 5) -> list:
 )
 def reading_time(text: str, words_per_minute: int = 200) -> float:
     """Calculate the reading time of a text in minutes."""
-    word_count = count_words(text)
-    return round(word_count / words_per_minute, 2)
+    return _reading_minutes(len(text.split()), words_per_minute)
+
+@mcp.tool(
+    description="Analyze a text in one call: word count, sentence count, character count, "
+                "most common words and reading time (in minutes).",
+    structured_output=True,
+    title="Text Analysis Tool",
+)
+def analyze_text(text: str, top_n: int = 5, words_per_minute: int = 200) -> Dict[str, Any]:
+    """Compute all text metrics in a single pass over the text."""
+    stats = TextStats()
+    stats.feed(text)
+    return stats.finish().summary(top_n, words_per_minute)
+
+@mcp.tool(
+    description="Analyze a text file without sending its contents: accepts a file path or "
+                "file:// URI inside the server's data directory and returns word count, sentence count, "
+                "character count, most common words and reading time (in minutes). Suited to very "
+                "large documents.",
+    structured_output=True,
+    title="File Text Analysis Tool",
+)
+async def analyze_file(path: str, top_n: int = 5, words_per_minute: int = 200,
+                       encoding: str = "utf-8", chunk_size: int = 1024 * 1024,
+                       ctx: Optional[Context] = None) -> Dict[str, Any]:
+    """Stream a file through TextStats in chunks, reporting progress as it goes."""
+    local_path = resolve_path(path)
+    total_bytes = os.path.getsize(local_path)
+    stats = TextStats()
+    with open(local_path, "r", encoding=encoding, errors="replace") as f:
+        while True:
+            chunk = f.read(max(chunk_size, 1024))
+            if not chunk:
+                break
+            stats.feed(chunk)
+            if ctx is not None:
+                await ctx.report_progress(min(f.buffer.tell(), total_bytes), total_bytes)
+    result = stats.finish().summary(top_n, words_per_minute)
+    result["bytes"] = total_bytes
+    return result
 
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
\ No newline at end of file
+    mcp.run(transport="stdio")
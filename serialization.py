@@ -0,0 +1,114 @@
+"""JSON serialization used for config blobs, tool results, traces and cache keys.
+
+Uses orjson when it is installed and the standard library otherwise; set
+``MCP_JSON_BACKEND=json`` to force the standard library (e.g. to rule the
+backend out while debugging). Both backends produce compact output with the
+same key order, and plain JSON values (dicts, lists, strings, numbers, bools,
+None) read back identically whichever backend wrote them. Other types don't:
+orjson writes datetimes as ISO 8601 and dataclasses as objects natively, while
+the standard library falls back to ``str()``; NaN becomes null with orjson.
+So don't compare serialized text across backends.
+"""
+import json
+import os
+from typing import Any, Callable, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+JSONDecodeError = json.JSONDecodeError  # orjson.JSONDecodeError subclasses it
+
+
+def _default(value: Any) -> Any:
+    # Sets and other iterables serialize as lists; anything else as its string form
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return str(value)
+
+
+class JsonBackend:
+    """Standard library backend."""
+
+    name = "json"
+
+    def dumps(self, value: Any, sort_keys: bool = False, indent: bool = False,
+              default: Optional[Callable[[Any], Any]] = _default) -> str:
+        if indent:
+            return json.dumps(value, sort_keys=sort_keys, indent=2, default=default, ensure_ascii=False)
+        return json.dumps(value, sort_keys=sort_keys, separators=(',', ':'), default=default, ensure_ascii=False)
+
+    def dumps_bytes(self, value: Any, sort_keys: bool = False, indent: bool = False,
+                    default: Optional[Callable[[Any], Any]] = _default) -> bytes:
+        return self.dumps(value, sort_keys, indent, default).encode('utf-8')
+
+    def loads(self, data: Any) -> Any:
+        return json.loads(data)
+
+
+class OrjsonBackend(JsonBackend):
+    """orjson backend; falls back to the standard library for values orjson rejects."""
+
+    name = "orjson"
+
+    def dumps_bytes(self, value: Any, sort_keys: bool = False, indent: bool = False,
+                    default: Optional[Callable[[Any], Any]] = _default) -> bytes:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(value, default=default, option=option)
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits; JsonBackend.dumps explicitly, as self.dumps is orjson again
+            return JsonBackend.dumps(self, value, sort_keys, indent, default).encode('utf-8')
+
+    def dumps(self, value: Any, sort_keys: bool = False, indent: bool = False,
+              default: Optional[Callable[[Any], Any]] = _default) -> str:
+        return self.dumps_bytes(value, sort_keys, indent, default).decode('utf-8')
+
+    def loads(self, data: Any) -> Any:
+        return orjson.loads(data)
+
+
+BACKENDS = {"json": JsonBackend, "orjson": OrjsonBackend}
+backend: JsonBackend = JsonBackend()
+
+
+def set_backend(name: Optional[str] = None) -> JsonBackend:
+    """Select the backend by name; the default is orjson when it is installed."""
+    global backend
+    name = (name or os.getenv('MCP_JSON_BACKEND') or ('orjson' if orjson is not None else 'json')).strip().lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown JSON backend '{name}', expected one of {sorted(BACKENDS)}")
+    if name == "orjson" and orjson is None:
+        print("Serialization: orjson is not installed, using the standard library json module")
+        name = "json"
+    backend = BACKENDS[name]()
+    return backend
+
+
+def dumps(value: Any, sort_keys: bool = False, indent: bool = False,
+          default: Optional[Callable[[Any], Any]] = _default) -> str:
+    """Serialize ``value`` to a compact (or 2-space indented) JSON string."""
+    return backend.dumps(value, sort_keys, indent, default)
+
+
+def dumps_bytes(value: Any, sort_keys: bool = False, indent: bool = False,
+                default: Optional[Callable[[Any], Any]] = _default) -> bytes:
+    """Serialize ``value`` to UTF-8 JSON bytes (no str round trip with orjson)."""
+    return backend.dumps_bytes(value, sort_keys, indent, default)
+
+
+def loads(data: Any) -> Any:
+    """Parse JSON from ``str``, ``bytes`` or ``bytearray``.
+
+    Raises:
+        JSONDecodeError: If ``data`` isn't valid JSON.
+    """
+    return backend.loads(data)
+
+
+set_backend()